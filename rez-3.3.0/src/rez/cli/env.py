@@ -63,6 +63,10 @@ def setup_parser(parser, completions=False):
         "--time-limit", type=int, default=-1,
         dest="time_limit", metavar='SECS',
         help="abort if the resolve time exceeds SECS")
+    parser.add_argument(
+        "--solve-workers", type=int, default=None,
+        dest="solve_workers", metavar='N',
+        help="use N processes to solve (default: configured solve_workers)")
     parser.add_argument(
         "-o", "--output", type=str, metavar="FILE",
         help="store the context into an rxt file, instead of starting an "
@@ -93,6 +97,11 @@ def setup_parser(parser, completions=False):
     parser.add_argument(
         "--patch-rank", type=int, metavar="N", default=0,
         help="patch rank. Ignored if --patch is not present")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="incremental patching - keep the packages of the patched context "
+        "where possible, and only re-resolve packages affected by the patch. "
+        "Ignored if --patch is not present")
     parser.add_argument(
         "--no-cache", dest="no_cache", action="store_true",
         help="do not fetch cached resolves")
@@ -161,6 +170,7 @@ def command(opts, parser, extra_arg_groups=None):
         command = extra_arg_groups[0] or None
 
     context = None
+    seed_context = None
     request = opts.PKG
     t = get_epoch_time_from_str(opts.time) if opts.time else None
 
@@ -189,6 +199,8 @@ def command(opts, parser, extra_arg_groups=None):
         request = context.get_patched_request(request,
                                               strict=opts.strict,
                                               rank=opts.patch_rank)
+        if opts.incremental:
+            seed_context = context
         context = None
 
     if context is None:
@@ -229,6 +241,8 @@ def command(opts, parser, extra_arg_groups=None):
             print_stats=opts.stats,
             package_caching=(not opts.no_pkg_cache),
             package_cache_async=package_cache_mode,
+            solve_workers=opts.solve_workers,
+            seed_context=seed_context,
         )
 
     success = (context.status == ResolverStatus.solved)
@@ -7,6 +7,7 @@ Manipulate a package cache.
 '''
 from argparse import SUPPRESS
 import os.path
+import json
 import sys
 
 
@@ -25,6 +26,22 @@ def setup_parser(parser, completions=False):
         "-a", "--add-variants", metavar="URI", nargs='+',
         help="Add variants to the cache"
     )
+    group.add_argument(
+        "--prefetch", metavar="FILE", nargs='+',
+        help="Add the most used variants in the given context (.rxt) files "
+        "or context tracking logs to the cache. A log is expected to contain "
+        "one context tracking message (as JSON) per line"
+    )
+    group.add_argument(
+        "--materialize", metavar="PATH", nargs='+',
+        help="Copy the given files (or all files under the given directories) "
+        "of variants cached in 'lazy' copy mode into the cache. Use this to "
+        "record files that have been accessed"
+    )
+    group.add_argument(
+        "--stats", action="store_true",
+        help="Print cache statistics, in JSON form"
+    )
     group.add_argument(
         "--logs", action="store_true",
         help="View logs"
@@ -59,6 +76,10 @@ def setup_parser(parser, completions=False):
         help="Force a package add, even if package is not cachable. Only "
         "applicable with --add-variants"
     )
+    parser.add_argument(
+        "--limit", type=int, metavar="N",
+        help="Add at most N variants. Only applicable with --prefetch"
+    )
     parser.add_argument(
         "DIR", nargs='?',
         help="Package cache directory; will use config setting "
@@ -66,6 +87,18 @@ def setup_parser(parser, completions=False):
     )
 
 
+def is_sync(opts):
+    """Whether to cache synchronously, as set by --pkg-cache-mode."""
+    from rez.config import config
+
+    if opts.pkg_cache_mode == "async":
+        return False
+    elif opts.pkg_cache_mode == "sync":
+        return True
+    else:
+        return not config.package_cache_async
+
+
 def add_variant(pkgcache, uri, opts):
     import shutil
 
@@ -81,12 +114,7 @@ def add_variant(pkgcache, uri, opts):
         print("No such variant: %s" % uri, file=sys.stderr)
         sys.exit(1)
 
-    if opts.pkg_cache_mode == "async":
-        sync = False
-    elif opts.pkg_cache_mode == "sync":
-        sync = True
-    else:
-        sync = not config.package_cache_async
+    sync = is_sync(opts)
 
     destpath, status = pkgcache.add_variant(
         variant, force=opts.force,
@@ -131,6 +159,62 @@ def remove_variant(pkgcache, uri, opts):
         print_info("Variant successfully removed")
 
 
+def prefetch(pkgcache, filepaths, opts):
+    from rez.packages import get_variant
+    from rez.resolved_context import ResolvedContext
+    from rez.utils.logging_ import print_info, print_warning
+
+    # each occurrence of a variant counts as one use
+    variants = []
+
+    for filepath in filepaths:
+        if filepath.endswith(".rxt"):
+            context = ResolvedContext.load(filepath)
+            variants.extend(context.resolved_packages or [])
+            continue
+
+        with open(filepath) as f:
+            for line in f:
+                try:
+                    message = json.loads(line)
+                    handles = message["context"]["resolved_packages"]
+                except (ValueError, TypeError, KeyError):
+                    continue  # not a context tracking message
+
+                for handle in handles:
+                    try:
+                        variants.append(get_variant(handle))
+                    except Exception as e:
+                        # eg the package has since been deleted
+                        print_warning("Skipping variant %s: %s", handle, e)
+
+    sync = is_sync(opts)
+
+    queued = pkgcache.prefetch_variants(
+        variants,
+        limit=opts.limit,
+        package_cache_async=(not sync)
+    )
+
+    for variant in queued:
+        print_info("Queued %s", variant.uri)
+    if not queued:
+        print_info("No variants to prefetch")
+
+
+def materialize(pkgcache, paths, opts):
+    from rez.utils.logging_ import print_info
+
+    sync = is_sync(opts)
+
+    recorded = pkgcache.record_access(paths, package_cache_async=(not sync))
+
+    for path in recorded:
+        print_info("Recorded %s", path)
+    if not recorded:
+        print_info("No cached variant paths given")
+
+
 def view_logs(pkgcache, opts):
     from rez.utils.logging_ import view_file_logs
 
@@ -173,9 +257,18 @@ def command(opts, parser, extra_arg_groups=None):
         for uri in opts.remove_variants:
             remove_variant(pkgcache, uri, opts)
 
+    elif opts.prefetch:
+        prefetch(pkgcache, opts.prefetch, opts)
+
+    elif opts.materialize:
+        materialize(pkgcache, opts.materialize, opts)
+
     elif opts.clean:
         pkgcache.clean()
 
+    elif opts.stats:
+        print(json.dumps(pkgcache.get_stats(), indent=4))
+
     elif opts.logs:
         view_logs(pkgcache, opts)
 
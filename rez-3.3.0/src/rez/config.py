@@ -315,6 +315,14 @@ class RezToolsVisibility_(Str):
         return Or(*(x.name for x in RezToolsVisibility))
 
 
+class ContextFileFormat_(Str):
+    schema = Or("json", "binary")
+
+
+class PackageCacheCopyMode_(Str):
+    schema = Or("copy", "hardlink", "reflink", "lazy")
+
+
 class ExecutableScriptMode_(Str):
     @cached_class_property
     def schema(cls):
@@ -407,6 +415,7 @@ config_schema = Schema({
     "package_definition_python_path":               OptionalStr,
     "tmpdir":                                       OptionalStr,
     "context_tmpdir":                               OptionalStr,
+    "context_file_format":                          ContextFileFormat_,
     "default_shell":                                OptionalStr,
     "terminal_emulator_command":                    OptionalStr,
     "editor":                                       OptionalStr,
@@ -448,10 +457,18 @@ config_schema = Schema({
     "memcached_resolve_min_compress_len":           Int,
     "shell_error_truncate_cap":                     Int,
     "package_cache_log_days":                       Int,
+    "package_cache_workers":                        Int,
+    "package_cache_copy_mode":                      PackageCacheCopyMode_,
+    "package_cache_resume_copies":                  Bool,
+    "package_cache_verify_checksums":               Bool,
     "package_cache_max_variant_days":               Int,
     "package_cache_space_buffer":                   Int,
     "package_cache_used_threshold":                 Int,
+    "package_cache_high_watermark":                 Int,
+    "package_cache_low_watermark":                  Int,
     "package_cache_clean_limit":                    Float,
+    "package_cache_clean_workers":                  Int,
+    "package_cache_clean_rate":                     Float,
     "allow_unversioned_packages":                   Bool,
     "package_cache_during_build":                   Bool,
     "package_cache_local":                          Bool,
@@ -459,9 +476,14 @@ config_schema = Schema({
     "package_cache_async":                          Bool,
     "color_enabled":                                ForceOrBool,
     "resolve_caching":                              Bool,
+    "resolve_cache_type":                           Str,
+    "resolve_caching_max_staleness":                Int,
     "cache_package_files":                          Bool,
+    "cache_compiled_code":                          Bool,
+    "cache_context_environ":                        Bool,
     "cache_listdir":                                Bool,
     "prune_failed_graph":                           Bool,
+    "solve_workers":                                Int,
     "all_parent_variables":                         Bool,
     "all_resetting_variables":                      Bool,
     "package_commands_sourced_first":               Bool,
@@ -478,6 +500,7 @@ config_schema = Schema({
     "debug_package_exclusions":                     Bool,
     "debug_memcache":                               Bool,
     "debug_resolve_memcache":                       Bool,
+    "debug_resolve_cache":                          Bool,
     "debug_context_tracking":                       Bool,
     "debug_all":                                    Bool,
     "debug_none":                                   Bool,
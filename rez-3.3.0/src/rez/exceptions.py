@@ -112,6 +112,11 @@ class PackageCacheError(RezError):
     pass
 
 
+class ResolveCacheError(RezError):
+    """There was an error related to a resolve cache."""
+    pass
+
+
 class PackageTestError(RezError):
     """There was a problem running a package test."""
     pass
@@ -16,15 +16,15 @@ import platform
 import time
 import logging
 import logging.config
-import random
 import threading
 from contextlib import contextmanager
 
 from rez.config import config
 from rez.exceptions import PackageCacheError
-from rez.vendor.lockfile import LockFile, NotLocked
+from rez.vendor.lockfile import LockFile, LockError, NotLocked
 from rez.vendor.progress.spinner import PixelSpinner
-from rez.utils.filesystem import forceful_rmtree, safe_listdir, safe_remove
+from rez.utils.filesystem import forceful_rmtree, safe_listdir, safe_remove, \
+    reflink_file, get_tree_size
 from rez.utils.colorize import ColorizedStreamHandler
 from rez.utils.logging_ import print_warning
 from rez.packages import get_variant
@@ -85,6 +85,17 @@ class PackageCache(object):
         VARIANT_SKIPPED: "is not being cached due to cache size limit"
     }
 
+    #: Counters kept by the cache (see `get_stats`)
+    STAT_NAMES = (
+        "hits",  # cached root found for a cachable variant
+        "misses",  # cached root not found for a cachable variant
+        "copies",  # variants copied into the cache
+        "bytes_copied",  # bytes actually copied, not linked or resumed
+        "copy_time",  # total seconds spent copying
+        "evictions",  # variants removed as unused, or to free space
+        "skipped"  # variants not cached due to lack of space
+    )
+
     _FILELOCK_TIMEOUT = 10
     _COPYING_TIME_INC = 0.2
     _COPYING_TIME_MAX = 5.0
@@ -103,8 +114,18 @@ class PackageCache(object):
         # make dirs for internal use
         os.makedirs(self._log_dir, exist_ok=True)
         os.makedirs(self._pending_dir, exist_ok=True)
+        os.makedirs(self._requests_dir, exist_ok=True)
+        os.makedirs(self._sizes_dir, exist_ok=True)
         os.makedirs(self._remove_dir, exist_ok=True)
 
+        # see _read_index, _batch_index_updates
+        self._index = None
+        self._index_updates = None
+
+        # stats not yet written to disk, see flush_stats
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
     def get_cached_root(self, variant):
         """Get location of variant payload copy.
 
@@ -114,9 +135,82 @@ class PackageCache(object):
         Returns:
             str: Cached variant root path, or None if not found.
         """
-        status, rootpath = self._get_cached_root(variant)
-        if status != self.VARIANT_FOUND:
-            return None
+        rootpath = self._get_cached_root_path(variant)
+
+        if rootpath:
+            self._add_stats(hits=1)
+        elif variant.parent.is_cachable:
+            self._add_stats(misses=1)
+
+        return rootpath
+
+    def get_stats(self):
+        """Get the statistics of this cache.
+
+        Statistics are accumulated by all processes using the cache. Note that
+        hits and misses are only recorded once they are flushed (see
+        `flush_stats`).
+
+        Returns:
+            dict: Each counter in `STAT_NAMES`, and:
+            - hit_ratio (float): Ratio of hits to cachable variant lookups, or
+              None if there were none;
+            - mean_copy_time (float): Mean seconds spent copying a variant, or
+              None if there were no copies.
+        """
+        stats = dict.fromkeys(self.STAT_NAMES, 0)
+
+        for counts in self._read_stats_files():
+            for name in self.STAT_NAMES:
+                stats[name] += counts.get(name, 0)
+
+        lookups = stats["hits"] + stats["misses"]
+        copies = stats["copies"]
+
+        stats["hit_ratio"] = (float(stats["hits"]) / lookups) if lookups else None
+        stats["mean_copy_time"] = (stats["copy_time"] / copies) if copies else None
+        return stats
+
+    def flush_stats(self):
+        """Write statistics recorded by this instance to disk.
+
+        Statistics are written as they are recorded, except for hits and
+        misses, since these are recorded far more often (see `get_cached_root`).
+
+        Returns:
+            dict: The counters that were written.
+        """
+        with self._stats_lock:
+            stats = self._stats
+            self._stats = {}
+
+        if not stats:
+            return stats
+
+        # Appends of a single short line are atomic, so concurrent processes do
+        # not need the cache lock.
+        try:
+            with open(self._stats_log_filepath, 'a') as f:
+                f.write(json.dumps(stats) + '\n')
+        except (IOError, OSError):
+            pass  # stats are not critical
+
+        return stats
+
+    def _get_cached_root_path(self, variant):
+        rootpath = self._get_indexed_root(variant)
+
+        if rootpath is None:
+            status, rootpath = self._get_cached_root(variant)
+            if status != self.VARIANT_FOUND:
+                return None
+
+            # variant was cached by an older rez, or the index is out of date
+            try:
+                with self._lock():
+                    self._update_index(variant, rootpath)
+            except (LockError, IOError, OSError):
+                pass  # not critical, the index is only an optimisation
 
         # touch the json file so we know when it was last used
         json_filepath = rootpath + ".json"
@@ -142,38 +236,152 @@ class PackageCache(object):
         Returns:
             int: The size in bytes of the variant root (may exceed buffer slightly).
         """
-        variant_size = 0
-        seen_inodes = set()
-        stack = [variant_root]
+        # Bail out early if variant size will overtake the buffer set by
+        # config.package_cache_space_buffer.
+        return get_tree_size(
+            variant_root,
+            limit=(free - config.package_cache_space_buffer)
+        )
+
+    def get_variant_payload_size(self, variant):
+        """Get the size of a variant's payload.
+
+        The size is read from the variant's repository, if it was recorded when
+        the variant was installed (see
+        :meth:`.PackageRepository.get_variant_payload_size`). Otherwise, it is
+        read from the cache's own record of sizes. If neither exist, the payload
+        is measured, and the size recorded in the cache, so that a variant is
+        only ever measured once.
+
+        Args:
+            variant (`Variant`): Variant to get the size of.
+
+        Returns:
+            int: The size in bytes of the variant payload.
+        """
+        size = self._get_recorded_payload_size(variant)
+        if size is not None:
+            return size
 
-        while stack:
-            current = stack.pop()
-            try:
-                with os.scandir(current) as ref:
-                    for entry in ref:
-                        try:
-                            # Since we are following symlinks, track visited inodes to make sure
-                            # we are not double counting files.
-                            st = entry.stat(follow_symlinks=True)
-                            inode = (st.st_dev, st.st_ino)
-                            if inode in seen_inodes:
-                                continue
-                            seen_inodes.add(inode)
-
-                            if stat.S_ISREG(st.st_mode):
-                                variant_size += st.st_size
-                                # Bail out early if variant size will overtake the buffer
-                                # set by config.package_cache_space_buffer.
-                                if (free - variant_size) < config.package_cache_space_buffer:
-                                    return variant_size
-                            elif stat.S_ISDIR(st.st_mode):
-                                stack.append(entry.path)
-                        except OSError:
-                            continue
-            except OSError:
-                continue
+        filepath = os.path.join(self._sizes_dir, self._get_variant_key(variant))
+        size = get_tree_size(variant.root)
+
+        tmp_filepath = "%s.%s.tmp" % (filepath, uuid4().hex)
+        try:
+            with open(tmp_filepath, 'w') as f:
+                f.write(str(size))
+            os.replace(tmp_filepath, filepath)
+        except (IOError, OSError):
+            safe_remove(tmp_filepath)
+
+        return size
+
+    def _write_copying_owner(self, filepath):
+        """Record the process copying a variant in its '.copying' file."""
+        with open(filepath, 'w') as f:
+            f.write(json.dumps({"host": system.hostname, "pid": os.getpid()}))
+
+    def _is_copying_owner_alive(self, filepath):
+        """Check if the process recorded in a '.copying' file is still running.
+
+        Only processes on this host can be checked, on POSIX systems. Otherwise,
+        or if no process is recorded, False is returned.
+        """
+        if os.name != "posix":
+            return False
+
+        try:
+            with open(filepath) as f:
+                owner = json.loads(f.read())
+            pid = owner["pid"]
+            if owner["host"] != system.hostname:
+                return False
+        except (IOError, ValueError, TypeError, KeyError):
+            return False
+
+        try:
+            os.kill(pid, 0)
+        except PermissionError:
+            return True  # running, but owned by another user
+        except (OSError, TypeError, OverflowError):
+            return False
+
+        return True
+
+    def _get_recorded_payload_size(self, variant):
+        """Get the recorded size of a variant's payload, without measuring it.
+
+        Returns:
+            int: The size in bytes of the variant payload, or None if it has
+            not been recorded (see `get_variant_payload_size`).
+        """
+        size = variant.repository.get_variant_payload_size(variant.resource)
+        if size is not None:
+            return size
+
+        filepath = os.path.join(self._sizes_dir, self._get_variant_key(variant))
+
+        try:
+            with open(filepath) as f:
+                return int(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def evict(self, logger=None):
+        """Evict least recently used variants, if the cache is too full.
+
+        If disk usage is above :data:`package_cache_high_watermark`, variants
+        are removed in order of when they were last used (see
+        `get_cached_root`), until usage is below
+        :data:`package_cache_low_watermark`.
+
+        Args:
+            logger (`logging.Logger`): Logger to report evictions to.
+
+        Returns:
+            List of `Variant`: Evicted variants.
+        """
+        high_watermark = config.package_cache_high_watermark
+        if not high_watermark:
+            return []
+
+        total, used, _ = shutil.disk_usage(self.path)
+        if not total or (used * 100.0 / total) < high_watermark:
+            return []
+
+        to_free = used - (total * config.package_cache_low_watermark / 100.0)
+
+        # find least recently used variants
+        entries = []
+        for variant, rootpath, status, mtime, size in self._scan_cached_variants():
+            if status == self.VARIANT_FOUND:
+                if size is None:
+                    size = self._get_cached_variant_size(rootpath)
+                entries.append((mtime, variant, rootpath, size))
+
+        # the disk may be shared, so never try to free more than the cache uses
+        to_free = min(to_free, sum(x[3] for x in entries))
+
+        entries.sort(key=lambda x: x[0])
+        evicted = []
+
+        with self._batch_index_updates():
+            for _, variant, rootpath, size in entries:
+                if to_free <= 0:
+                    break
+
+                if self.remove_variant(variant) == self.VARIANT_REMOVED:
+                    to_free -= size
+                    evicted.append(variant)
+                    if logger:
+                        logger.info("Evicted variant %s from cache (%d bytes)",
+                                    variant.uri, size)
 
-        return variant_size
+        if evicted:
+            self._record_stats(evictions=len(evicted))
+
+        self._delete_removed_variants(logger)
+        return evicted
 
     def cache_near_full(self):
         """ Get the cache available space
@@ -184,13 +392,15 @@ class PackageCache(object):
         _, _, free = shutil.disk_usage(self.path)
         return free < config.package_cache_space_buffer
 
-    def variant_meets_space_requirements(self, rez_variant_root):
+    def variant_meets_space_requirements(self, rez_variant_root, variant=None):
         """Check if the cache usage is above config.package_cache_used_threshold.
         If it is, start throttling the cache by checking each variants size to make sure
         it's not going to take the cache size below the minimum buffer we set.
 
         Args:
             variant_root: The rez resolved variant root.
+            variant (`Variant`): The variant. If given, its recorded payload
+                size is used (see `get_variant_payload_size`).
 
         Returns:
             bool:
@@ -201,7 +411,10 @@ class PackageCache(object):
         used_percentage = (used / total) * 100 if total else 0.0
 
         if used_percentage > config.package_cache_used_threshold:
-            variant_size = self.get_variant_size(free, rez_variant_root)
+            if variant is not None:
+                variant_size = self.get_variant_payload_size(variant)
+            else:
+                variant_size = self.get_variant_size(free, rez_variant_root)
             return (free - variant_size) > config.package_cache_space_buffer
 
         return True
@@ -221,8 +434,18 @@ class PackageCache(object):
         4. The file '/<cache_dir>/foo/1.0.0/af8d/a.json' is created. Now
            another proc/thread can't create the same local variant;
         5. The file lock is released;
-        6. The variant payload is copied to '/<cache_dir>/foo/1.0.0/af8d/a';
-        7. The '.copying-a' file is removed.
+        6. The variant payload is copied to '/<cache_dir>/foo/1.0.0/af8d/a'.
+           Each copied file is recorded in '/<cache_dir>/foo/1.0.0/af8d/.manifest-a'.
+           In 'lazy' :data:`package_cache_copy_mode`, files are symlinked
+           rather than copied (see `record_access`);
+        7. The '.copying-a' and '.manifest-a' files are removed;
+        8. The variant is added to the cache index ('/<cache_dir>/.sys/index.json').
+
+        If :data:`package_cache_resume_copies` is True, a stalled copy (see
+        `VARIANT_COPY_STALLED`) is resumed, rather than left for `clean` to
+        remove, unless the process that created its '.copying-a' file is still
+        running on this host. Steps 2-5 then take over the '.copying-a' file,
+        and files in the manifest are not copied again.
 
         Note that the variant will not be cached in the following circumstances,
         unless `force` is True:
@@ -299,10 +522,13 @@ class PackageCache(object):
                     % package.repository
                 )
 
+        resume_copies = config.package_cache_resume_copies
+
         no_op_statuses = {
             self.VARIANT_FOUND,
-            self.VARIANT_COPY_STALLED,
         }
+        if not resume_copies:
+            no_op_statuses.add(self.VARIANT_COPY_STALLED)
         if not wait_for_copying:
             # Copying variants are only no-ops if we want to ignore them.
             no_op_statuses.add(self.VARIANT_COPYING)
@@ -337,7 +563,9 @@ class PackageCache(object):
 
         # Block adding new variant to cache from rez-pkg-cache --add-variants
         # if the cache size is almost full.
-        if self.cache_near_full() or not self.variant_meets_space_requirements(variant_root):
+        if self.cache_near_full() or \
+                not self.variant_meets_space_requirements(variant_root, variant):
+            self._record_stats(skipped=1)
             return (rootpath, self.VARIANT_SKIPPED)
 
         # 1.
@@ -362,26 +590,41 @@ class PackageCache(object):
             if status in no_op_statuses:
                 return (rootpath, status)
 
-            # determine next increment name ('a', 'b' etc)
-            names = os.listdir(path)
-            names = [x for x in names if x.endswith(".json")]
+            if status == self.VARIANT_COPY_STALLED:
+                path, incname = os.path.split(rootpath)
+                copying_filepath = os.path.join(path, ".copying-" + incname)
+
+                # the copying process may still be running, just slowly
+                if self._is_copying_owner_alive(copying_filepath):
+                    return (rootpath, self.VARIANT_COPYING)
+
+                # take over the stalled copy. Rewriting its .copying file marks
+                # it as actively copying again.
+                self._write_copying_owner(copying_filepath)
 
-            if names:
-                prev = os.path.splitext(max(names))[0]
+                if logger:
+                    logger.info("Resuming stalled copy of %s to %s",
+                                variant.qualified_name, rootpath)
             else:
-                prev = None
+                # determine next increment name ('a', 'b' etc)
+                names = os.listdir(path)
+                names = [x for x in names if x.endswith(".json")]
 
-            incname = get_next_base26(prev)
+                if names:
+                    prev = os.path.splitext(max(names))[0]
+                else:
+                    prev = None
 
-            # 3.
-            copying_filepath = os.path.join(path, ".copying-" + incname)
-            with open(copying_filepath, 'w'):
-                pass
+                incname = get_next_base26(prev)
 
-            # 4.
-            json_filepath = os.path.join(path, incname + ".json")
-            with open(json_filepath, 'w') as f:
-                f.write(json.dumps(data))
+                # 3.
+                copying_filepath = os.path.join(path, ".copying-" + incname)
+                self._write_copying_owner(copying_filepath)
+
+                # 4.
+                json_filepath = os.path.join(path, incname + ".json")
+                with open(json_filepath, 'w') as f:
+                    f.write(json.dumps(data))
 
         # 6.
         #
@@ -400,18 +643,31 @@ class PackageCache(object):
                     pass
 
         rootpath = os.path.join(path, incname)
+        manifest_filepath = os.path.join(path, ".manifest-" + incname)
+
         th = threading.Thread(target=_while_copying)
         th.daemon = True
         th.start()
+        t = time.time()
 
         try:
-            shutil.copytree(variant_root, rootpath)
+            size, bytes_copied = self._copy_variant_payload(
+                variant, variant_root, rootpath, manifest_filepath)
+            self._set_cached_variant_size(rootpath, size)
         finally:
             still_copying = False
 
+        self._record_stats(copies=1, bytes_copied=bytes_copied,
+                           copy_time=(time.time() - t))
+
         # 7.
         th.join()
         os.remove(copying_filepath)
+        safe_remove(manifest_filepath)
+
+        # 8.
+        with self._lock():
+            self._update_index(variant, rootpath)
 
         return (rootpath, self.VARIANT_CREATED)
 
@@ -431,9 +687,20 @@ class PackageCache(object):
             - VARIANT_NOT_FOUND
             - VARIANT_COPYING
         """
+        status, _ = self._remove_variant(variant)
+        return status
+
+    def _remove_variant(self, variant):
+        """See `remove_variant`.
+
+        Returns:
+            2-tuple:
+            - int: Status, as returned by `remove_variant`;
+            - str: Path the payload was moved to in the to_delete dir, or None.
+        """
         status, rootpath = self._get_cached_root(variant)
         if status in (self.VARIANT_NOT_FOUND, self.VARIANT_COPYING):
-            return status
+            return (status, None)
 
         # If we got here, it's either a cached variant, or is stalled. In either
         # case, we get the lock, and remove all associated files. The payload
@@ -441,6 +708,8 @@ class PackageCache(object):
         # when clean() is called.
         #
         with self._lock():
+            self._update_index(variant, None)
+
             # move the payload
             dest_filename = variant.parent.qualified_name + '-' + uuid4().hex
             dest_rootpath = os.path.join(self._remove_dir, dest_filename)
@@ -457,7 +726,7 @@ class PackageCache(object):
             except OSError as e:
                 if e.errno == errno.ENOENT:
                     # another proc may have just removed it
-                    return self.VARIANT_NOT_FOUND
+                    return (self.VARIANT_NOT_FOUND, None)
                 raise
 
             # delete json file
@@ -466,10 +735,14 @@ class PackageCache(object):
             if os.path.exists(filepath):
                 os.remove(filepath)
 
-            # delete .copying file
-            filepath = os.path.join(path, ".copying-" + incname)
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            # delete .copying and .manifest files
+            for prefix in (".copying-", ".manifest-"):
+                filepath = os.path.join(path, prefix + incname)
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+
+            # delete the payload size record, see `get_variant_payload_size`
+            safe_remove(os.path.join(self._sizes_dir, self._get_variant_key(variant)))
 
             # delete any dirs that are now empty
             for _ in range(3):  # hash-dir, version-dir, pkg-dir
@@ -479,7 +752,7 @@ class PackageCache(object):
                     break  # not empty
                 path = os.path.dirname(path)
 
-        return self.VARIANT_REMOVED
+        return (self.VARIANT_REMOVED, dest_rootpath)
 
     def add_variants_async(self, variants):
         """Update the package cache by adding some or all of the given variants.
@@ -511,6 +784,8 @@ class PackageCache(object):
         cachable_statuses = {
             self.VARIANT_NOT_FOUND,
         }
+        if config.package_cache_resume_copies:
+            cachable_statuses.add(self.VARIANT_COPY_STALLED)
         if not package_cache_async:
             # We want to monitor copying variants if we're synchronous.
             # We also want to report that a status has been stalled, so we'll
@@ -533,46 +808,182 @@ class PackageCache(object):
         if not variants_ and config.package_cache_clean_limit < 0:
             return
 
-        # Write each variant out to a file in the 'pending' dir in the cache. A
-        # separate proc reads these files and then performs the actual variant
-        # copy. Note that these files are unique, in case two rez procs attempt
-        # to write out the same pending variant file at the same time.
-        #
-        pending_filenames = os.listdir(self._pending_dir)
+        self._queue_variants(variants_)
 
-        for variant in variants_:
-            prefix = variant.parent.qualified_name + '-'
-            handle_dict = variant.handle.to_dict()
-            already_pending = False
+        if package_cache_async:
+            self._subprocess_package_caching_daemon(self.path)
+        else:
+            # syncronous caching
+            self._run_caching_operation(wait_for_copying=True)
 
-            # check if this variant is already pending
-            for filename in pending_filenames:
-                if filename.startswith(prefix):
-                    filepath = os.path.join(self._pending_dir, filename)
-                    try:
-                        with open(filepath) as f:
-                            data = json.loads(f.read())
-                    except:
-                        continue  # maybe file was just deleted
+    def prefetch_variants(self, variants, limit=None, package_cache_async=True):
+        """Add the most used of the given variants to the cache.
 
-                    if data == handle_dict:
-                        already_pending = True
-                        break
+        This is used to warm the cache ahead of time, from a record of the
+        variants used by recent contexts (see :option:`rez-pkg-cache --prefetch`).
+        Variants that appear more often in `variants` are queued first, and
+        also get a higher priority in the pending queue (see
+        `_get_pending_queue`). Of equally used variants within `limit`, the
+        smallest are queued first.
+
+        Args:
+            variants (list of `Variant`): Variants to cache. A variant is
+                expected to appear once per use.
+            limit (int): If set, queue at most this many variants.
+            package_cache_async (bool): As for `add_variants`.
+
+        Returns:
+            list of `Variant`: Queued variants, in the order they were queued.
+        """
+        # see add_variants
+        if package_cache_async and not system.is_production_rez_install:
+            raise PackageCacheError(
+                "Asynchronous PackageCache.prefetch_variants is only supported "
+                "in a production rez installation."
+            )
+
+        counts = {}
+        for variant in variants:
+            counts[variant] = counts.get(variant, 0) + 1
+
+        cachable_statuses = {
+            self.VARIANT_NOT_FOUND,
+        }
+        if config.package_cache_resume_copies:
+            cachable_statuses.add(self.VARIANT_COPY_STALLED)
 
-            if already_pending:
+        variants_ = []
+        for variant in counts:
+            if not variant.parent.is_cachable:
                 continue
 
-            filename = prefix + uuid4().hex + ".json"
-            filepath = os.path.join(self._pending_dir, filename)
-            with open(filepath, 'w') as f:
-                f.write(json.dumps(handle_dict))
+            status, _ = self._get_cached_root(variant)
+            if status in cachable_statuses:
+                variants_.append(variant)
+
+        # Payload sizes may have to be measured, which can mean walking the
+        # payload over the network, so only those within the limit are used
+        def _key(variant):
+            return (-counts[variant], self.get_variant_payload_size(variant))
+
+        variants_ = sorted(variants_, key=lambda x: -counts[x])[:limit]
+        if not variants_:
+            return []
+
+        variants_ = sorted(variants_, key=_key)
+
+        self._queue_variants(variants_, request_counts=counts)
 
         if package_cache_async:
             self._subprocess_package_caching_daemon(self.path)
         else:
-            # syncronous caching
             self._run_caching_operation(wait_for_copying=True)
 
+        return variants_
+
+    def record_access(self, filepaths, package_cache_async=True):
+        """Record that files of lazily cached variants have been accessed.
+
+        When :data:`package_cache_copy_mode` is 'lazy', the files of a cached
+        variant are symlinks to the files of the original variant. Accessed
+        files are then copied into the cache by the caching daemon (see
+        `materialize`), so that they are read from local disk from then on.
+
+        Args:
+            filepaths (list of str): Accessed files, under cached variant
+                roots. A directory means all of the files under it. Other
+                paths are ignored.
+            package_cache_async (bool): As for `add_variants`.
+
+        Returns:
+            list of str: Paths that were recorded.
+        """
+        # see add_variants
+        if package_cache_async and not system.is_production_rez_install:
+            raise PackageCacheError(
+                "Asynchronous PackageCache.record_access is only supported "
+                "in a production rez installation."
+            )
+
+        filepaths = [
+            os.path.abspath(x) for x in filepaths
+            if self._get_rootpath_of(x)
+        ]
+
+        if not filepaths:
+            return []
+
+        # as for stats, appends are atomic so no lock is needed
+        with open(self._access_log_filepath, 'a') as f:
+            f.write(''.join(x + '\n' for x in filepaths))
+
+        if package_cache_async:
+            self._subprocess_package_caching_daemon(self.path)
+        else:
+            self.materialize()
+
+        return filepaths
+
+    def materialize(self, logger=None):
+        """Copy the accessed files of lazily cached variants into the cache.
+
+        Each file recorded by `record_access` that is still a symlink to the
+        original variant is copied, and replaces the symlink atomically. This
+        is done by the caching daemon (:option:`rez-pkg-cache --daemon`).
+
+        Args:
+            logger (`logging.Logger`): Logger to report copies to.
+
+        Returns:
+            int: Number of bytes copied.
+        """
+        taken_filepath = "%s.%s" % (self._access_log_filepath, uuid4().hex)
+
+        # take the log, so that accesses recorded from now on start a new one
+        try:
+            os.rename(self._access_log_filepath, taken_filepath)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return 0
+            raise
+
+        try:
+            with open(taken_filepath) as f:
+                paths = set(x.rstrip('\n') for x in f if x.strip())
+        finally:
+            safe_remove(taken_filepath)
+
+        sizes = {}  # cached variant root -> bytes copied
+
+        for path in sorted(paths):
+            rootpath = self._get_rootpath_of(path)
+            if not rootpath:
+                continue
+
+            for filepath in self._iter_stub_files(path):
+                try:
+                    size = self._materialize_file(filepath)
+                except (IOError, OSError, shutil.Error) as e:
+                    # eg the variant is being removed
+                    if logger:
+                        logger.warning("Could not materialize %s: %s", filepath, e)
+                    continue
+
+                if logger:
+                    logger.info("Materialized %s (%d bytes)", filepath, size)
+                sizes[rootpath] = sizes.get(rootpath, 0) + size
+
+        for rootpath, size in sizes.items():
+            if os.path.exists(rootpath + ".json"):
+                size += self._get_cached_variant_size(rootpath)
+                self._set_cached_variant_size(rootpath, size)
+
+        total = sum(sizes.values())
+        if total:
+            self._record_stats(bytes_copied=total)
+
+        return total
+
     @staticmethod
     def _subprocess_package_caching_daemon(path):
         """
@@ -635,8 +1046,6 @@ class PackageCache(object):
               - VARIANT_COPY_STALLED
               - VARIANT_PENDING
         """
-        from rez.packages import get_variant
-
         statuses = (
             self.VARIANT_FOUND,
             self.VARIANT_COPYING,
@@ -647,30 +1056,10 @@ class PackageCache(object):
         seen_variants = set()
 
         # find variants in cache
-        for pkg_name in safe_listdir(self.path):
-            if pkg_name.startswith('.'):
-                continue  # dirs for internal cache use
-
-            path1 = os.path.join(self.path, pkg_name)
-
-            for ver_str in safe_listdir(path1):
-                path2 = os.path.join(path1, ver_str)
-
-                for hash_str in safe_listdir(path2):
-                    path3 = os.path.join(path2, hash_str)
-
-                    for name in safe_listdir(path3):
-                        if name.endswith(".json"):
-                            with open(os.path.join(path3, name)) as f:
-                                data = json.loads(f.read())
-
-                            handle = data["handle"]
-                            variant = get_variant(handle)
-
-                            status, rootpath = self._get_cached_root(variant)
-                            if status in statuses:
-                                results.append((variant, rootpath, status))
-                                seen_variants.add(variant)
+        for variant, rootpath, status, _, _ in self._scan_cached_variants():
+            if status in statuses:
+                results.append((variant, rootpath, status))
+                seen_variants.add(variant)
 
         # find pending variants
         pending_filenames = os.listdir(self._pending_dir)
@@ -717,11 +1106,17 @@ class PackageCache(object):
     def _run_caching_operation(self, wait_for_copying=True):
         """Copy pending variants.
 
+        Up to :data:`package_cache_workers` variants are copied at once. Pending
+        variants are copied in priority order (see `_get_pending_queue`).
+
         Args:
             wait_for_copying (bool): Whether the caching step should block when one of the
                 pending variants is marked as already copying.
         """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
         logger = self._init_logging()
+        num_workers = max(1, config.package_cache_workers)
 
         # somewhere for the daemon to store stateful info
         state = {
@@ -729,15 +1124,59 @@ class PackageCache(object):
         }
 
         # copy variants into cache
+        in_flight = {}  # future -> pending filename
+        keep_running = True
+
         try:
-            while True:
-                keep_running = self._run_caching_step(state, wait_for_copying=wait_for_copying)
-                if not keep_running:
-                    break
+            with self._batch_index_updates(), \
+                    ThreadPoolExecutor(max_workers=num_workers) as executor:
+                while True:
+                    # make room for hot variants, if a watermark is configured
+                    if keep_running:
+                        self.evict(logger)
+
+                    # Keep the cache daemon alive until the cache size reaches
+                    # its min threshold.
+                    if keep_running and self.cache_near_full():
+                        logger.info(
+                            "Cache storage has reached the configured threshold of "
+                            f"{config.package_cache_space_buffer / 1024**2:.2f}MB, "
+                            "caching will now stop."
+                        )
+                        keep_running = False
+
+                    if keep_running and len(in_flight) < num_workers:
+                        queue = self._get_pending_queue(
+                            state,
+                            wait_for_copying=wait_for_copying,
+                            exclude=in_flight.values()
+                        )
+
+                        for filename in queue[:num_workers - len(in_flight)]:
+                            future = executor.submit(
+                                self._cache_pending_variant, state, filename,
+                                wait_for_copying=wait_for_copying
+                            )
+                            in_flight[future] = filename
+
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del in_flight[future]
+                        future.result()
+
         except Exception:
             logger.exception("An error occurred while adding variants to the cache")
             raise
 
+        # copy accessed files of lazily cached variants
+        try:
+            self.materialize(logger)
+        except Exception:
+            logger.exception("An error occurred while materializing cached files")
+
         # do some cleanup
         if config.package_cache_clean_limit > 0:
             try:
@@ -754,7 +1193,11 @@ class PackageCache(object):
 
         - Variants that have not been used in more than 'config.package_cache_max_variant_days' days;
         - Variants that have stalled;
+        - Least recently used variants, if the cache is above
+          :data:`package_cache_high_watermark` (see `evict`);
         - Variants that are already pending deletion (remove_variant() was used).
+        - Payload size records (see `get_variant_payload_size`) that have not
+          been written in more than 'config.package_cache_max_variant_days' days.
 
         Args:
             time_limit (float): Perform cleaning operations only up until this
@@ -763,8 +1206,6 @@ class PackageCache(object):
                 run 'rez-pkg-cache --clean'.
         """
         logger = self._init_logging()
-        unused_variants = []
-        stalled_variants = []
         now = time.time()
 
         def should_exit():
@@ -773,36 +1214,77 @@ class PackageCache(object):
                 and (time.time() - now) > time_limit
             )
 
+        # fold appended stats into their totals, so the stats log stays small
+        try:
+            with self._lock():
+                self._compact_stats()
+        except LockError:
+            pass  # not critical, done on a later clean
+
+        self._clean_size_records(now)
+
+        # the index is rewritten once, for all the variants removed below
+        with self._batch_index_updates():
+            self._clean_variants(logger, now, time_limit, should_exit)
+
+    def _clean_size_records(self, now):
+        """See `clean`.
+
+        Records of cached variants are also removed with the variant (see
+        `remove_variant`), so these are mostly records of variants that were
+        measured, but never cached.
+        """
+        max_secs = config.package_cache_max_variant_days * 3600 * 24
+        if max_secs == 0:
+            return  # 0 means no age limit
+
+        for name in safe_listdir(self._sizes_dir):
+            filepath = os.path.join(self._sizes_dir, name)
+            try:
+                if now - os.path.getmtime(filepath) > max_secs:
+                    os.remove(filepath)
+            except OSError:
+                pass  # may have just been removed
+
+    def _clean_variants(self, logger, now, time_limit, should_exit):
+        """See `clean`."""
+        unused_variants = []
+        stalled_variants = []
+
         # find variants to delete
-        for variant, rootpath, status in self.get_variants():
+        max_secs = config.package_cache_max_variant_days * 3600 * 24
+
+        for variant, _, status, mtime, size in self._scan_cached_variants():
             if status == self.VARIANT_FOUND:
-                max_secs = config.package_cache_max_variant_days * 3600 * 24
                 if max_secs == 0:
                     continue  # 0 means no age limit on unused variants
 
                 # determine how long since cached variant has been used
-                json_filepath = rootpath + ".json"
-                try:
-                    st = os.stat(json_filepath)
-                except:
-                    # may have just been deleted
-                    continue
-
-                since = int(now - st.st_mtime)
+                since = int(now - mtime)
                 if since > max_secs:
-                    unused_variants.append(variant)
+                    unused_variants.append((variant, since, size or 0))
 
             elif status == self.VARIANT_COPY_STALLED:
                 stalled_variants.append(variant)
 
-        # remove unused variants. This puts them in our to_delete dir
-        for variant in unused_variants:
-            status = self.remove_variant(variant)
-            if status == self.VARIANT_REMOVED:
-                logger.info("Removed unused variant %s from cache", variant.uri)
+        # When time limited, remove the largest and stalest variants first, so
+        # that a short time limit frees the most space. Variants with no
+        # recorded size are not measured here, so they come last.
+        if time_limit is not None:
+            unused_variants.sort(key=lambda x: (x[2] * x[1], x[1]), reverse=True)
+
+        # remove unused variants. Each is moved into our to_delete dir, then
+        # deleted while the next is being removed.
+        def _remove_unused():
+            for variant, _, _ in unused_variants:
+                status, dest_rootpath = self._remove_variant(variant)
+                if status == self.VARIANT_REMOVED:
+                    logger.info("Removed unused variant %s from cache", variant.uri)
+                    self._record_stats(evictions=1)
+                    yield dest_rootpath
 
-            if should_exit():
-                return
+        if not self._delete_removed_variants(logger, should_exit, _remove_unused()):
+            return
 
         # Remove stalled variants. This puts them in our to_delete dir.
         #
@@ -817,54 +1299,678 @@ class PackageCache(object):
                     logger.info(
                         "Removed stalled variant %s from cache", variant.uri)
 
+        if should_exit():
+            return
+
+        # evict least recently used variants. This also empties to_delete dir
+        self.evict(logger)
+
         # delete everything in to_delete dir
-        for name in os.listdir(self._remove_dir):
-            path = os.path.join(self._remove_dir, name)
+        self._delete_removed_variants(logger, should_exit)
 
-            try:
-                forceful_rmtree(path)
-            except Exception as e:
-                logger.warning("Could not delete %s: %s", path, e)
-                continue
+    def _delete_removed_variants(self, logger=None, should_exit=None, paths=None):
+        """Delete everything in the to_delete dir.
 
-            logger.info("Deleted %s", path)
-            if should_exit():
-                return
+        Up to :data:`package_cache_clean_workers` directories are deleted at
+        once, and no more than :data:`package_cache_clean_rate` deletions are
+        started per second.
 
-    @contextmanager
-    def _lock(self):
-        lock_filepath = os.path.join(self._sys_dir, ".lock")
-        lock = LockFile(lock_filepath)
+        Args:
+            paths (iterable of str): Paths in the to_delete dir to delete
+                first, in order. May be a generator, which is not consumed any
+                further once `should_exit` returns True.
 
-        try:
-            lock.acquire(timeout=self._FILELOCK_TIMEOUT)
-            yield
+        Returns:
+            bool: False if `should_exit` stopped the deletion early.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        num_workers = max(1, config.package_cache_clean_workers)
+        rate = config.package_cache_clean_rate
+
+        def _iter_paths():
+            seen = set()
+            for path in (paths or []):
+                seen.add(path)
+                yield path
+
+            for name in safe_listdir(self._remove_dir):
+                path = os.path.join(self._remove_dir, name)
+                if path not in seen:
+                    yield path
+
+        def _finish(futures):
+            for future in futures:
+                path = in_flight.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    if logger:
+                        logger.warning("Could not delete %s: %s", path, e)
+                    continue
+
+                if logger:
+                    logger.info("Deleted %s", path)
+
+        in_flight = {}  # future -> path
+        start = time.time()
+        completed = True
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for i, path in enumerate(_iter_paths()):
+                if rate > 0:
+                    delay = start + (i / rate) - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                if len(in_flight) >= num_workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _finish(done)
+
+                in_flight[executor.submit(forceful_rmtree, path)] = path
+
+                if should_exit and should_exit():
+                    completed = False
+                    break
+
+            _finish(wait(in_flight).done)
+
+        return completed
+
+    @contextmanager
+    def _lock(self):
+        lock_filepath = os.path.join(self._sys_dir, ".lock")
+        lock = LockFile(lock_filepath)
+
+        try:
+            lock.acquire(timeout=self._FILELOCK_TIMEOUT)
+            yield
         finally:
             try:
                 lock.release()
             except NotLocked:
                 pass
 
-    def _run_caching_step(self, state, wait_for_copying=False):
-        logger = state["logger"]
+    def _copy_variant_payload(self, variant, variant_root, rootpath,
+                              manifest_filepath):
+        """Copy a variant's payload, according to `package_cache_copy_mode`.
 
-        # Keep the cache daemon alive until the cache size reaches its min threshold.
-        if self.cache_near_full():
-            logger.info(
-                "Cache storage has reached the configured threshold of "
-                f"{config.package_cache_space_buffer / 1024**2:.2f}MB, caching will now stop."
-            )
-            return False
+        Copied files are recorded in the manifest file, and files already
+        recorded there (by a copy that has since stalled) are skipped.
+
+        Returns:
+            2-tuple:
+            - int: Total size of the payload files in the cache, in bytes.
+              This is zero in 'lazy' mode, since no files are copied;
+            - int: Bytes actually copied. This excludes files that were linked,
+              or skipped because a stalled copy had already copied them.
+        """
+        mode = config.package_cache_copy_mode
+        if mode in ("copy", "lazy"):
+            cached_files = {}
+        else:
+            cached_files = self._get_cached_family_files(variant)
+
+        manifest = _CopyManifest(
+            manifest_filepath,
+            checksums=(config.package_cache_verify_checksums and mode != "lazy")
+        )
+
+        try:
+            self._copytree(variant_root, rootpath, manifest, cached_files, mode)
+        finally:
+            manifest.close()
+
+        return (manifest.size, manifest.bytes_copied)
+
+    def _get_cached_family_files(self, variant):
+        """Get the files of cached variants in the same family as `variant`.
+
+        Returns:
+            dict: (size, mtime_ns, filepath) tuples, keyed by path relative to
+            the variant root. Files from later package versions take
+            precedence, since they are most likely to match.
+        """
+        from rez.version import Version
+
+        family_path = os.path.join(self.path, variant.name)
+        rootpaths = []
+
+        for ver_str in safe_listdir(family_path):
+            path1 = os.path.join(family_path, ver_str)
+            try:
+                version = Version(ver_str)
+            except Exception:
+                version = Version()  # eg "_NO_VERSION"
+
+            for hash_str in safe_listdir(path1):
+                path2 = os.path.join(path1, hash_str)
+                names = safe_listdir(path2)
+
+                for name in names:
+                    incname, ext = os.path.splitext(name)
+                    if ext != ".json" or ".copying-" + incname in names:
+                        continue
+
+                    rootpath = os.path.join(path2, incname)
+                    if os.path.isdir(rootpath):
+                        rootpaths.append((version, rootpath))
+
+        rootpaths.sort(key=lambda x: x[0], reverse=True)
+        files = {}
+
+        for _, rootpath in rootpaths:
+            for dirpath, _, filenames in os.walk(rootpath):
+                for filename in filenames:
+                    filepath = os.path.join(dirpath, filename)
+                    relpath = os.path.relpath(filepath, rootpath)
+                    if relpath in files:
+                        continue
+
+                    try:
+                        st = os.lstat(filepath)
+                    except OSError:
+                        continue  # variant may be being removed
+
+                    if stat.S_ISREG(st.st_mode):
+                        files[relpath] = (st.st_size, st.st_mtime_ns, filepath)
+
+        return files
+
+    def _copytree(self, src, dst, manifest, cached_files, mode, relpath=''):
+        """Copy a directory tree into the cache.
+
+        Files that match a cached file (see `_get_cached_family_files`) are
+        linked, if `mode` is 'hardlink' or 'reflink'. If `mode` is 'lazy',
+        each file is instead symlinked to its source (see `materialize`).
+        Like `shutil.copytree`, symlinks are followed.
+        """
+        if os.path.isdir(dst):
+            # resuming a copy. The dir's perms are restored by copystat below
+            st = os.stat(dst)
+            if not st.st_mode & stat.S_IWUSR:
+                os.chmod(dst, st.st_mode | stat.S_IWUSR)
+        else:
+            os.makedirs(dst)
+
+        errors = []
+
+        for entry in os.scandir(src):
+            srcname = entry.path
+            dstname = os.path.join(dst, entry.name)
+            relname = os.path.join(relpath, entry.name)
+
+            try:
+                if entry.is_dir():
+                    self._copytree(srcname, dstname, manifest, cached_files,
+                                   mode, relname)
+                    continue
+
+                st = entry.stat()
+                if mode != "lazy":
+                    manifest.size += st.st_size
+
+                if manifest.is_copied(relname, st, dstname):
+                    continue
+
+                if manifest.resumed:
+                    safe_remove(dstname)  # may be partially copied
+
+                cached = cached_files.get(relname)
+
+                if mode == "lazy":
+                    os.symlink(os.path.abspath(srcname), dstname)
+                elif cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+                    cached_filepath = cached[2]
+                    try:
+                        if mode == "reflink":
+                            reflink_file(cached_filepath, dstname)
+                        else:
+                            os.link(cached_filepath, dstname)
+                    except OSError:
+                        # still avoids reading the file from the variant root
+                        shutil.copy2(cached_filepath, dstname)
+                        manifest.bytes_copied += st.st_size
+                else:
+                    shutil.copy2(srcname, dstname)
+                    manifest.bytes_copied += st.st_size
+
+                manifest.add(relname, st, dstname)
+
+            except OSError as why:
+                errors.append((srcname, dstname, str(why)))
+            except shutil.Error as err:
+                errors.extend(err.args[0])
+
+        try:
+            shutil.copystat(src, dst)
+        except OSError as why:
+            errors.append((src, dst, str(why)))
+
+        if errors:
+            raise shutil.Error(errors)
+
+    def _get_rootpath_of(self, path):
+        """Get the cached variant root that a path is under.
+
+        Returns:
+            str: Cached variant root path (which may not exist), or None if
+            `path` is not under a variant root in this cache.
+        """
+        relpath = os.path.relpath(os.path.abspath(path), os.path.abspath(self.path))
+        parts = relpath.split(os.sep)
+
+        # <pkg>/<version>/<hash>/<incname>[/...]
+        if len(parts) < 4 or parts[0] == os.pardir or parts[0].startswith('.'):
+            return None
+
+        return os.path.join(self.path, *parts[:4])
+
+    def _iter_stub_files(self, path):
+        """Iterate over the symlinked files of a lazily cached variant.
+
+        Since `_copytree` follows symlinks, any symlink in a cached variant
+        is a file not yet copied by `materialize`.
+        """
+        if os.path.islink(path):
+            yield path
+            return
+
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                filepath = os.path.join(dirpath, filename)
+                if os.path.islink(filepath):
+                    yield filepath
+
+    def _materialize_file(self, filepath):
+        """Replace a symlinked file in a cached variant with a copy.
+
+        Returns:
+            int: Size of the copied file, in bytes.
+        """
+        target = os.readlink(filepath)
+        dirpath, filename = os.path.split(filepath)
+        tmp_filepath = os.path.join(dirpath, ".%s.%s.tmp" % (filename, uuid4().hex))
+
+        # dir may have been made read-only by copystat, see _copytree
+        st = os.stat(dirpath)
+        writable = st.st_mode & stat.S_IWUSR
+        if not writable:
+            os.chmod(dirpath, st.st_mode | stat.S_IWUSR)
+
+        try:
+            shutil.copy2(target, tmp_filepath)
+            os.replace(tmp_filepath, filepath)
+        finally:
+            safe_remove(tmp_filepath)
+            if not writable:
+                os.chmod(dirpath, st.st_mode)
+
+        return os.path.getsize(filepath)
+
+    def _get_cached_variant_size(self, rootpath):
+        """Get the size of a cached variant payload, in bytes.
+
+        The size is recorded in the variant's json file when it is copied. For
+        variants cached before sizes were recorded, the payload is measured,
+        and the size recorded.
+        """
+        try:
+            with open(rootpath + ".json") as f:
+                size = json.loads(f.read()).get("size")
+        except (IOError, ValueError):
+            size = None
+
+        if size is None:
+            size = self.get_variant_size(float("inf"), rootpath)
+            self._set_cached_variant_size(rootpath, size)
+
+        return size
+
+    def _set_cached_variant_size(self, rootpath, size):
+        """Record the size of a cached variant payload in its json file.
+
+        The json file is replaced atomically, since it is read concurrently by
+        other processes. Its mtime is kept, since it records when the variant
+        was last used.
+        """
+        json_filepath = rootpath + ".json"
+        path, filename = os.path.split(json_filepath)
+        tmp_filepath = os.path.join(path, ".%s.%s.tmp" % (filename, uuid4().hex))
+
+        try:
+            with open(json_filepath) as f:
+                data = json.loads(f.read())
+            st = os.stat(json_filepath)
+
+            data["size"] = size
+            with open(tmp_filepath, 'w') as f:
+                f.write(json.dumps(data))
+
+            os.utime(tmp_filepath, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp_filepath, json_filepath)
+
+        except (IOError, OSError, ValueError):
+            # may have just been removed, the size is not critical
+            safe_remove(tmp_filepath)
+
+    def _add_stats(self, **counts):
+        with self._stats_lock:
+            for name, value in counts.items():
+                self._stats[name] = self._stats.get(name, 0) + value
+
+    def _record_stats(self, **counts):
+        self._add_stats(**counts)
+        self.flush_stats()
+
+    def _read_stats_files(self):
+        """Read totals and appended counters from the stats files.
+
+        Returns:
+            list of dict: Counters.
+        """
+        stats = []
+
+        try:
+            with open(self._stats_filepath) as f:
+                stats.append(json.loads(f.read()))
+        except (IOError, ValueError):
+            pass
+
+        try:
+            with open(self._stats_log_filepath) as f:
+                lines = f.readlines()
+        except IOError:
+            lines = []
+
+        for line in lines:
+            try:
+                stats.append(json.loads(line))
+            except ValueError:
+                continue  # line may be partially written
+
+        return stats
+
+    def _compact_stats(self):
+        """Fold appended counters into the stats totals file.
+
+        This must be called with the cache lock held.
+        """
+        if not os.path.exists(self._stats_log_filepath):
+            return
+
+        stats = self.get_stats()
+        totals = dict((k, stats[k]) for k in self.STAT_NAMES)
+
+        # Appends made between reading and removing the log are lost. This is
+        # acceptable, and a lot simpler than coordinating with writers.
+        tmp_filepath = "%s.%s.tmp" % (self._stats_filepath, uuid4().hex)
+
+        try:
+            with open(tmp_filepath, 'w') as f:
+                f.write(json.dumps(totals))
+            os.replace(tmp_filepath, self._stats_filepath)
+            os.remove(self._stats_log_filepath)
+        finally:
+            safe_remove(tmp_filepath)
+
+    def _get_variant_key(self, variant):
+        h = sha1(str(variant.handle._hashable_repr()).encode('utf-8'))
+        return h.hexdigest()
+
+    def _read_index(self, reload=False):
+        """Read the cache index.
+
+        The index maps variants to their cached roots, so that `get_cached_root`
+        does not need to search the variant's hash dir. It is read once per
+        `PackageCache` instance, unless `reload` is True.
+
+        Returns:
+            dict: Variant key (see `_get_variant_key`) to 2-tuple:
+            - str: Cached root, relative to the cache root;
+            - int: Inode of the cached variant's json file.
+        """
+        if self._index is None or reload:
+            try:
+                with open(self._index_filepath) as f:
+                    self._index = json.loads(f.read())
+            except (IOError, ValueError):
+                self._index = {}
+
+        return self._index
+
+    def _get_indexed_root(self, variant):
+        """Get a variant's cached root from the index.
+
+        The variant's json file is checked against the index entry, so an
+        entry that is out of date (for example, the variant was removed by an
+        older rez) is ignored.
+
+        Returns:
+            str: Cached variant root, or None if the variant is not indexed.
+        """
+        entry = self._read_index().get(self._get_variant_key(variant))
+        if entry is None:
+            return None
+
+        relpath, inode = entry
+        rootpath = os.path.join(self.path, relpath)
+
+        try:
+            st = os.stat(rootpath + ".json")
+        except OSError:
+            return None
+
+        if st.st_ino != inode:
+            return None
+
+        return rootpath
+
+    def _update_index(self, variant, rootpath):
+        """Add a variant to the cache index, or remove it if `rootpath` is None.
+
+        The index is replaced atomically, so readers never see a partially
+        written index. This must be called with the cache lock held. Within
+        `_batch_index_updates`, the update is written at the end of the batch
+        instead.
+        """
+        key = self._get_variant_key(variant)
+
+        if rootpath is None:
+            entry = None
+        else:
+            st = os.stat(rootpath + ".json")
+            entry = [os.path.relpath(rootpath, self.path), st.st_ino]
+
+        updates = self._index_updates
+        if updates is not None:
+            updates[key] = entry
+        else:
+            self._write_index_updates({key: entry})
+
+    def _write_index_updates(self, updates):
+        """Apply updates to the cache index.
+
+        The index is only rewritten if an entry changed. This must be called
+        with the cache lock held.
+
+        Args:
+            updates (dict): Variant key to index entry, or None to remove the
+                variant from the index.
+        """
+        index = self._read_index(reload=True)
+        changed = False
+
+        for key, entry in updates.items():
+            if entry is None:
+                if index.pop(key, None) is not None:
+                    changed = True
+            elif index.get(key) != entry:
+                index[key] = entry
+                changed = True
+
+        if not changed:
+            return
+
+        tmp_filepath = "%s.%s.tmp" % (self._index_filepath, uuid4().hex)
+
+        try:
+            with open(tmp_filepath, 'w') as f:
+                f.write(json.dumps(index))
+            os.replace(tmp_filepath, self._index_filepath)
+        finally:
+            safe_remove(tmp_filepath)
+
+    @contextmanager
+    def _batch_index_updates(self):
+        """Write the index updates made within this context in one go.
+
+        This keeps a `clean`, `evict` or daemon pass that adds or removes many
+        variants from rewriting the whole index for each of them. Until the
+        batch ends, the index may refer to removed variants, which is safe
+        (see `_get_indexed_root`), and may be missing added ones, which are
+        then found by searching their hash dir instead.
+        """
+        if self._index_updates is not None:
+            yield  # already batching
+            return
+
+        self._index_updates = {}
+
+        try:
+            yield
+        finally:
+            updates = self._index_updates
+            self._index_updates = None
+
+            if updates:
+                try:
+                    with self._lock():
+                        self._write_index_updates(updates)
+                except (LockError, IOError, OSError):
+                    pass  # not critical, the index is only an optimisation
+
+    def _queue_variants(self, variants, request_counts=None):
+        """Add variants to the pending queue.
+
+        Each variant is written out to a file in the 'pending' dir in the
+        cache. A separate proc reads these files and then performs the actual
+        variant copy. Note that these files are unique, in case two rez procs
+        attempt to write out the same pending variant file at the same time.
+
+        If a variant is already pending, another request for it is recorded
+        instead, which raises its priority (see `_get_pending_queue`).
+
+        Args:
+            variants (list of `Variant`): Variants to queue.
+            request_counts (dict): Number of requests to record for each
+                variant, if not 1.
+        """
+        request_counts = request_counts or {}
+        pending_filenames = os.listdir(self._pending_dir)
+
+        for variant in variants:
+            prefix = variant.parent.qualified_name + '-'
+            handle_dict = variant.handle.to_dict()
+            pending_filename = None
+
+            # check if this variant is already pending
+            for filename in pending_filenames:
+                if filename.startswith(prefix):
+                    filepath = os.path.join(self._pending_dir, filename)
+                    try:
+                        with open(filepath) as f:
+                            data = json.loads(f.read())
+                    except:
+                        continue  # maybe file was just deleted
+
+                    if data == handle_dict:
+                        pending_filename = filename
+                        break
+
+            num_requests = request_counts.get(variant, 1)
+
+            if pending_filename:
+                # Appends are atomic, so concurrent requests are all counted
+                # without needing the cache lock.
+                filepath = os.path.join(self._requests_dir, pending_filename)
+                with open(filepath, 'a') as f:
+                    f.write('.' * num_requests)
+                continue
+
+            filename = prefix + uuid4().hex + ".json"
+
+            if num_requests > 1:
+                filepath = os.path.join(self._requests_dir, filename)
+                with open(filepath, 'a') as f:
+                    f.write('.' * (num_requests - 1))
+
+            filepath = os.path.join(self._pending_dir, filename)
+            with open(filepath, 'w') as f:
+                f.write(json.dumps(handle_dict))
+
+    def _get_pending_queue(self, state, wait_for_copying=False, exclude=None):
+        """Get pending variants, in the order they should be copied.
+
+        Variants that have been requested most often come first, and of those,
+        the smallest variants come first. This gets the most used variants into
+        the cache as soon as possible.
+
+        Only sizes that are already recorded are used, since measuring a
+        payload can mean walking it over the network. Variants of unknown size
+        come after those of known size, and are measured when copied.
+
+        Returns:
+            list of str: Pending filenames.
+        """
+        logger = state["logger"]
+        sizes = state.setdefault("sizes", {})
 
-        # pick a random pending variant to copy
         pending_filenames = set(os.listdir(self._pending_dir))
         if not wait_for_copying:
             pending_filenames -= set(state.get("copying", set()))
-        if not pending_filenames:
-            return False
+        if exclude:
+            pending_filenames -= set(exclude)
+
+        # Variant sizes are only read once per pending variant.
+        for filename in pending_filenames:
+            if filename in sizes:
+                continue
 
-        i = random.randint(0, len(pending_filenames) - 1)
-        filename = list(pending_filenames)[i]
+            size = None
+            filepath = os.path.join(self._pending_dir, filename)
+            try:
+                with open(filepath) as f:
+                    variant_handle_dict = json.loads(f.read())
+
+                variant = get_variant(variant_handle_dict)
+                size = self._get_recorded_payload_size(variant)
+            except Exception as e:
+                # errors are dealt with when the variant is copied
+                logger.debug("Could not get size of pending %s: %s", filename, e)
+
+            sizes[filename] = size
+
+        def _key(filename):
+            size = sizes[filename]
+            return (-self._get_request_count(filename), size is None, size or 0,
+                    filename)
+
+        return sorted(pending_filenames, key=_key)
+
+    def _get_request_count(self, filename):
+        filepath = os.path.join(self._requests_dir, filename)
+        try:
+            return 1 + os.path.getsize(filepath)
+        except OSError:
+            return 1
+
+    def _remove_pending(self, filename):
+        safe_remove(os.path.join(self._pending_dir, filename))
+        safe_remove(os.path.join(self._requests_dir, filename))
+
+    def _cache_pending_variant(self, state, filename, wait_for_copying=False):
+        logger = state["logger"]
         filepath = os.path.join(self._pending_dir, filename)
 
         try:
@@ -872,17 +1978,18 @@ class PackageCache(object):
                 variant_handle_dict = json.loads(f.read())
         except IOError as e:
             if e.errno == errno.ENOENT:
-                return True  # was probably deleted by another rez-pkg-cache proc
+                return  # was probably deleted by another rez-pkg-cache proc
             raise
 
         variant = get_variant(variant_handle_dict)
         variant_root = getattr(variant, "root")
 
-        if not self.variant_meets_space_requirements(variant_root):
+        if not self.variant_meets_space_requirements(variant_root, variant):
             # variant cannot be cached due to its size, so remove as a pending variant.
             logger.info(f"Variant {variant_root} is too big to be cached due to remaining cache space.")
-            safe_remove(filepath)
-            return True
+            self._record_stats(skipped=1)
+            self._remove_pending(filename)
+            return
 
         # copy the variant and log activity
         logger.info("Started caching of variant %s...", variant.uri)
@@ -898,8 +2005,8 @@ class PackageCache(object):
         except PackageCacheError as e:
             # variant cannot be cached, so remove as a pending variant
             logger.warning(str(e))
-            safe_remove(filepath)
-            return True
+            self._remove_pending(filename)
+            return
 
         except Exception:
             # This is probably an error during shutil.copytree (eg a perms fail).
@@ -908,8 +2015,8 @@ class PackageCache(object):
             # remove the pending variant, as there's nothing more we can do.
             #
             logger.exception("Failed to add variant to the cache")
-            safe_remove(filepath)
-            return True
+            self._remove_pending(filename)
+            return
 
         secs = time.time() - t
 
@@ -929,9 +2036,7 @@ class PackageCache(object):
             #
             state.setdefault("copying", set()).add(filename)
         else:
-            safe_remove(filepath)
-
-        return True
+            self._remove_pending(filename)
 
     def _init_logging(self):
         """
@@ -987,10 +2092,101 @@ class PackageCache(object):
     def _pending_dir(self):
         return os.path.join(self.path, ".sys", "pending")
 
+    @property
+    def _requests_dir(self):
+        return os.path.join(self.path, ".sys", "requests")
+
+    @property
+    def _stats_filepath(self):
+        return os.path.join(self.path, ".sys", "stats.json")
+
+    @property
+    def _stats_log_filepath(self):
+        return os.path.join(self.path, ".sys", "stats.log")
+
+    @property
+    def _access_log_filepath(self):
+        return os.path.join(self.path, ".sys", "access.log")
+
+    @property
+    def _index_filepath(self):
+        return os.path.join(self.path, ".sys", "index.json")
+
+    @property
+    def _sizes_dir(self):
+        return os.path.join(self.path, ".sys", "sizes")
+
     @property
     def _remove_dir(self):
         return os.path.join(self.path, ".sys", "to_delete")
 
+    def _scan_cached_variants(self):
+        """Find the variants in the cache, in a single pass.
+
+        Each hash dir is scanned once, and each variant's status is determined
+        from that listing, rather than being looked up via `_get_cached_root`.
+
+        Yields:
+            5-tuple:
+            - `Variant`: The cached variant;
+            - str: Local cache path for variant;
+            - int: Status (VARIANT_FOUND, VARIANT_COPYING or VARIANT_COPY_STALLED);
+            - float: Modification time of the variant's json file, which is
+              when it was last used;
+            - int: Recorded size of the variant payload, or None.
+        """
+        def _scandir(path):
+            try:
+                with os.scandir(path) as it:
+                    return [x for x in it if not x.name.startswith('.')
+                            or x.name.startswith(".copying-")]
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                    return []
+                raise
+
+        now = time.time()
+
+        for pkg_entry in _scandir(self.path):
+            if pkg_entry.name.startswith('.'):
+                continue  # dirs for internal cache use
+
+            for ver_entry in _scandir(pkg_entry.path):
+                for hash_entry in _scandir(ver_entry.path):
+                    entries = _scandir(hash_entry.path)
+                    copying = dict(
+                        (x.name[len(".copying-"):], x) for x in entries
+                        if x.name.startswith(".copying-")
+                    )
+
+                    for entry in entries:
+                        if not entry.name.endswith(".json"):
+                            continue
+
+                        try:
+                            st = entry.stat()
+                            with open(entry.path) as f:
+                                data = json.loads(f.read())
+                        except (IOError, OSError):
+                            continue  # may have just been removed
+
+                        incname = entry.name[:-len(".json")]
+                        rootpath = os.path.join(hash_entry.path, incname)
+                        status = self.VARIANT_FOUND
+
+                        if incname in copying:
+                            status = self.VARIANT_COPYING
+                            try:
+                                copying_st = copying[incname].stat()
+                                if now - copying_st.st_mtime > self._COPYING_TIME_MAX:
+                                    status = self.VARIANT_COPY_STALLED
+                            except OSError:
+                                pass  # maybe .copying file was deleted just now
+
+                        variant = get_variant(data["handle"])
+                        yield (variant, rootpath, status, st.st_mtime,
+                               data.get("size"))
+
     def _get_cached_root(self, variant):
         path = self._get_hash_path(variant)
         if not os.path.exists(path):
@@ -1045,3 +2241,83 @@ class PackageCache(object):
         dirs.append(hash_dirname)
 
         return os.path.join(*dirs)
+
+
+class _CopyManifest(object):
+    """Record of the files copied into a cached variant payload so far.
+
+    Each line of the manifest file is a JSON list of a file's relative path,
+    source size, source mtime (in nanoseconds) and, if checksums are enabled,
+    the SHA1 of the copied file. Lines are appended as files are copied, so
+    an interrupted copy loses at most the file being copied.
+    """
+    def __init__(self, filepath, checksums=False):
+        self.filepath = filepath
+        self.checksums = checksums
+        self.entries = {}
+        self.size = 0  # total size of source files visited
+        self.bytes_copied = 0  # total size of files copied, rather than linked
+
+        try:
+            with open(filepath) as f:
+                lines = f.readlines()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            lines = []
+
+        self.resumed = os.path.exists(filepath)
+
+        for line in lines:
+            try:
+                relpath, size, mtime_ns, sha1_ = json.loads(line)
+            except ValueError:
+                continue  # last line may be incomplete
+            self.entries[relpath] = (size, mtime_ns, sha1_)
+
+        self._file = open(filepath, 'a')
+
+    def is_copied(self, relpath, st, dst_filepath):
+        """Return True if a file was copied, and is intact.
+
+        Args:
+            relpath (str): File path relative to the variant root.
+            st (`os.stat_result`): Stat of the source file.
+            dst_filepath (str): Copied file.
+        """
+        entry = self.entries.get(relpath)
+        if entry is None:
+            return False
+
+        size, mtime_ns, sha1_ = entry
+        if (size, mtime_ns) != (st.st_size, st.st_mtime_ns):
+            return False  # source has changed
+
+        try:
+            if os.stat(dst_filepath).st_size != size:
+                return False
+        except OSError:
+            return False
+
+        if self.checksums and sha1_ and self._sha1(dst_filepath) != sha1_:
+            return False
+
+        return True
+
+    def add(self, relpath, st, dst_filepath):
+        sha1_ = self._sha1(dst_filepath) if self.checksums else None
+        entry = [relpath, st.st_size, st.st_mtime_ns, sha1_]
+
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    @classmethod
+    def _sha1(cls, filepath):
+        h = sha1()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        return h.hexdigest()
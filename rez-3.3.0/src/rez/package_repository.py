@@ -7,6 +7,7 @@ from rez.utils.data_utils import cached_property
 from rez.plugin_managers import plugin_manager
 from rez.config import config
 from rez.exceptions import ResourceError
+from collections import defaultdict
 from contextlib import contextmanager
 import threading
 import os.path
@@ -174,6 +175,31 @@ class PackageRepository(object):
         """
         raise NotImplementedError
 
+    def prefetch_packages(self, package_family_resources):
+        """Hint that the packages of the given families are about to be
+        iterated.
+
+        Repositories that cache their listings remotely can use this to fetch
+        the listings of all the families in a single request. The default
+        implementation does nothing.
+
+        Args:
+            package_family_resources (list of `PackageFamilyResource`):
+                Families whose packages will be iterated.
+        """
+        pass
+
+    def prefetch_package_data(self, package_resources):
+        """Hint that the data of the given packages is about to be loaded.
+
+        See `prefetch_packages`. The default implementation does nothing.
+
+        Args:
+            package_resources (list of `PackageResource`): Packages that will
+                be loaded.
+        """
+        pass
+
     def get_package(self, name, version):
         """Get a package.
 
@@ -343,6 +369,22 @@ class PackageRepository(object):
         """
         raise NotImplementedError
 
+    def get_variant_payload_size(self, variant_resource):
+        """Get the recorded size of a variant's payload.
+
+        Repositories may record the size of a variant's payload when it is
+        installed, so that consumers such as the package cache do not need to
+        walk the payload to measure it. The default implementation records
+        nothing.
+
+        Args:
+            variant_resource (`VariantResource`): Variant.
+
+        Returns:
+            int: Payload size in bytes, or None if it is not recorded.
+        """
+        return None
+
     def get_equivalent_variant(self, variant_resource):
         """Find a variant in this repository that is equivalent to that given.
 
@@ -484,6 +526,37 @@ class PackageRepository(object):
         resource._repository = self
         return resource
 
+    def get_resources_from_handles(self, resource_handles, verify_repo=True):
+        """Get several resources.
+
+        This is equivalent to calling `get_resource_from_handle` on each
+        handle, except that each distinct handle location is only verified
+        once.
+
+        Args:
+            resource_handles (list of `ResourceHandle`): Handles of the resources.
+
+        Returns:
+            List of `PackageRepositoryResource` instances, in the same order
+            as `resource_handles`.
+        """
+        resources = []
+        verified = set()
+
+        for resource_handle in resource_handles:
+            key = (resource_handle.variables.get("repository_type"),
+                   resource_handle.variables.get("location"))
+
+            resource = self.get_resource_from_handle(
+                resource_handle,
+                verify_repo=(verify_repo and key not in verified)
+            )
+
+            verified.add(key)
+            resources.append(resource)
+
+        return resources
+
     def get_package_payload_path(self, package_name, package_version=None):
         """Defines where a package's payload should be installed to.
 
@@ -632,6 +705,43 @@ class PackageRepositoryManager(object):
         resource = repo.get_resource_from_handle(resource_handle)
         return resource
 
+    def get_resources_from_handles(self, resource_handles):
+        """Get several resources.
+
+        Handles are grouped by repository, and each repository is given all
+        of its handles in one call.
+
+        Args:
+            resource_handles (list of `ResourceHandle`): Handles of the resources.
+
+        Returns:
+            List of `PackageRepositoryResource` instances, in the same order
+            as `resource_handles`.
+        """
+        groups = defaultdict(list)
+
+        for i, resource_handle in enumerate(resource_handles):
+            repo_type = resource_handle.get("repository_type")
+            location = resource_handle.get("location")
+            if not (repo_type and location):
+                raise ValueError("PackageRepositoryManager requires "
+                                 "resource_handle objects to have a "
+                                 "repository_type and location defined")
+
+            path = "%s@%s" % (repo_type, location)
+            groups[path].append((i, resource_handle))
+
+        resources = [None] * len(resource_handles)
+
+        for path, entries in groups.items():
+            repo = self.get_repository(path)
+            indices, handles = zip(*entries)
+
+            for i, resource in zip(indices, repo.get_resources_from_handles(handles)):
+                resources[i] = resource
+
+        return resources
+
     def clear_caches(self):
         """Clear all cached data."""
         self.repositories.clear()
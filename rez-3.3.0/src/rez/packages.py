@@ -574,6 +574,46 @@ def iter_packages(name, range_=None, paths=None):
             yield Package(package_resource)
 
 
+def prefetch_package_families(names, paths=None):
+    """Hint that the packages of the given families are about to be loaded.
+
+    This lets repositories fetch the data they need for several families at
+    once, rather than one family at a time. It is an optimisation only - the
+    packages still have to be iterated as normal.
+
+    Args:
+        names (list of str): Package family names.
+        paths (typing.Optional[list[str]]): paths to search for packages,
+            defaults to `config.packages_path`.
+    """
+    for path in (paths or config.packages_path):
+        repo = package_repository_manager.get_repository(path)
+        family_resources = [
+            x for x in map(repo.get_package_family, names) if x
+        ]
+
+        if family_resources:
+            repo.prefetch_packages(family_resources)
+
+
+def prefetch_packages(packages):
+    """Hint that the definitions of the given packages are about to be loaded.
+
+    See `prefetch_package_families`.
+
+    Args:
+        packages (list of `Package`): Packages that will be loaded.
+    """
+    entries = {}
+    for package in packages:
+        repo = package.resource._repository
+        entry = entries.setdefault(id(repo), (repo, []))
+        entry[1].append(package.resource)
+
+    for repo, package_resources in entries.values():
+        repo.prefetch_package_data(package_resources)
+
+
 def get_package(name, version, paths=None):
     """Get a package by searching a list of repositories.
 
@@ -721,6 +761,33 @@ def get_variant(variant_handle, context=None):
     return variant
 
 
+def get_variants(variant_handles, context=None):
+    """Create several variants given their handles.
+
+    This is faster than calling `get_variant` for each handle, since all the
+    handles of a given package repository are loaded together.
+
+    Args:
+        variant_handles (list of `ResourceHandle` or dict): Resource handles,
+            or equivalent serialized dict representations from
+            ResourceHandle.to_dict
+        context (`ResolvedContext`): The context these variants are associated
+            with, if any.
+
+    Returns:
+        List of `Variant`, in the same order as `variant_handles`.
+    """
+    variant_handles = [
+        (ResourceHandle.from_dict(x) if isinstance(x, dict) else x)
+        for x in variant_handles
+    ]
+
+    variant_resources = package_repository_manager.get_resources_from_handles(
+        variant_handles)
+
+    return [Variant(x, context=context) for x in variant_resources]
+
+
 def get_package_from_uri(uri, paths=None):
     """Get a package given its URI.
 
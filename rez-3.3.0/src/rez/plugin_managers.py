@@ -493,6 +493,12 @@ class CommandPluginType(RezPluginType):
     type_name = "command"
 
 
+class ResolveCachePluginType(RezPluginType):
+    """Support for different backends used to cache resolves.
+    """
+    type_name = "resolve_cache"
+
+
 plugin_manager = RezPluginManager()
 
 
@@ -503,3 +509,4 @@ plugin_manager.register_plugin_type(BuildSystemPluginType)
 plugin_manager.register_plugin_type(PackageRepositoryPluginType)
 plugin_manager.register_plugin_type(BuildProcessPluginType)
 plugin_manager.register_plugin_type(CommandPluginType)
+plugin_manager.register_plugin_type(ResolveCachePluginType)
@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright Contributors to the Rez Project
+
+
+"""
+Backends used to store cached resolves (see :data:`resolve_cache_type`).
+"""
+from rez.exceptions import ResolveCacheError
+from rez.config import config
+
+
+def get_resolve_cache_types():
+    """Returns the available resolve cache implementations."""
+    from rez.plugin_managers import plugin_manager
+    return plugin_manager.get_plugins('resolve_cache')
+
+
+def create_resolve_cache(cache_type=None):
+    """Create a :class:`ResolveCache` instance.
+
+    Args:
+        cache_type (str): Name of the resolve cache plugin to use. If None,
+            :data:`resolve_cache_type` is used.
+
+    Returns:
+        `ResolveCache`: The resolve cache, or None if the backend is not
+        available (for example, no memcached servers are configured).
+    """
+    from rez.plugin_managers import plugin_manager
+
+    cache_type = cache_type or config.resolve_cache_type
+    if cache_type not in get_resolve_cache_types():
+        raise ResolveCacheError("Unknown resolve cache type: %r" % cache_type)
+
+    cls = plugin_manager.get_plugin_class('resolve_cache', cache_type)
+    if not cls.is_available():
+        return None
+    return cls()
+
+
+class ResolveCache(object):
+    """Base class for resolve cache backends, implemented in the resolve_cache
+    plugin type.
+
+    A resolve cache is a simple key/value store. Keys are strings, and values
+    are the (picklable) cache entries created by the `Resolver`. The cache does
+    not validate entries - that is done by the resolver itself - so a backend
+    is free to drop entries at any time.
+    """
+    @classmethod
+    def name(cls):
+        """Return the name of the resolve cache type."""
+        raise NotImplementedError
+
+    @classmethod
+    def is_available(cls):
+        """Returns True if this backend can be used in the current
+        configuration."""
+        return True
+
+    def get(self, key):
+        """Get a cache entry.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            The cached value, or None if there is no entry.
+        """
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Store a cache entry, replacing any existing entry.
+
+        Args:
+            key (str): Cache key.
+            value: Value to store.
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Delete a cache entry, if it exists.
+
+        Args:
+            key (str): Cache key.
+        """
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.name()
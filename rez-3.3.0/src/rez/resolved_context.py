@@ -23,7 +23,7 @@ from rez.rex import RexExecutor, Python, OutputStyle, literal
 from rez.rex_bindings import VersionBinding, VariantBinding, \
     VariantsBinding, RequirementsBinding, EphemeralsBinding, intersects
 from rez import package_order
-from rez.packages import get_variant, iter_packages
+from rez.packages import get_variants, iter_packages
 from rez.package_filter import PackageFilterList
 from rez.package_order import PackageOrderList
 from rez.package_cache import PackageCache
@@ -45,11 +45,13 @@ from enum import Enum
 import getpass
 import json
 import socket
+import struct
 import threading
 import time
 import sys
 import os
 import os.path
+import zlib
 
 
 class RezToolsVisibility(Enum):
@@ -141,6 +143,14 @@ class ResolvedContext(object):
     package_cache_present = True
     local = threading.local()
 
+    # max number of parent environs to cache the environ for (see _get_environ)
+    environ_cache_size = 16
+
+    # start of a context file in binary format (see write_to_buffer)
+    binary_magic = b"\x89RXT\r\n\x1a\n"
+    binary_format_version = 1
+    _binary_header = struct.Struct("<BII")  # version, fields size, graph size
+
     class Callback(object):
         def __init__(self, max_fails, time_limit, callback, buf=None):
             self.max_fails = max_fails
@@ -167,7 +177,8 @@ class ResolvedContext(object):
                  package_filter=None, package_orderers=None, max_fails=-1,
                  add_implicit_packages=True, time_limit=-1, callback=None,
                  package_load_callback=None, buf=None, suppress_passive=False,
-                 print_stats=False, package_caching=None, package_cache_async=None):
+                 print_stats=False, package_caching=None, package_cache_async=None,
+                 solve_workers=None, seed_context=None):
         """Perform a package resolve, and store the result.
 
         Args:
@@ -208,6 +219,15 @@ class ResolvedContext(object):
                 setting :data:`package_cache_during_build`.
             package_cache_async (bool|None): If True, cache packages asynchronously.
                 If None, use the config setting :data:`package_cache_async`
+            solve_workers (int|None): Number of processes used to solve. If None,
+                use the config setting :data:`solve_workers`. Ignored if
+                `max_fails` or `time_limit` is set.
+            seed_context (ResolvedContext): A previous context to seed the resolve
+                with. Packages resolved in that context are kept where possible,
+                and only packages affected by requests that differ from that
+                context's requests are resolved from scratch. This makes re-resolves
+                of slightly changed requests much faster, but note that the result
+                may differ from that of an unseeded resolve.
         """
         self.load_path = None
 
@@ -273,6 +293,7 @@ class ResolvedContext(object):
         # resolve results
         self.status_ = ResolverStatus.pending
         self._resolved_packages = None
+        self._resolved_package_handles = None
         self._resolved_ephemerals = None
         self.failure_description = None
         self.graph_string = None
@@ -284,10 +305,17 @@ class ResolvedContext(object):
         self.load_time = 0.0  # total time loading packages (disk or memcache)
         self.num_loaded_packages = 0  # num packages loaded (disk or memcache)
 
+        # package cache lookups made when the context was last applied
+        self.package_cache_hits = 0
+        self.package_cache_misses = 0
+
         # the pre-resolve bindings. We store these because @late package.py
         # functions need them, and we cache them to avoid cost
         self.pre_resolve_bindings = None
 
+        # see _get_environ
+        self._environ_cache = {}
+
         # suite information
         self.parent_suite_path = None
         self.suite_context_name = None
@@ -305,6 +333,18 @@ class ResolvedContext(object):
 
         request = self.requested_packages(include_implicit=True)
 
+        if solve_workers is None:
+            solve_workers = config.solve_workers
+
+        # speculative solves count fails in bulk, which would move the point
+        # at which these limits abort the resolve
+        if max_fails != -1 or time_limit != -1:
+            solve_workers = 1
+
+        seed_variants = None
+        if seed_context is not None and seed_context.success:
+            seed_variants = self._get_seed_variants(seed_context, request)
+
         resolver = Resolver(context=self,
                             package_requests=request,
                             package_paths=self.package_paths,
@@ -318,7 +358,9 @@ class ResolvedContext(object):
                             verbosity=verbosity,
                             buf=buf,
                             suppress_passive=suppress_passive,
-                            print_stats=print_stats)
+                            print_stats=print_stats,
+                            solve_workers=solve_workers,
+                            seed_variants=seed_variants)
 
         resolver.solve()
 
@@ -392,6 +434,12 @@ class ResolvedContext(object):
         Returns:
             typing.Optional[list[Variant]]: Resolved variant objects, or None if the resolve failed.
         """
+        # a loaded context creates its variants on first use (see from_dict)
+        if self._resolved_package_handles is not None:
+            variants = get_variants(self._resolved_package_handles, context=self)
+            self._resolved_packages = variants
+            self._resolved_package_handles = None
+
         return self._resolved_packages
 
     @property
@@ -441,19 +489,53 @@ class ResolvedContext(object):
     @property
     def has_graph(self):
         """Return True if the resolve has a graph."""
-        return bool((self.graph_ is not None) or self.graph_string)
+        return bool(
+            (self.graph_ is not None)
+            or self._graph_data
+            or self.graph_string
+        )
+
+    @property
+    def graph_string(self):
+        """str: The resolve graph, as loaded from a context file.
+
+        A graph loaded from a binary context file is only decompressed when
+        first accessed.
+        """
+        if self._graph_data is not None:
+            self._graph_string = zlib.decompress(self._graph_data).decode("utf-8")
+            self._graph_data = None
+
+        return self._graph_string
+
+    @graph_string.setter
+    def graph_string(self, value):
+        self._graph_string = value
+        self._graph_data = None
+
+    @property
+    def package_cache_hit_ratio(self):
+        """Return the ratio of cachable packages that were found in the package
+        cache, when the context was last applied, or None if there were none.
+        """
+        lookups = self.package_cache_hits + self.package_cache_misses
+        if not lookups:
+            return None
+        return float(self.package_cache_hits) / lookups
 
     def get_resolved_package(self, name):
         """Returns a `Variant` object or None if the package is not in the
         resolve.
         """
-        pkgs = [x for x in (self._resolved_packages or []) if x.name == name]
+        pkgs = [x for x in (self.resolved_packages or []) if x.name == name]
         return pkgs[0] if pkgs else None
 
     def copy(self):
         """Returns a shallow copy of the context."""
         import copy
-        return copy.copy(self)
+        other = copy.copy(self)
+        other._environ_cache = {}
+        return other
 
     def retargeted(self, package_paths, package_names=None, skip_missing=False):
         """Create a retargeted copy of this context.
@@ -480,7 +562,7 @@ class ResolvedContext(object):
         ]
 
         # find retargeted variant for every variant in this context
-        for src_variant in (self._resolved_packages or []):
+        for src_variant in (self.resolved_packages or []):
             if package_names is not None and src_variant.name not in package_names:
                 retargeted_variants.append(src_variant)
                 continue
@@ -650,15 +732,41 @@ class ResolvedContext(object):
         return write_dot(self.graph_)
 
     def save(self, path):
-        """Save the resolved context to file."""
+        """Save the resolved context to file.
+
+        The file is written in the format set by :data:`context_file_format`.
+        """
+        binary = (config.context_file_format == "binary")
+
         with self._detect_bundle(path):
-            with open(path, 'w') as f:
-                self.write_to_buffer(f)
+            with open(path, 'wb' if binary else 'w') as f:
+                self.write_to_buffer(f, binary=binary)
+
+    def write_to_buffer(self, buf, binary=False):
+        """Save the context to a buffer.
 
-    def write_to_buffer(self, buf):
-        """Save the context to a buffer."""
+        Args:
+            buf (file-like object): Buffer to write to.
+            binary (bool): If True, write the context in binary format, in
+                which case `buf` must accept bytes. This is smaller, and faster
+                to load, than the default JSON format. It consists of
+                `binary_magic`, a header, then the zlib-compressed JSON of the
+                context's fields, and its zlib-compressed graph. The graph is
+                only decompressed when used.
+        """
         doc = self.to_dict()
 
+        if binary:
+            graph_data = zlib.compress((doc.pop("graph") or '').encode("utf-8"))
+            fields_data = zlib.compress(json.dumps(doc).encode("utf-8"))
+
+            buf.write(self.binary_magic)
+            buf.write(self._binary_header.pack(
+                self.binary_format_version, len(fields_data), len(graph_data)))
+            buf.write(fields_data)
+            buf.write(graph_data)
+            return
+
         content = json.dumps(doc, indent=4, separators=(",", ": "), sort_keys=True)
 
         buf.write(content)
@@ -694,7 +802,7 @@ class ResolvedContext(object):
     def load(cls, path):
         """Load a resolved context from file."""
         with cls._detect_bundle(path):
-            with open(path) as f:
+            with open(path, "rb") as f:
                 context = cls.read_from_buffer(f, path)
 
         context.set_load_path(path)
@@ -702,7 +810,11 @@ class ResolvedContext(object):
 
     @classmethod
     def read_from_buffer(cls, buf, identifier_str=None):
-        """Load the context from a buffer."""
+        """Load the context from a buffer.
+
+        The buffer may be text or binary. The binary context format (see
+        `write_to_buffer`) can only be read from a binary buffer.
+        """
         try:
             return cls._read_from_buffer(buf, identifier_str)
         except Exception as e:
@@ -748,8 +860,8 @@ class ResolvedContext(object):
                                        "paths differ:\n%s" % '\n'.join(diff))
 
         d = {}
-        self_pkgs_ = set(x.parent for x in self._resolved_packages)
-        other_pkgs_ = set(x.parent for x in other._resolved_packages)
+        self_pkgs_ = set(x.parent for x in self.resolved_packages)
+        other_pkgs_ = set(x.parent for x in other.resolved_packages)
         self_pkgs = self_pkgs_ - other_pkgs_
         other_pkgs = other_pkgs_ - self_pkgs_
         if not (self_pkgs or other_pkgs):
@@ -953,6 +1065,8 @@ class ResolvedContext(object):
             _pr("solve time:        %.02f secs" % actual_solve_time)
             _pr("packages queried:  %d" % self.num_loaded_packages)
             _pr("from cache:        %s" % self.from_cache)
+            if self.package_cache_hit_ratio is not None:
+                _pr("package cache hit: %d%%" % (self.package_cache_hit_ratio * 100))
             if self.load_path:
                 _pr("rxt file:          %s" % self.load_path)
 
@@ -1071,14 +1185,14 @@ class ResolvedContext(object):
 
         # add nodes
         nodes = {}
-        for variant in self._resolved_packages:
+        for variant in self.resolved_packages:
             nodes[variant.name] = variant.qualified_package_name
         for ephemeral in self._resolved_ephemerals:
             nodes[ephemeral.name] = str(ephemeral)
 
         # add edges
         edges = set()
-        for variant in self._resolved_packages:
+        for variant in self.resolved_packages:
             nodes[variant.name] = variant.qualified_package_name
             for request in variant.get_requires():
                 if not request.conflict:
@@ -1122,10 +1236,7 @@ class ResolvedContext(object):
             The environment dict generated by this context, when
             interpreted in a python rex interpreter.
         """
-        interp = Python(target_environ={}, passive=True)
-        executor = self._create_executor(interp, parent_environ)
-        self._execute(executor)
-        return executor.get_output()
+        return dict(self._get_environ(parent_environ))
 
     @_on_success
     def get_key(self, key, request_only=False):
@@ -1313,6 +1424,13 @@ class ResolvedContext(object):
 
         interpreter = Python(target_environ=target_environ)
 
+        if config.cache_context_environ:
+            # on a cache miss, the context is interpreted by `interpreter`, so
+            # that package commands side effects still happen on first use
+            environ = self._get_environ(parent_environ, interpreter=interpreter)
+            target_environ.update(environ)
+            return interpreter.subprocess(args, **Popen_args)
+
         executor = self._create_executor(interpreter, parent_environ)
         self._execute(executor)
         return interpreter.subprocess(args, **Popen_args)
@@ -1512,8 +1630,14 @@ class ResolvedContext(object):
 
         if _add("resolved_packages"):
             resolved_packages = []
-            for pkg in (self._resolved_packages or []):
-                resolved_packages.append(pkg.handle.to_dict())
+            if self._resolved_package_handles is not None:
+                # avoid creating the variants, the handles are all we need
+                for handle in self._resolved_package_handles:
+                    resolved_packages.append(
+                        dict(handle, variables=dict(handle["variables"])))
+            else:
+                for pkg in (self._resolved_packages or []):
+                    resolved_packages.append(pkg.handle.to_dict())
             data["resolved_packages"] = resolved_packages
 
             # since serialization version 4.7
@@ -1627,6 +1751,9 @@ class ResolvedContext(object):
         r = ResolvedContext.__new__(ResolvedContext)
         r.load_path = None
         r.pre_resolve_bindings = None
+        r.package_cache_hits = 0
+        r.package_cache_misses = 0
+        r._environ_cache = {}
 
         r.timestamp = d["timestamp"]
         r.building = d["building"]
@@ -1654,7 +1781,10 @@ class ResolvedContext(object):
         r.graph_string = d["graph"]
         r.graph_ = None
 
-        r._resolved_packages = []
+        # variants are created when first used (see resolved_packages), as
+        # this can involve loading their packages
+        r._resolved_packages = None
+        r._resolved_package_handles = []
         for d_ in d["resolved_packages"]:
             variant_handle = d_
             if load_ver < (4, 0):
@@ -1665,9 +1795,7 @@ class ResolvedContext(object):
             # -- SINCE SERIALIZE VERSION 4.7
             cls._adjust_variant_for_bundling(variant_handle, out=False)
 
-            variant = get_variant(variant_handle)
-            variant.set_context(r)
-            r._resolved_packages.append(variant)
+            r._resolved_package_handles.append(variant_handle)
 
         # -- SINCE SERIALIZE VERSION 1
 
@@ -1834,6 +1962,26 @@ class ResolvedContext(object):
             location = canonical_path(location, platform_)
             vars_["location"] = location
 
+    @classmethod
+    def _get_seed_variants(cls, seed_context, request):
+        """
+        Get the variants of `seed_context` that are unaffected by the
+        difference between its request and `request`.
+        """
+        prev_request = seed_context.requested_packages(include_implicit=True)
+        prev_reqs = dict((x.name, str(x)) for x in prev_request)
+        reqs = dict((x.name, str(x)) for x in request)
+
+        changed_names = set(
+            name for name in set(prev_reqs) | set(reqs)
+            if prev_reqs.get(name) != reqs.get(name)
+        )
+
+        return [
+            x for x in seed_context.resolved_packages
+            if x.name not in changed_names
+        ]
+
     @classmethod
     def _get_package_cache(cls):
         if not cls.package_cache_present:
@@ -1932,6 +2080,11 @@ class ResolvedContext(object):
     def _read_from_buffer(cls, buf, identifier_str=None):
         content = buf.read()
 
+        if isinstance(content, bytes):
+            if content.startswith(cls.binary_magic):
+                return cls._read_from_binary(content, identifier_str)
+            content = content.decode("utf-8")
+
         if content.startswith('{'):  # assume json content
             doc = json.loads(content)
         else:
@@ -1940,6 +2093,31 @@ class ResolvedContext(object):
         context = cls.from_dict(doc, identifier_str)
         return context
 
+    @classmethod
+    def _read_from_binary(cls, content, identifier_str=None):
+        offset = len(cls.binary_magic)
+        version, fields_size, graph_size = \
+            cls._binary_header.unpack_from(content, offset)
+
+        if version > cls.binary_format_version:
+            raise ResolvedContextError(
+                "Context was written in a newer binary format (%d > %d)"
+                % (version, cls.binary_format_version)
+            )
+
+        offset += cls._binary_header.size
+        fields_data = content[offset:offset + fields_size]
+        graph_data = content[offset + fields_size:offset + fields_size + graph_size]
+
+        doc = json.loads(zlib.decompress(fields_data).decode("utf-8"))
+        doc["graph"] = None
+
+        context = cls.from_dict(doc, identifier_str)
+
+        # see graph_string
+        context._graph_data = graph_data
+        return context
+
     @classmethod
     def _load_error(cls, e, path=None):
         exc_name = e.__class__.__name__
@@ -1973,9 +2151,78 @@ class ResolvedContext(object):
 
         return self.pre_resolve_bindings
 
+    def _get_environ(self, parent_environ=None, interpreter=None):
+        """Get the environ dict resulting from interpreting this context.
+
+        If :data:`cache_context_environ` is enabled, the environ is cached,
+        keyed on the parent environ and the package cache roots of the
+        resolved variants. The returned dict must not be modified.
+
+        Args:
+            interpreter (`Python`): Interpreter to interpret the context with,
+                if the environ is not cached. A passive interpreter is used if
+                None.
+        """
+        def _interpret(cached_roots=None):
+            interp = interpreter or Python(target_environ={}, passive=True)
+            executor = self._create_executor(interp, parent_environ)
+            self._execute(executor, cached_roots=cached_roots)
+            return executor.get_output()
+
+        if not config.cache_context_environ:
+            return _interpret()
+
+        cached_roots = self._get_cached_roots()
+        key = (
+            frozenset((os.environ if parent_environ is None else parent_environ).items()),
+            tuple(sorted(cached_roots.items()))
+        )
+
+        environ = self._environ_cache.get(key)
+        if environ is None:
+            environ = _interpret(cached_roots)
+
+            if len(self._environ_cache) >= self.environ_cache_size:
+                del self._environ_cache[next(iter(self._environ_cache))]
+            self._environ_cache[key] = environ
+
+        return environ
+
+    def _get_cached_roots(self):
+        """Get the package cache roots of the resolved variants.
+
+        Returns:
+            dict: Cached root of each variant (None if not cached), keyed by
+            package name.
+        """
+        if self.package_caching and \
+                config.cache_packages_path and \
+                config.read_package_cache:
+            pkgcache = self._get_package_cache()
+        else:
+            pkgcache = None
+
+        cached_roots = {}
+        for pkg in (self.resolved_packages or []):
+            if pkgcache:
+                cached_roots[pkg.name] = pkgcache.get_cached_root(pkg)
+            else:
+                cached_roots[pkg.name] = None
+
+        if pkgcache:
+            stats = pkgcache.flush_stats()
+            self.package_cache_hits = stats.get("hits", 0)
+            self.package_cache_misses = stats.get("misses", 0)
+
+        return cached_roots
+
     @pool_memcached_connections
-    def _execute(self, executor):
+    def _execute(self, executor, cached_roots=None):
         """Bind various info to the execution context
+
+        Args:
+            cached_roots (dict): Package cache roots of the resolved variants,
+                as returned by `_get_cached_roots`. Determined if None.
         """
         def normalized(path):
             return executor.normalize_path(path)
@@ -2029,21 +2276,14 @@ class ResolvedContext(object):
         #
         variant_bindings = {}
 
-        if self.package_caching and \
-                config.cache_packages_path and \
-                config.read_package_cache:
-            pkgcache = self._get_package_cache()
-        else:
-            pkgcache = None
+        if cached_roots is None:
+            cached_roots = self._get_cached_roots()
 
         for pkg in resolved_pkgs:
-            if pkgcache:
-                cached_root = pkgcache.get_cached_root(pkg)
-            else:
-                cached_root = None
-
             variant_binding = VariantBinding(
-                pkg, cached_root=cached_root, interpreter=executor.interpreter
+                pkg,
+                cached_root=cached_roots.get(pkg.name),
+                interpreter=executor.interpreter
             )
             variant_bindings[pkg.name] = variant_binding
 
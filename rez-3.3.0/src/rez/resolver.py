@@ -6,13 +6,21 @@ from rez.solver import Solver, SolverStatus
 from rez.package_repository import package_repository_manager
 from rez.packages import get_variant, get_last_release_time
 from rez.package_filter import PackageFilterList, TimestampRule
-from rez.utils.memcached import memcached_client, pool_memcached_connections
+from rez.resolve_cache import create_resolve_cache
+from rez.utils.memcached import pool_memcached_connections
 from rez.utils.logging_ import log_duration
 from rez.config import config
 from rez.version import Requirement
-from contextlib import contextmanager
 from enum import Enum
 from hashlib import sha1
+import threading
+import time
+
+
+# keys of cached resolves being revalidated in the background, see
+# `Resolver._get_cached_solve`
+_revalidating_keys = set()
+_revalidating_keys_lock = threading.Lock()
 
 
 class ResolverStatus(Enum):
@@ -38,7 +46,8 @@ class Resolver(object):
     def __init__(self, context, package_requests, package_paths, package_filter=None,
                  package_orderers=None, timestamp=0, callback=None, building=False,
                  testing=False, verbosity=False, buf=None, package_load_callback=None,
-                 caching=True, suppress_passive=False, print_stats=False):
+                 caching=True, suppress_passive=False, print_stats=False,
+                 solve_workers=1, seed_variants=None):
         """Create a Resolver.
 
         Args:
@@ -56,6 +65,11 @@ class Resolver(object):
             caching: If True, cache(s) may be used to speed the resolve. If
                 False, caches will not be used.
             print_stats (bool): If true, print advanced solver stats at the end.
+            solve_workers (int): Number of processes used to solve; see the
+                `parallel` argument of `Solver`.
+            seed_variants (list of `Variant`): Variants from a previous resolve
+                to seed the solve with; see `Solver`. Seeded resolves are not
+                cached, since their result depends on the seeds.
         """
         self.context = context
         self.package_requests = package_requests
@@ -71,8 +85,10 @@ class Resolver(object):
         self.buf = buf
         self.suppress_passive = suppress_passive
         self.print_stats = print_stats
+        self.solve_workers = solve_workers
+        self.seed_variants = seed_variants
 
-        # store hash of package orderers. This is used in the memcached key
+        # store hash of package orderers. This is used in the resolve cache key
         if package_orderers:
             sha1s = ''.join(x.sha1 for x in package_orderers)
             self.package_orderers_hash = sha1(sha1s.encode("utf8")).hexdigest()
@@ -80,7 +96,7 @@ class Resolver(object):
             self.package_orderers_hash = ''
 
         # store hash of pre-timestamp-combined package filter. This is used in
-        # the memcached key
+        # the resolve cache key
         if package_filter:
             self.package_filter_hash = package_filter.sha1
         else:
@@ -103,7 +119,9 @@ class Resolver(object):
         self.failure_description = None
         self.graph_ = None
         self.from_cache = False
-        self.memcached_servers = config.memcached_uri if config.resolve_caching else None
+        self.resolve_cache = create_resolve_cache() \
+            if (caching and config.resolve_caching and not seed_variants) \
+            else None
 
         self.solve_time = 0.0  # time spent solving
         self.load_time = 0.0   # time spent loading package resources
@@ -114,7 +132,7 @@ class Resolver(object):
     def solve(self):
         """Perform the solve.
         """
-        with log_duration(self._print, "memcache get (resolve) took %s"):
+        with log_duration(self._print, "cache get (resolve) took %s"):
             solver_dict = self._get_cached_solve()
 
         if solver_dict:
@@ -126,7 +144,7 @@ class Resolver(object):
             solver_dict = self._solver_to_dict(solver)
             self._set_result(solver_dict)
 
-            with log_duration(self._print, "memcache set (resolve) took %s"):
+            with log_duration(self._print, "cache set (resolve) took %s"):
                 self._set_cached_solve(solver_dict)
 
     @property
@@ -173,10 +191,10 @@ class Resolver(object):
         return get_variant(variant_handle, context=self.context)
 
     def _get_cached_solve(self):
-        """Find a memcached resolve.
+        """Find a cached resolve.
 
         If there is NOT a resolve timestamp:
-            - fetch a non-timestamped memcache entry;
+            - fetch a non-timestamped cache entry;
             - if no entry, then fail;
             - if packages have changed, then:
               - delete the entry;
@@ -188,7 +206,7 @@ class Resolver(object):
               - fail.
 
         If there IS a resolve timestamp (let us call this T):
-            - fetch a non-timestamped memcache entry;
+            - fetch a non-timestamped cache entry;
             - if entry then:
               - if no packages have changed, then:
                 - if no packages in the entry have been released since:
@@ -198,7 +216,7 @@ class Resolver(object):
                   - delete the entry;
               - else:
                 - delete the entry;
-            - fetch a timestamped (T) memcache entry;
+            - fetch a timestamped (T) cache entry;
             - if no entry, then fail;
             - if packages have changed, then:
               - delete the entry;
@@ -212,8 +230,16 @@ class Resolver(object):
         reused if the timestamp matches exactly (but this might happen a lot -
         consider a workflow where a work area is tied down to a particular
         timestamp in order to 'lock' it from any further software releases).
+
+        If :data:`resolve_caching_max_staleness` is set, and an entry was last
+        checked for changed packages and newer releases within that many
+        seconds, then the entry is used without these checks, and they are
+        done in a background thread instead (unless one is already checking
+        that entry). If that finds the entry to be out of date, it is deleted,
+        so that the next resolve does not use it. Older entries are checked
+        in the foreground, and then count as recently checked.
         """
-        if not (self.caching and self.memcached_servers):
+        if not (self.caching and self.resolve_cache):
             return None
 
         # these caches avoids some potentially repeated file stats
@@ -221,7 +247,7 @@ class Resolver(object):
         last_release_times = {}
 
         def _hit(data):
-            solver_dict, _, _ = data
+            solver_dict = data[0]
             return solver_dict
 
         def _miss():
@@ -229,19 +255,17 @@ class Resolver(object):
             return None
 
         def _delete_cache_entry(key):
-            with self._memcached_client() as client:
-                client.delete(key)
+            self.resolve_cache.delete(key)
             self._print("Discarded entry: %r", key)
 
         def _retrieve(timestamped):
             key = self._memcache_key(timestamped=timestamped)
-            self._print("Retrieving memcache key: %r", key)
-            with self._memcached_client() as client:
-                data = client.get(key)
+            self._print("Retrieving %s cache key: %r", self.resolve_cache, key)
+            data = self.resolve_cache.get(key)
             return key, data
 
         def _packages_changed(key, data):
-            solver_dict, _, variant_states_dict = data
+            solver_dict, _, variant_states_dict = data[:3]
             for variant_handle in solver_dict.get("variant_handles", []):
                 variant = self._get_variant(variant_handle)
                 old_state = variant_states_dict.get(variant.name)
@@ -267,7 +291,7 @@ class Resolver(object):
             return False
 
         def _releases_since_solve(key, data):
-            _, release_times_dict, _ = data
+            release_times_dict = data[1]
             for package_name, release_time in release_times_dict.items():
                 time_ = last_release_times.get(package_name)
                 if time_ is None:
@@ -283,7 +307,7 @@ class Resolver(object):
             return False
 
         def _timestamp_is_earlier(key, data):
-            _, release_times_dict, _ = data
+            release_times_dict = data[1]
             for package_name, release_time in release_times_dict.items():
                 if self.timestamp < release_time:
                     self._print("Resolve timestamp (%d) is earlier than %r in "
@@ -292,40 +316,87 @@ class Resolver(object):
                     return True
             return False
 
+        def _is_out_of_date(key, data, check_releases=True):
+            return (
+                _packages_changed(key, data)
+                or (check_releases and _releases_since_solve(key, data))
+            )
+
+        def _revalidate(key, data, check_releases):
+            try:
+                if _is_out_of_date(key, data, check_releases):
+                    _delete_cache_entry(key)
+                else:
+                    self.resolve_cache.set(key, data[:3] + (time.time(),))
+                    self._print("Revalidated entry: %r", key)
+            except Exception as e:
+                self._print("Revalidation of entry %r failed: %s", key, e)
+            finally:
+                with _revalidating_keys_lock:
+                    _revalidating_keys.discard(key)
+
+        def _is_valid(key, data, check_releases=True):
+            # serve a recently validated entry as is, and check it afterwards
+            max_staleness = config.resolve_caching_max_staleness
+            validated_time = data[3] if len(data) > 3 else 0
+
+            if max_staleness and \
+                    (time.time() - validated_time) <= max_staleness:
+                self._print("Using entry validated %.1f seconds ago, "
+                            "revalidating in background: %r",
+                            time.time() - validated_time, key)
+
+                # skip if this entry is already being revalidated
+                with _revalidating_keys_lock:
+                    if key in _revalidating_keys:
+                        return True
+                    _revalidating_keys.add(key)
+
+                thread = threading.Thread(
+                    target=_revalidate,
+                    args=(key, data, check_releases),
+                    name="rez-resolve-revalidate"
+                )
+                thread.daemon = True
+                thread.start()
+                return True
+
+            if _is_out_of_date(key, data, check_releases):
+                _delete_cache_entry(key)
+                return False
+
+            # so that the next hits within max_staleness skip the checks
+            if max_staleness:
+                self.resolve_cache.set(key, data[:3] + (time.time(),))
+            return True
+
         key, data = _retrieve(False)
 
         if self.timestamp:
             if data:
-                if _packages_changed(key, data) or _releases_since_solve(key, data):
-                    _delete_cache_entry(key)
-                elif not _timestamp_is_earlier(key, data):
+                if _timestamp_is_earlier(key, data):
+                    if _is_out_of_date(key, data):
+                        _delete_cache_entry(key)
+                elif _is_valid(key, data):
                     return _hit(data)
 
             key, data = _retrieve(True)
             if not data:
                 return _miss()
-            if _packages_changed(key, data):
-                _delete_cache_entry(key)
-                return _miss()
-            else:
+            if _is_valid(key, data, check_releases=False):
                 return _hit(data)
+            else:
+                return _miss()
         else:
             if not data:
                 return _miss()
-            if _packages_changed(key, data) or _releases_since_solve(key, data):
-                _delete_cache_entry(key)
-                return _miss()
-            else:
+            if _is_valid(key, data):
                 return _hit(data)
-
-    @contextmanager
-    def _memcached_client(self):
-        with memcached_client(self.memcached_servers,
-                              debug=config.debug_memcache) as client:
-            yield client
+            else:
+                return _miss()
 
     def _set_cached_solve(self, solver_dict):
-        """Store a solve to memcached.
+        """Store a solve to the resolve cache.
 
         If there is NOT a resolve timestamp:
             - store the solve to a non-timestamped entry.
@@ -339,7 +410,7 @@ class Resolver(object):
         if self.status_ != ResolverStatus.solved:
             return  # don't cache failed solves
 
-        if not (self.caching and self.memcached_servers):
+        if not (self.caching and self.resolve_cache):
             return
 
         # most recent release times get stored with solve result in the cache
@@ -352,7 +423,7 @@ class Resolver(object):
 
             # don't cache if a release time isn't known
             if time_ == 0:
-                self._print("Did not send memcache key: a repository could "
+                self._print("Did not send cache key: a repository could "
                             "not provide a most recent release time for %r",
                             variant.name)
                 return
@@ -367,13 +438,13 @@ class Resolver(object):
 
         timestamped = (self.timestamp and releases_since_solve)
         key = self._memcache_key(timestamped=timestamped)
-        data = (solver_dict, release_times_dict, variant_states_dict)
-        with self._memcached_client() as client:
-            client.set(key, data)
-        self._print("Sent memcache key: %r", key)
+        data = (solver_dict, release_times_dict, variant_states_dict,
+                time.time())
+        self.resolve_cache.set(key, data)
+        self._print("Sent %s cache key: %r", self.resolve_cache, key)
 
     def _memcache_key(self, timestamped=False):
-        """Makes a key suitable as a memcache entry."""
+        """Makes a key suitable as a resolve cache entry."""
         request = tuple(map(str, self.package_requests))
         repo_ids = []
         for path in self.package_paths:
@@ -407,7 +478,9 @@ class Resolver(object):
                         prune_unfailed=config.prune_failed_graph,
                         buf=self.buf,
                         suppress_passive=self.suppress_passive,
-                        print_stats=self.print_stats)
+                        print_stats=self.print_stats,
+                        parallel=self.solve_workers,
+                        seed_variants=self.seed_variants)
         solver.solve()
 
         return solver
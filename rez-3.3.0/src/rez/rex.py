@@ -10,6 +10,7 @@ from fnmatch import fnmatch
 from enum import Enum
 from contextlib import contextmanager
 from string import Formatter
+from collections import deque
 from collections.abc import MutableMapping
 
 from rez.system import system
@@ -195,13 +196,29 @@ class ActionManager(object):
         self.parent_environ = os.environ if parent_environ is None else parent_environ
         self.parent_variables = True if parent_variables is True \
             else set(parent_variables or [])
-        self.environ = {}
         self.formatter = formatter or str
         self.actions = []
 
         self._env_sep_map = env_sep_map if env_sep_map is not None \
             else config.env_var_separators
 
+        self._environ = {}
+
+        # Vars that have been prepended/appended to are also kept as a deque of
+        # their parts. Their values in `environ` are only rejoined when it is
+        # next read, so that building a var of N parts is O(N), not O(N^2).
+        self._env_lists = {}
+        self._stale_env_keys = set()
+
+    @property
+    def environ(self):
+        """dict: Env vars, as set by the actions so far."""
+        for key in self._stale_env_keys:
+            self._environ[key] = self._env_sep(key).join(self._env_lists[key])
+
+        self._stale_env_keys.clear()
+        return self._environ
+
     def get_action_methods(self):
         """
         return a list of methods on this class for executing actions.
@@ -247,8 +264,10 @@ class ActionManager(object):
 
     def _expand(self, value):
         def _fn(str_):
-            str_ = expandvars(str_, self.environ)
-            str_ = expandvars(str_, self.parent_environ)
+            # check first, since reading self.environ may join vars
+            if '$' in str_:
+                str_ = expandvars(str_, self.environ)
+                str_ = expandvars(str_, self.parent_environ)
             return os.path.expanduser(str_)
 
         return EscapedString.promote(value).formatted(_fn)
@@ -273,7 +292,7 @@ class ActionManager(object):
     def undefined(self, key):
         _, expanded_key = self._key(key)
         return (
-            expanded_key not in self.environ
+            expanded_key not in self._environ
             and expanded_key not in self.parent_environ
         )
 
@@ -300,7 +319,7 @@ class ActionManager(object):
 
         # TODO: check if value has already been set by another package
         self.actions.append(Setenv(unexpanded_key, unexpanded_value))
-        self.environ[expanded_key] = str(expanded_value)
+        self._set_environ(expanded_key, str(expanded_value))
 
         if self.interpreter.expand_env_vars:
             key, value = expanded_key, expanded_value
@@ -312,8 +331,8 @@ class ActionManager(object):
         unexpanded_key, expanded_key = self._key(key)
         self.actions.append(Unsetenv(unexpanded_key))
 
-        if expanded_key in self.environ:
-            del self.environ[expanded_key]
+        if expanded_key in self._environ:
+            self._set_environ(expanded_key, None)
         if self.interpreter.expand_env_vars:
             key = expanded_key
         else:
@@ -326,7 +345,7 @@ class ActionManager(object):
 
         action = Resetenv(unexpanded_key, unexpanded_value, friends)
         self.actions.append(action)
-        self.environ[expanded_key] = str(expanded_value)
+        self._set_environ(expanded_key, str(expanded_value))
 
         if self.interpreter.expand_env_vars:
             key, value = expanded_key, expanded_value
@@ -334,14 +353,14 @@ class ActionManager(object):
             key, value = unexpanded_key, unexpanded_value
         self.interpreter.resetenv(key, value)
 
-    def _pendenv(self, key, value, action, interpfunc, addfunc):
+    def _pendenv(self, key, value, action, interpfunc, prepend):
         unexpanded_key, expanded_key = self._key(key)
         unexpanded_value, expanded_value = self._value(value)
 
         # expose env-vars from parent env if explicitly told to do so
-        if (expanded_key not in self.environ) and \
+        if (expanded_key not in self._environ) and \
                 ((self.parent_variables is True) or (expanded_key in self.parent_variables)):
-            self.environ[expanded_key] = self.parent_environ.get(expanded_key, '')
+            self._set_environ(expanded_key, self.parent_environ.get(expanded_key, ''))
             if self.interpreter.expand_env_vars:
                 key_ = expanded_key
             else:
@@ -349,22 +368,28 @@ class ActionManager(object):
             self.interpreter._saferefenv(key_)
 
         # *pend or setenv depending on whether this is first reference to the var
-        if expanded_key in self.environ:
+        parts = None
+        if expanded_key in self._environ:
             env_sep = self._env_sep(expanded_key)
             self.actions.append(action(unexpanded_key, unexpanded_value))
 
-            values = addfunc(unexpanded_value, [self._keytoken(expanded_key)])
+            values = [self._keytoken(expanded_key)]
+            values.insert(0 if prepend else 1, unexpanded_value)
             unexpanded_values = EscapedString.join(env_sep, values)
 
-            parts = self.environ[expanded_key].split(env_sep)
-            values = addfunc(expanded_value, parts)
-            expanded_values = EscapedString.join(env_sep, values)
+            parts = self._env_lists.get(expanded_key)
+            if parts is None:
+                parts = deque(self._environ[expanded_key].split(env_sep))
+                self._env_lists[expanded_key] = parts
 
-            self.environ[expanded_key] = \
-                env_sep.join(addfunc(str(expanded_value), parts))
+            if prepend:
+                parts.appendleft(str(expanded_value))
+            else:
+                parts.append(str(expanded_value))
+            self._stale_env_keys.add(expanded_key)
         else:
             self.actions.append(Setenv(unexpanded_key, unexpanded_value))
-            self.environ[expanded_key] = str(expanded_value)
+            self._set_environ(expanded_key, str(expanded_value))
             unexpanded_values = unexpanded_value
             expanded_values = expanded_value
             interpfunc = None
@@ -382,6 +407,12 @@ class ActionManager(object):
                 pass
 
         if not applied:
+            if parts is not None and self.interpreter.expand_env_vars:
+                # the whole value is needed only in this case, so is built here
+                values = list(parts)
+                values[0 if prepend else -1] = expanded_value
+                expanded_values = EscapedString.join(env_sep, values)
+
             if self.interpreter.expand_env_vars:
                 key, value = expanded_key, expanded_values
             else:
@@ -390,11 +421,11 @@ class ActionManager(object):
 
     def prependenv(self, key, value):
         self._pendenv(key, value, Prependenv, self.interpreter.prependenv,
-                      lambda x, y: [x] + y)
+                      prepend=True)
 
     def appendenv(self, key, value):
         self._pendenv(key, value, Appendenv, self.interpreter.appendenv,
-                      lambda x, y: y + [x])
+                      prepend=False)
 
     def alias(self, key, value):
         key = str(self._format(key))
@@ -438,6 +469,16 @@ class ActionManager(object):
     def _keytoken(self, key):
         return self.interpreter.get_key_token(key)
 
+    def _set_environ(self, key, value):
+        # set (or unset, if value is None) a var, dropping its parts, if any
+        self._env_lists.pop(key, None)
+        self._stale_env_keys.discard(key)
+
+        if value is None:
+            del self._environ[key]
+        else:
+            self._environ[key] = value
+
 
 #===============================================================================
 # Interpreters
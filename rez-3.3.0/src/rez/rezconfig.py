@@ -82,6 +82,17 @@ tmpdir = None
 # cleaned up when the render completes.
 context_tmpdir = None
 
+# The format that context (.rxt) files are written in. Valid options are:
+#
+# - ``json``: Human readable.
+# - ``binary``: Compressed, and faster to load. This helps when contexts are
+#   large (such as those with a stored resolve graph), and are loaded often (for
+#   example, by every tool launched from a suite). Contexts written in this format
+#   can only be read by rez versions that support it.
+#
+# Either format can be loaded, regardless of this setting.
+context_file_format = "json"
+
 # These are extra python paths that are added to :data:`sys.path` **only during a build**.
 # This means that any of the functions in the following list can import modules
 # from these paths:
@@ -141,11 +152,45 @@ bind_module_path = []
 # Caching
 ###############################################################################
 
-# Cache resolves to memcached, if enabled. Note that these cache entries will be
+# Cache resolves (see :data:`resolve_cache_type`), if enabled. Note that these cache entries will be
 # correctly invalidated if, for example, a newer package version is released that
 # would change the result of an existing resolve.
 resolve_caching = True
 
+# The backend used to cache resolves, if :data:`resolve_caching` is enabled. This
+# is the name of a resolve_cache plugin. Builtin backends are:
+#
+# - ``memcached``: Share resolves via the servers in :data:`memcached_uri`. No
+#   resolves are cached if no servers are configured.
+# - ``local``: Share resolves between processes on this host, via a database file
+#   on local disk. See the ``plugins.resolve_cache.local`` settings.
+resolve_cache_type = "memcached"
+
+# If non-zero, a cached resolve that was checked against the package repositories
+# within this many seconds is used straight away, and is checked again in a
+# background thread. If that check finds the resolve is out of date (for example
+# because a newer package has been released), the entry is discarded, so that
+# the next resolve does not use it. This makes cache hits much faster on slow
+# filesystems, at the cost of a resolve being up to this many seconds out of date.
+# Zero means that every cache hit is checked before it is used.
+resolve_caching_max_staleness = 0
+
+# Cache the compiled code of package functions (such as ``commands``) on local
+# disk, under :data:`tmpdir`, if enabled. This saves each process that creates a
+# shell for a large context from recompiling the functions of every package in
+# it. Entries are keyed on a function's source, and on the python and rez versions.
+# Entries that have not been used for 30 days are removed.
+cache_compiled_code = False
+
+# Cache the environ resulting from interpreting a context in memory, if enabled.
+# Repeated calls to methods such as :meth:`.ResolvedContext.get_environ` and
+# :meth:`.ResolvedContext.execute_command` on the same context and with the same
+# parent environ then do not rerun every package's ``commands``. This assumes
+# that package ``commands`` only depend on the parent environ. Note that side
+# effects of package ``commands`` (such as ``info`` output from
+# :meth:`.ResolvedContext.execute_command`) then only happen on the first call.
+cache_context_environ = False
+
 # Cache package file reads to memcached, if enabled. Updated package files will
 # still be read correctly (ie, the cache invalidates when the filesystem
 # changes).
@@ -296,8 +341,62 @@ package_cache_same_device = False
 # If > 0, spend up to this many seconds cleaning the cache every time the cache
 # is updated. This is a way to keep the cache size under control without having
 # to periodically run :option:`rez-pkg-cache --clean`. Set to -1 to disable.
+# Within this limit, the largest and least recently used of the unused variants
+# (see :data:`package_cache_max_variant_days`) are removed first.
 package_cache_clean_limit = 0.5
 
+# The number of directories that :option:`rez-pkg-cache --clean` (and the
+# cleanup done when the cache is updated, see :data:`package_cache_clean_limit`)
+# deletes at once.
+package_cache_clean_workers = 4
+
+# If > 0, the maximum number of directories per second that the package cache
+# starts deleting when cleaned. Use this to limit the I/O load that cleaning a
+# large cache puts on its disk. Zero means no limit.
+package_cache_clean_rate = 0.0
+
+# The number of variants that a package caching process copies at once. Pending
+# variants are copied in order of how often they have been requested, and then
+# smallest first, so that the most used variants are cached soonest. Copying
+# several variants at once can greatly speed up caching from network storage.
+package_cache_workers = 1
+
+# How variant payloads are copied into the package cache. Valid options are:
+#
+# - ``copy``: Copy every file from the variant root.
+# - ``hardlink``: Files that are unchanged from a variant of the same package
+#   family that is already cached (ie, same relative path, size and modification
+#   time) are hardlinked to the cached file, rather than copied. Other files
+#   are copied. This makes caching a patch release of a large package much
+#   faster, and saves disk space. Note that hardlinked files share permissions.
+# - ``reflink``: As for ``hardlink``, but unchanged files are cloned instead,
+#   on filesystems that support it (such as btrfs and XFS). Clones do not share
+#   metadata, and do not use extra disk space until modified. Where cloning is
+#   not supported, unchanged files are copied from the cached file.
+# - ``lazy``: Each file is symlinked to the file in the variant root, so caching
+#   is almost instant, and uses almost no disk space. Files are copied into the
+#   cache by the package caching daemon once they are recorded as accessed (see
+#   :option:`rez-pkg-cache --materialize`). This suits very large packages, of
+#   which only a few files are used. Requires symlink support.
+package_cache_copy_mode = "copy"
+
+# If True, a stalled package cache copy (for example, one whose process was
+# killed) is resumed by the next process that tries to cache the variant, rather
+# than being left for :option:`rez-pkg-cache --clean` to remove. Files already
+# copied are not copied again. Copied files are recorded in a manifest, which
+# also stores file checksums if :data:`package_cache_verify_checksums` is True.
+#
+# A copy is not resumed if its process is known to still be running. This can
+# only be checked for processes on the same host, so copies from other hosts are
+# resumed once they have stalled, even if their process is only paused.
+package_cache_resume_copies = False
+
+# If True, checksums of the files copied into the package cache are recorded,
+# and verified before a resumed copy skips a file. This catches files that were
+# corrupted by the interrupted copy, at the cost of reading every copied file
+# back. If False, only file sizes are compared.
+package_cache_verify_checksums = False
+
 # Number of days of package cache logs to keep.
 # Logs are written to :file:`{pkg-cache-root}/.sys/log/{filename}.log`
 package_cache_log_days = 7
@@ -326,6 +425,19 @@ package_cache_space_buffer = 104857600
 #    in block size, allocation strategies and metadata overhead.
 package_cache_used_threshold = 80
 
+# If > 0, when the disk usage of the package cache's filesystem exceeds this
+# percentage, least recently used variants are evicted from the cache until
+# usage drops below :data:`package_cache_low_watermark`. This is done before
+# each variant is cached, and by :option:`rez-pkg-cache --clean`. Without this,
+# caching simply stops once the cache is near full (see
+# :data:`package_cache_space_buffer`), which is not ideal for caches on small
+# local disks. The size of each cached variant is recorded when it is copied,
+# so eviction does not need to walk the cache. Set to zero to disable.
+package_cache_high_watermark = 0
+
+# See :data:`package_cache_high_watermark`.
+package_cache_low_watermark = 70
+
 ###############################################################################
 # Package Resolution
 ###############################################################################
@@ -367,6 +479,16 @@ platform_map = {}
 # failure.
 prune_failed_graph = True
 
+# The number of processes used to solve a resolve. If greater than 1, the solver
+# speculatively explores alternative resolve branches in forked child processes,
+# so that branches with no solution can be skipped. This can speed up resolves
+# that involve a lot of backtracking. The result is the same as that of a single
+# process solve. Contexts created with a ``max_fails`` or ``time_limit`` are
+# always solved in a single process, since the point at which such a resolve
+# is aborted could otherwise differ. This is ignored on platforms that do not
+# support fork (such as Windows).
+solve_workers = 1
+
 # Variant select mode. This determines which variants in a package are preferred
 # during a solve. Valid options are:
 #
@@ -736,6 +858,9 @@ debug_package_exclusions = False
 # Print debugging info related to use of memcached during a resolve
 debug_resolve_memcache = False
 
+# Print debugging info related to the local resolve cache (see :data:`resolve_cache_type`)
+debug_resolve_cache = False
+
 # Debug memcache usage. As well as printing debugging info to stdout, it also
 # sends human-readable strings as memcached keys (that you can read by running
 # ``memcached -vv`` as the server)
@@ -141,6 +141,26 @@ def load_from_file(filepath, format_=FileFormat.py, update_data_callback=None,
                                update_data_callback=update_data_callback)
 
 
+def prefetch_files(files):
+    """Fetch the cached contents of several files in one go.
+
+    This only has an effect if package files are cached in memcached, and
+    within a pooled memcached connection (see `pool_memcached_connections`).
+    Subsequent `load_from_file` calls for these files then avoid a memcached
+    request each.
+
+    Args:
+        files (list of tuple): (filepath, format_) tuples.
+    """
+    args_list = []
+    for filepath, format_ in files:
+        filepath = os.path.realpath(filepath)
+        if filepath not in file_cache:
+            args_list.append((filepath, format_, None))
+
+    _load_from_file.prefetch(args_list)
+
+
 def _load_from_file__key(filepath, format_, update_data_callback):
     st = os.stat(filepath)
     if update_data_callback is None:
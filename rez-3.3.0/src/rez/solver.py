@@ -12,7 +12,8 @@ with a faster resolve.
 See SOLVER.md for an in-depth description of how this module works.
 """
 from rez.config import config
-from rez.packages import iter_packages
+from rez.packages import iter_packages, prefetch_package_families, \
+    prefetch_packages
 from rez.package_repository import package_repo_stats
 from rez.utils.logging_ import print_debug
 from rez.utils.data_utils import cached_property
@@ -26,6 +27,7 @@ from rez.version import VersionedObject, Requirement, RequirementList
 from contextlib import contextmanager
 from enum import Enum
 from itertools import product, chain
+import multiprocessing
 import copy
 import time
 import sys
@@ -414,30 +416,34 @@ class _PackageEntry(object):
             two variants are identical (which shouldn't happen) - this is just
             here as a safety measure so that sorting is guaranteed repeatable
             regardless.
-        """
-        from rez.package_order import get_orderer
 
+        Note:
+            A variant's sort key depends only on the variant and the solver's
+            request, so it is calculated once per solve and cached, as are the
+            sort keys of the requirement ranges that it is built from.
+        """
         if self.sorted:
             return
 
-        def key(variant):
+        solver = self.solver
+        cache = solver.variant_sort_keys
+
+        def _key(variant):
             requested_key = []
             names = set()
 
-            for i, request in enumerate(self.solver.request_list):
+            for i, request in enumerate(solver.request_list):
                 if not request.conflict:
                     req = variant.requires_list.get(request.name)
                     if req is not None:
-                        orderer = get_orderer(req.name, orderers=self.solver.package_orderers or {})
-                        range_key = orderer.sort_key(req.name, req.range)
+                        range_key = solver._get_range_sort_key(req, requested=True)
                         requested_key.append((-i, range_key))
                         names.add(req.name)
 
             additional_key = []
             for request in variant.requires_list:
                 if not request.conflict and request.name not in names:
-                    orderer = get_orderer(request.name, orderers=self.solver.package_orderers)
-                    range_key = orderer.sort_key(request.name, request.range)
+                    range_key = solver._get_range_sort_key(request)
                     additional_key.append((range_key, request.name))
 
             if (VariantSelectMode[config.variant_select_mode] == VariantSelectMode.version_priority):
@@ -454,7 +460,19 @@ class _PackageEntry(object):
 
             return k
 
-        self.variants.sort(key=key, reverse=True)
+        def key(variant):
+            k = cache.get(id(variant))
+            if k is None:
+                k = _key(variant)
+                cache[id(variant)] = k
+            else:
+                solver.variant_sort_key_hits += 1
+            return k
+
+        with solver.timed(solver.sort_time):
+            self.variants.sort(key=key, reverse=True)
+
+        solver.sorts_count += 1
         self.sorted = True
 
 
@@ -481,6 +499,14 @@ class _PackageVariantList(_Common):
                 "package family not found: %s (searched: %s)"
                 % (package_name, "; ".join(self.solver.package_paths)))
 
+        # Entry versions in ascending order, and the matching entry indexes,
+        # so intersections can bisect rather than test every entry. Entries
+        # themselves keep their original order, which sorting may depend on.
+        #
+        self.version_order = sorted(range(len(self.entries)),
+                                    key=lambda i: self.entries[i][0].version)
+        self.versions = [self.entries[i][0].version for i in self.version_order]
+
     def get_intersection(self, range_):
         """Get a list of variants that intersect with the given range.
 
@@ -492,15 +518,25 @@ class _PackageVariantList(_Common):
         """
         result = []
 
-        for entry in self.entries:
+        indexes = []
+        for slice_ in range_.intersecting_slices(self.versions):
+            indexes.extend(self.version_order[slice_])
+        indexes.sort()
+
+        # fetch the definitions of the packages about to be loaded in one go
+        if config.memcached_uri:
+            packages = [self.entries[i][0] for i in indexes
+                        if self.entries[i][1] is False]
+            if len(packages) > 1:
+                prefetch_packages(packages)
+
+        for i in indexes:
+            entry = self.entries[i]
             package, value = entry
 
             if value is None:
                 continue  # package was blocked by package filters
 
-            if package.version not in range_:
-                continue
-
             if isinstance(value, list):
                 variants = value
                 entry_ = _PackageEntry(package, variants, self.solver)
@@ -874,12 +910,20 @@ class _PackageVariantSlice(_Common):
 
         self._common_fams = set(self.first_variant.request_fams)
         self._fam_requires = set()
+        request_fams = set()
 
         for variant in self.iter_variants():
             self._common_fams &= variant.request_fams
+            request_fams |= variant.request_fams
             self._fam_requires |= (variant.request_fams
                                    | variant.conflict_request_fams)
 
+        # the families these variants require are likely to be loaded next.
+        # Only done here, once the requires have been loaded anyway, so that
+        # variants that are reduced away before then are never loaded
+        if config.memcached_uri:
+            self.solver.package_cache.prefetch(request_fams)
+
     def __len__(self):
         if self._len is None:
             self._len = 0
@@ -927,6 +971,20 @@ class PackageVariantCache(object):
         self.solver = solver
         self.variant_lists = {}  # {package-name: _PackageVariantList}
 
+    def prefetch(self, package_names):
+        """Hint that the given package families are likely to be loaded soon.
+
+        This lets repositories batch their cache lookups for these families
+        (see `prefetch_package_families`). Families already loaded are ignored.
+        """
+        names = [
+            x for x in package_names
+            if x not in self.variant_lists and not x.startswith('.')
+        ]
+
+        if names:
+            prefetch_package_families(names, paths=self.solver.package_paths)
+
     def get_variant_slice(self, package_name, range_):
         """Get a list of variants from the cache.
 
@@ -1230,14 +1288,17 @@ class _ResolvePhase(_Common):
     If the resolve phase gets to a point where every package scope is solved,
     then the entire resolve is considered to be solved.
     """
-    def __init__(self, solver):
+    def __init__(self, solver, package_requests=None):
         self.solver = solver
         self.failure_reason = None
         self.extractions = {}
         self.status = SolverStatus.pending
 
+        if package_requests is None:
+            package_requests = self.solver.request_list
+
         self.scopes = []
-        for package_request in self.solver.request_list:
+        for package_request in package_requests:
             scope = _PackageScope(package_request, solver=solver)
             self.scopes.append(scope)
 
@@ -1880,6 +1941,233 @@ class _ResolvePhase(_Common):
         return ' '.join(str(x) for x in self.scopes)
 
 
+class _PhaseSpeculator(object):
+    """Speculatively solves phases further down a solver's phase stack.
+
+    Each speculative solve runs in a forked child process, which inherits the
+    solver in its current state, and solves a single stacked phase (and every
+    phase split from it) in isolation. If the child proves that there is no
+    solution in that subtree, the parent solver skips it, either when it pops
+    the phase, or by discarding the subtree if it has already started on it.
+
+    Any other outcome (a solve, a cycle or an error) is ignored - the parent
+    always finds these itself. The result of a solve is therefore identical
+    to that of a serial solve; only the failures the parent has to explore are
+    reduced. The exception is a solve aborted by the solver's callback (for
+    example, on a maximum number of fails, or a time limit): fails found by
+    speculative solves are counted in bulk, so the abort may happen at a
+    different point, with a different failure.
+    """
+    def __init__(self, solver, num_workers):
+        self.solver = solver
+        self.num_workers = num_workers
+        self.mp = multiprocessing.get_context("fork")
+
+        # {id(phase): _SpeculativeSolve}, for phases still on the stack
+        self.pending = {}
+
+        # list of (stack depth, _SpeculativeSolve, num fails), for phases
+        # that the solver has popped and is now exploring
+        self.active = []
+
+    @classmethod
+    def is_supported(cls):
+        return ("fork" in multiprocessing.get_all_start_methods())
+
+    def on_pop(self, phase):
+        """Called when the solver pops a phase that it is about to solve.
+
+        Returns:
+            `_ResolvePhase`: The phase to solve, or a failed phase if the
+            phase is already known to have no solution.
+        """
+        job = self.pending.pop(id(phase), None)
+        if job is None:
+            return phase
+
+        if job.poll() == SolverStatus.failed:
+            self.solver.skipped_fails += max(job.num_fails - 1, 0)
+            return job.failed_phase()
+
+        if job.is_running():
+            depth = len(self.solver.phase_stack)
+            num_fails = len(self.solver.failed_phase_list)
+            self.active.append((depth, job, num_fails))
+
+        return phase
+
+    def update(self):
+        """Reap finished speculative solves and start new ones."""
+        solver = self.solver
+        stack = solver.phase_stack
+
+        # discard a subtree that the solver is exploring, if it has been shown
+        # to have no solution. Outermost subtrees are checked first.
+        for i, (depth, job, num_fails) in enumerate(self.active):
+            if job.poll() != SolverStatus.failed:
+                continue
+
+            solver.pr("speculative solve failed, discarding phases from "
+                      "depth %d", depth)
+            local_fails = len(solver.failed_phase_list) - num_fails + 1
+            solver.skipped_fails += max(job.num_fails - local_fails, 0)
+
+            del stack[depth:]
+            solver._push_phase(job.failed_phase())
+            del self.active[i:]
+            break
+
+        # stop solves that are no longer relevant
+        active = []
+        for entry in self.active:
+            depth, job, _ = entry
+            if len(stack) <= depth or \
+                    (len(stack) == depth + 1 and stack[-1].status in
+                     (SolverStatus.failed, SolverStatus.cyclic)):
+                job.stop()
+            else:
+                active.append(entry)
+        self.active = active
+
+        phase_ids = set(id(x) for x in stack)
+        for key, job in list(self.pending.items()):
+            if key not in phase_ids:
+                job.stop()
+                del self.pending[key]
+
+        # start new solves, on the stacked phases that the solver will reach
+        # soonest. The top phase is skipped, as it is next to be solved.
+        num_running = sum(1 for _, job, _ in self.active if job.is_running())
+        num_running += sum(1 for job in self.pending.values() if job.is_running())
+
+        for phase in reversed(stack[:-1]):
+            if num_running >= self.num_workers:
+                break
+            if id(phase) in self.pending or \
+                    phase.status not in (SolverStatus.pending, SolverStatus.exhausted):
+                continue
+
+            job = _SpeculativeSolve(self, phase)
+            if not job.is_running():
+                continue  # could not fork
+
+            self.pending[id(phase)] = job
+            num_running += 1
+
+    def stop(self):
+        """Stop all speculative solves."""
+        for job in self.pending.values():
+            job.stop()
+        for _, job, _ in self.active:
+            job.stop()
+
+        self.pending = {}
+        self.active = []
+
+
+class _SpeculativeSolve(object):
+    """A single speculative phase solve, in a forked child process."""
+    def __init__(self, speculator, phase):
+        self.phase = phase
+        self.status = None
+        self.num_fails = 0
+        self.failure_reason = None
+        self.proc = None
+
+        recv_conn, send_conn = speculator.mp.Pipe(duplex=False)
+
+        try:
+            self.proc = speculator.mp.Process(
+                target=self._run, args=(speculator.solver, phase, send_conn))
+            self.proc.daemon = True
+            self.proc.start()
+        except (OSError, ValueError):
+            self.proc = None
+            recv_conn.close()
+        else:
+            self.conn = recv_conn
+        finally:
+            send_conn.close()
+
+    def is_running(self):
+        return (self.proc is not None and self.status is None)
+
+    def poll(self):
+        """Returns the result of the solve, or None if not yet known."""
+        if not self.is_running():
+            return self.status
+
+        try:
+            if not self.conn.poll():
+                return None
+            self.status, self.num_fails, self.failure_reason = self.conn.recv()
+        except (EOFError, OSError):
+            self.status = SolverStatus.unsolved  # child died, result unknown
+
+        self.stop()
+        return self.status
+
+    def failed_phase(self):
+        phase = copy.copy(self.phase)
+        phase.status = SolverStatus.failed
+        phase.failure_reason = self.failure_reason
+        return phase
+
+    def stop(self):
+        if self.proc is None:
+            return
+
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+        self.proc = None
+
+        if self.status is None:
+            self.status = SolverStatus.unsolved
+
+    @staticmethod
+    def _run(solver, phase, conn):
+        # note: this runs in the forked child process
+        status = SolverStatus.unsolved
+        num_fails = 0
+        failure_reason = None
+
+        try:
+            from rez.utils.memcached import scoped_instance_manager
+
+            # don't share the parent's memcached connections
+            scoped_instance_manager.clients = {}
+
+            solver.pr = _Printer(0)
+            solver.callback = None
+            solver.package_load_callback = None
+            solver.speculator = None
+            solver.phase_stack = [phase]
+            solver.failed_phase_list = []
+            solver.depth_counts = {0: 0}
+
+            while solver.status == SolverStatus.unsolved:
+                solver.solve_step()
+
+            status = solver.phase_stack[-1].status
+            num_fails = solver.num_fails
+            if status == SolverStatus.failed:
+                failure_reason = solver.failure_reason()
+        except Exception:
+            status = SolverStatus.unsolved
+
+        try:
+            try:
+                conn.send((status, num_fails, failure_reason))
+            except Exception:
+                # failure reason may not be picklable
+                conn.send((status, num_fails, None))
+            conn.close()
+        finally:
+            os._exit(0)
+
+
 class Solver(_Common):
     """Solver.
 
@@ -1893,7 +2181,8 @@ class Solver(_Common):
                  package_filter=None, package_orderers=None, callback=None,
                  building=False, optimised=True, verbosity=0, buf=None,
                  package_load_callback=None, prune_unfailed=True,
-                 suppress_passive=False, print_stats=False):
+                 suppress_passive=False, print_stats=False, parallel=None,
+                 seed_variants=None):
         """Create a Solver.
 
         Args:
@@ -1926,6 +2215,24 @@ class Solver(_Common):
                 has had no effect on the solve. This argument only has an
                 effect if `verbosity` > 2.
             print_stats (bool): If true, print advanced solver stats at the end.
+            parallel (int): If greater than 1, up to this many phases further
+                down the phase stack are solved speculatively, in forked child
+                processes, so that subtrees with no solution can be skipped.
+                The result is identical to that of a serial solve, unless
+                `callback` aborts the solve. This is only supported on
+                platforms that can fork; elsewhere, the solve is serial. Note
+                that failures found by speculative solves are not visible to
+                `callback`, other than via the number of fails, which can then
+                grow by more than one at a time.
+            seed_variants (list of `Variant`): Variants from a previous
+                resolve, to seed the solve with. Each seed restricts its
+                package to the seed's version, should that package appear in
+                the resolve, so that only packages affected by a change in
+                request need to be re-resolved. Seeds that do not fit the
+                request are ignored. If the seeded solve fails, it is retried
+                without the seeds involved in the failure, and failing that,
+                without any seeds. Note that the result may differ from that
+                of an unseeded solve.
         """
         self.package_paths = package_paths
         self.package_filter = package_filter
@@ -1940,6 +2247,9 @@ class Solver(_Common):
         self.pr = _Printer(verbosity, buf=buf, suppress_passive=suppress_passive)
         self.print_stats = print_stats
         self.buf = buf
+        self.parallel = parallel or 1
+        self.speculator = None
+        self.seed_requests = []
 
         if _force_unoptimised_solver:
             self.optimised = False
@@ -1948,6 +2258,7 @@ class Solver(_Common):
 
         self.phase_stack = None
         self.failed_phase_list = None
+        self.skipped_fails = 0
         self.abort_reason = None
         self.callback_return = None
         self.depth_counts = None
@@ -1971,6 +2282,17 @@ class Solver(_Common):
         self.reduction_time = [0.0]
         self.reduction_test_time = [0.0]
 
+        self.sorts_count = 0
+        self.variant_sort_key_hits = 0
+        self.range_sort_key_hits = 0
+        self.sort_time = [0.0]
+
+        # sort key caches, see `_PackageEntry.sort`. Variants are keyed on id,
+        # which is safe because the package cache holds onto them.
+        self.orderers = {}
+        self.range_sort_keys = {}
+        self.variant_sort_keys = {}
+
         self._init()
 
         self.package_cache = PackageVariantCache(self)
@@ -1995,8 +2317,13 @@ class Solver(_Common):
             s = ' '.join(map(str, self.request_list.requirements))
             self.pr("merged request: %s", s)
 
+        if seed_variants:
+            self.seed_requests = self._get_seed_requests(seed_variants)
+            if self.pr and self.seed_requests:
+                self.pr("seeds: %s", ' '.join(map(str, self.seed_requests)))
+
         # create the initial phase
-        phase = _ResolvePhase(solver=self)
+        phase = self._create_initial_phase()
         self._push_phase(phase)
 
     @contextmanager
@@ -2043,7 +2370,7 @@ class Solver(_Common):
     def num_fails(self):
         """Return the number of failed solve steps that have been executed.
         Note that num_solves is inclusive of failures."""
-        n = len(self.failed_phase_list)
+        n = len(self.failed_phase_list) + self.skipped_fails
         if self.phase_stack[-1].status in (SolverStatus.failed, SolverStatus.cyclic):
             n += 1
         return n
@@ -2086,7 +2413,7 @@ class Solver(_Common):
     def reset(self):
         """Reset the solver, removing any current solve."""
         if not self.request_list.conflict:
-            phase = _ResolvePhase(self.request_list.requirements, solver=self)
+            phase = self._create_initial_phase()
             self.pr("resetting...")
             self._init()
             self._push_phase(phase)
@@ -2101,11 +2428,25 @@ class Solver(_Common):
         t1 = time.time()
         pt1 = package_repo_stats.package_load_time
 
+        if self.parallel > 1 and _PhaseSpeculator.is_supported():
+            self.speculator = _PhaseSpeculator(self, self.parallel)
+
         # iteratively solve phases
-        while self.status == SolverStatus.unsolved:
-            self.solve_step()
-            if self.status == SolverStatus.unsolved and not self._do_callback():
-                break
+        try:
+            while True:
+                while self.status == SolverStatus.unsolved:
+                    self.solve_step()
+                    if self.speculator and self.status == SolverStatus.unsolved:
+                        self.speculator.update()
+                    if self.status == SolverStatus.unsolved and not self._do_callback():
+                        break
+
+                if not self._reseed():
+                    break
+        finally:
+            if self.speculator:
+                self.speculator.stop()
+                self.speculator = None
 
         self.load_time = package_repo_stats.package_load_time - pt1
         self.solve_time = time.time() - t1
@@ -2136,6 +2477,15 @@ class Solver(_Common):
             "intersection_test_time": self.intersection_test_time[0]
         }
 
+        sort_stats = {
+            "num_sorts": self.sorts_count,
+            "num_variant_sort_keys": len(self.variant_sort_keys),
+            "num_variant_sort_key_hits": self.variant_sort_key_hits,
+            "num_range_sort_keys": len(self.range_sort_keys),
+            "num_range_sort_key_hits": self.range_sort_key_hits,
+            "sort_time": self.sort_time[0]
+        }
+
         reduction_stats = {
             "num_reductions": self.reductions_count,
             "num_reduction_tests": self.reduction_tests_count,
@@ -2155,7 +2505,8 @@ class Solver(_Common):
             "global": global_stats,
             "extractions": extraction_stats,
             "intersections": intersection_stats,
-            "reductions": reduction_stats
+            "reductions": reduction_stats,
+            "sorts": sort_stats
         }
 
     def solve_step(self):
@@ -2176,6 +2527,15 @@ class Solver(_Common):
             self.failed_phase_list.append(phase)
             phase = self._pop_phase()
 
+        if self.speculator:
+            phase = self.speculator.on_pop(phase)
+            if phase.status == SolverStatus.failed:
+                self.pr("phase has no solution, as shown by a speculative solve")
+                self._push_phase(phase)
+                if self.pr and len(self.phase_stack) == 1:
+                    self.pr.header("FAIL: there is no solution")
+                return
+
         if phase.status == SolverStatus.exhausted:
             self.pr.subheader("SPLITTING:")
             phase, next_phase = phase.split()
@@ -2308,6 +2668,7 @@ class Solver(_Common):
     def _init(self):
         self.phase_stack = []
         self.failed_phase_list = []
+        self.skipped_fails = 0
         self.depth_counts = {}
         self.solve_time = 0.0
         self.load_time = 0.0
@@ -2329,6 +2690,88 @@ class Solver(_Common):
         self.reduction_time = [0.0]
         self.reduction_test_time = [0.0]
 
+        self.sorts_count = 0
+        self.variant_sort_key_hits = 0
+        self.range_sort_key_hits = 0
+        self.sort_time = [0.0]
+
+    def _get_range_sort_key(self, request, requested=False):
+        from rez.package_order import get_orderer
+
+        # note that, for requested packages, an absence of package orderers
+        # means no orderers, rather than the globally configured orderers
+        orderer_key = (request.name, requested)
+        orderer = self.orderers.get(orderer_key)
+        if orderer is None:
+            orderers = self.package_orderers
+            if requested:
+                orderers = orderers or {}
+            orderer = get_orderer(request.name, orderers=orderers)
+            self.orderers[orderer_key] = orderer
+
+        key = (id(orderer), request.name, request.range)
+        range_key = self.range_sort_keys.get(key)
+
+        if range_key is None:
+            range_key = orderer.sort_key(request.name, request.range)
+            self.range_sort_keys[key] = range_key
+        else:
+            self.range_sort_key_hits += 1
+        return range_key
+
+    def _get_seed_requests(self, seed_variants):
+        seeds = []
+        for variant in seed_variants:
+            request = self.request_list.get(variant.name)
+            if request is not None and \
+                    (request.conflict or not request.range.contains_version(variant.version)):
+                continue
+
+            seed = Requirement("~%s==%s" % (variant.name, str(variant.version)))
+            seeds.append(seed)
+
+        return seeds
+
+    def _create_initial_phase(self):
+        if config.memcached_uri:
+            self.package_cache.prefetch(
+                x.name for x in chain(self.request_list.requirements,
+                                      self.seed_requests)
+                if not x.conflict)
+
+        if not self.seed_requests:
+            return _ResolvePhase(solver=self)
+
+        requests = RequirementList(self.request_list.requirements + self.seed_requests)
+        return _ResolvePhase(solver=self, package_requests=requests)
+
+    def _reseed(self):
+        """Drop seeds after a failed seeded solve.
+
+        Returns:
+            bool: True if the solve should be retried.
+        """
+        if not self.seed_requests or self.status != SolverStatus.failed \
+                or self.callback_return == SolverCallbackReturn.fail:
+            return False
+
+        failed_names = set(x.name for x in (self.failure_packages() or []))
+        seeds = [x for x in self.seed_requests if x.name not in failed_names]
+        if len(seeds) == len(self.seed_requests):
+            seeds = []
+
+        if self.pr:
+            self.pr.header("seeded solve failed, retrying with %d of %d seeds",
+                           len(seeds), len(self.seed_requests))
+
+        if self.speculator:
+            self.speculator.stop()
+
+        self.seed_requests = seeds
+        self._init()
+        self._push_phase(self._create_initial_phase())
+        return True
+
     def _latest_nonfailed_phase(self):
         if self.status == SolverStatus.failed:
             return None
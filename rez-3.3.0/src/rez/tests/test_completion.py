@@ -38,6 +38,7 @@ class TestCompletion(TestBase):
                         "plugins.build_system",
                         "plugins.release_hook",
                         "plugins.release_vcs",
+                        "plugins.resolve_cache",
                         "plugins.shell"])
         _eq("plugins.release_vcs.releasable_",
             ["plugins.release_vcs.releasable_branches"])
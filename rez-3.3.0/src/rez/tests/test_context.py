@@ -12,6 +12,7 @@ from rez.bundle_context import bundle_context
 from rez.bind import hello_world
 from rez.utils.platform_ import platform_
 from rez.utils.filesystem import is_subdirectory
+from unittest.mock import patch
 import unittest
 import subprocess
 import platform
@@ -113,6 +114,53 @@ class TestContext(TestBase, TempdirMixin):
 
         self.assertEqual(parts, ["covfefe", "hello"])
 
+    def test_environ_caching(self):
+        """Test that the environ of a context is cached per parent environ."""
+        self.update_settings({"cache_context_environ": True})
+        r = ResolvedContext(["hello_world"])
+
+        with patch.object(r, "_execute", wraps=r._execute) as mock_execute:
+            env = r.get_environ(parent_environ={"FOO": "1"})
+            self.assertEqual(env.get("OH_HAI_WORLD"), "hello")
+
+            # changes to the returned dict do not affect the cache
+            env["OH_HAI_WORLD"] = "bye"
+            self.assertEqual(r.get_environ(parent_environ={"FOO": "1"}).get("OH_HAI_WORLD"), "hello")
+            self.assertEqual(mock_execute.call_count, 1)
+
+            r.get_environ(parent_environ={"FOO": "2"})
+            self.assertEqual(mock_execute.call_count, 2)
+
+            # copies do not share the cache, since they may be retargeted
+            r.copy().get_environ(parent_environ={"FOO": "1"})
+            self.assertEqual(mock_execute.call_count, 3)
+
+    def test_execute_command_environ_caching(self):
+        """Test command execution in context, with the environ cached."""
+        if platform_.name == "windows":
+            self.skipTest("This test does not run on Windows due to problems"
+                          " with the automated binding of the 'hello_world'"
+                          " executable.")
+
+        self.update_settings({"cache_context_environ": True})
+        r = ResolvedContext(["hello_world"])
+
+        with patch.object(r, "_execute", wraps=r._execute) as mock_execute:
+            for _ in range(2):
+                p = r.execute_command(["hello_world"], stdout=subprocess.PIPE, text=True)
+                stdout, _ = p.communicate()
+                self.assertEqual(stdout.strip(), "Hello Rez World!")
+
+            # interpreted once, and not passively, so that package commands
+            # side effects still happen
+            self.assertEqual(mock_execute.call_count, 1)
+            executor = mock_execute.call_args[0][0]
+            self.assertFalse(executor.manager.interpreter.passive)
+
+        # the cached environ is shared with get_environ
+        self.assertEqual(r.get_environ().get("OH_HAI_WORLD"), "hello")
+        self.assertEqual(mock_execute.call_count, 1)
+
     def test_serialize(self):
         """Test context serialization."""
 
@@ -129,6 +177,50 @@ class TestContext(TestBase, TempdirMixin):
         env = r2.get_environ()
         self.assertEqual(env.get("OH_HAI_WORLD"), "hello")
 
+    def test_serialize_binary(self):
+        """Test context serialization in binary format."""
+        self.update_settings({"context_file_format": "binary"})
+
+        # save
+        file = os.path.join(self.root, "test_binary.rxt")
+        r = ResolvedContext(["hello_world"])
+        r.save(file)
+
+        with open(file, "rb") as f:
+            self.assertTrue(f.read().startswith(ResolvedContext.binary_magic))
+
+        # load, the graph is not decompressed until needed
+        r2 = ResolvedContext.load(file)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+        self.assertTrue(r2.has_graph)
+        self.assertIsNotNone(r2._graph_data)
+        self.assertIsNotNone(r2.graph())
+        self.assertIsNone(r2._graph_data)
+
+        # verify
+        env = r2.get_environ()
+        self.assertEqual(env.get("OH_HAI_WORLD"), "hello")
+
+    def test_deserialize_lazy_variants(self):
+        """Test that variants of a loaded context are created on first use."""
+        file = os.path.join(self.root, "test_lazy.rxt")
+        r = ResolvedContext(["hello_world"])
+        r.save(file)
+
+        r2 = ResolvedContext.load(file)
+        self.assertIsNone(r2._resolved_packages)
+
+        # serializing does not need the variants
+        self.assertEqual(
+            r2.to_dict(fields=["resolved_packages"]),
+            r.to_dict(fields=["resolved_packages"])
+        )
+        self.assertIsNone(r2._resolved_packages)
+
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+        self.assertIs(r2.resolved_packages[0].context, r2)
+        self.assertIsNone(r2._resolved_package_handles)
+
     def test_deserialize_older_versions(self):
         """Test deserialization of older contexts."""
         baked_contexts_path = self.data_path("contexts")
@@ -298,7 +390,8 @@ class TestContext(TestBase, TempdirMixin):
 
         ignored_properties = [
             'load_path',
-            'graph_string',
+            '_graph_string',
+            '_graph_data',
             'graph_'
         ]
         for k, v in r1.__dict__.items():
@@ -307,6 +400,167 @@ class TestContext(TestBase, TempdirMixin):
             # check types here, as not all type instances are comparable
             self.assertIs(type(v), type(r2.__dict__.get(k)))
 
+    def test_local_resolve_cache(self):
+        """Test caching of resolves in the local resolve cache."""
+        from rez.resolve_cache import create_resolve_cache
+
+        cache_path = os.path.join(self.root, "resolve_cache.db")
+        self.update_settings({
+            "resolve_caching": True,
+            "resolve_cache_type": "local",
+            "plugins": {
+                "resolve_cache": {
+                    "local": {"path": cache_path, "max_entries": 2}
+                }
+            }
+        })
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+
+        r2 = ResolvedContext(["hello_world"])
+        self.assertTrue(r2.from_cache)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+
+        # caching disabled for this context
+        r3 = ResolvedContext(["hello_world"], caching=False)
+        self.assertFalse(r3.from_cache)
+
+        # least recently used entries are evicted
+        cache = create_resolve_cache()
+        cache.set("a", 1)
+        cache.set("b", {"value": 2})
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), {"value": 2})
+        self.assertEqual(cache.get("c"), 3)
+        cache.delete("c")
+        self.assertIsNone(cache.get("c"))
+
+    @unittest.skipIf(platform_.name == "windows", "POSIX permissions only")
+    def test_local_resolve_cache_permissions(self):
+        """Test that the local resolve cache refuses a shared directory."""
+        from rez.resolve_cache import create_resolve_cache
+
+        cache_dir = os.path.join(self.root, "shared_resolve_cache")
+        os.makedirs(cache_dir)
+        os.chmod(cache_dir, 0o777)
+        self.update_settings({
+            "resolve_cache_type": "local",
+            "plugins": {
+                "resolve_cache": {
+                    "local": {"path": os.path.join(cache_dir, "cache.db")}
+                }
+            }
+        })
+
+        cache = create_resolve_cache()
+        with patch("rezplugins.resolve_cache.local.print_warning"):
+            cache.set("a", 1)
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(os.listdir(cache_dir), [])
+
+        # and creates its own directory as private
+        cache_dir = os.path.join(self.root, "private_resolve_cache")
+        self.update_settings({
+            "resolve_cache_type": "local",
+            "plugins": {
+                "resolve_cache": {
+                    "local": {"path": os.path.join(cache_dir, "cache.db")}
+                }
+            }
+        })
+
+        cache = create_resolve_cache()
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+
+    def test_resolve_cache_revalidation(self):
+        """Test background revalidation of cached resolves."""
+        import threading
+        from rez.package_repository import package_repository_manager
+
+        def _wait():
+            for thread in threading.enumerate():
+                if thread.name == "rez-resolve-revalidate":
+                    thread.join()
+
+        self.update_settings({
+            "resolve_caching": True,
+            "resolve_cache_type": "local",
+            "resolve_caching_max_staleness": 3600,
+            "plugins": {
+                "resolve_cache": {
+                    "local": {
+                        "path": os.path.join(self.root, "revalidate_cache.db")
+                    }
+                }
+            }
+        })
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+        r = ResolvedContext(["hello_world"])
+        self.assertTrue(r.from_cache)
+        _wait()
+
+        # a changed package is still served once, then discarded
+        filepath = r.resolved_packages[0].parent.resource.filepath
+        mtime = os.path.getmtime(filepath) + 10
+        os.utime(filepath, (mtime, mtime))
+        package_repository_manager.clear_caches()
+
+        r = ResolvedContext(["hello_world"])
+        self.assertTrue(r.from_cache)
+        _wait()
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+
+    def test_resolve_cache_revalidation_stale(self):
+        """Test revalidation of cached resolves older than the max staleness."""
+        import time
+        from rez import resolver
+
+        self.update_settings({
+            "resolve_caching": True,
+            "resolve_cache_type": "local",
+            "resolve_caching_max_staleness": 3600,
+            "plugins": {
+                "resolve_cache": {
+                    "local": {
+                        "path": os.path.join(self.root, "stale_cache.db")
+                    }
+                }
+            }
+        })
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+
+        # make the entry look stale, and hold background revalidations
+        with patch.object(resolver, "time") as mock_time, \
+                patch.object(resolver.threading, "Thread") as mock_thread:
+            mock_time.time.return_value = time.time() + 7200
+            self.addCleanup(resolver._revalidating_keys.clear)
+
+            # validated in the foreground, and its validation time updated
+            r = ResolvedContext(["hello_world"])
+            self.assertTrue(r.from_cache)
+            self.assertEqual(mock_thread.call_count, 0)
+
+            # so it is now served, and revalidated in the background
+            r = ResolvedContext(["hello_world"])
+            self.assertTrue(r.from_cache)
+            self.assertEqual(mock_thread.call_count, 1)
+
+            # but not again while that revalidation is in flight
+            r = ResolvedContext(["hello_world"])
+            self.assertTrue(r.from_cache)
+            self.assertEqual(mock_thread.call_count, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
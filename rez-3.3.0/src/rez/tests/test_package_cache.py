@@ -5,11 +5,13 @@
 """
 Test package caching.
 """
+import json
 import logging
 import os
 import os.path
 import time
 import subprocess
+import shutil
 import tempfile
 from unittest.mock import patch
 
@@ -19,6 +21,7 @@ from rez.packages import get_package
 from rez.package_cache import PackageCache
 from rez.resolved_context import ResolvedContext
 from rez.exceptions import PackageCacheError
+from rez.system import system
 from rez.utils.filesystem import canonical_path
 
 # Simulated total disk size (1 GiB) for disk space tests.
@@ -340,3 +343,472 @@ class TestPackageCache(TestBase, TempdirMixin):
              patch.object(pkgcache, 'variant_meets_space_requirements', return_value=False):
             _, status = pkgcache.add_variant(variant)
             self.assertEqual(status, PackageCache.VARIANT_SKIPPED)
+
+    def test_caching_pending_variants(self):
+        """Test copying of pending variants by multiple workers."""
+        self.update_settings({
+            "package_cache_workers": 2,
+            "package_cache_clean_limit": -1.0
+        })
+
+        pkgcache = self._pkgcache()
+        variants = [
+            next(get_package("timestamped", "1.1.0").iter_variants()),
+            next(get_package("timestamped", "1.2.0").iter_variants()),
+            next(get_package("versioned", "3.0").iter_variants())
+        ]
+
+        # the most requested variant is copied first, and payloads are only
+        # measured when copied
+        pkgcache._queue_variants(variants)
+        pkgcache._queue_variants(variants[2:])
+        with patch('rez.package_cache.get_tree_size') as mock_size:
+            queue = pkgcache._get_pending_queue({"logger": logging.getLogger()})
+            mock_size.assert_not_called()
+        self.assertEqual(len(queue), 3)
+        self.assertTrue(queue[0].startswith("versioned-3.0-"))
+
+        pkgcache._run_caching_operation(wait_for_copying=False)
+
+        for variant in variants:
+            self.assertNotEqual(pkgcache.get_cached_root(variant), None)
+        self.assertEqual(os.listdir(pkgcache._pending_dir), [])
+        self.assertEqual(os.listdir(pkgcache._requests_dir), [])
+
+    def test_cache_variant_hardlinks(self):
+        """Test that unchanged files are hardlinked from a cached variant."""
+        repo_path = os.path.join(self.root, "linked_packages")
+        pkg_path = os.path.join(repo_path, "linked", "1.0")
+        os.makedirs(pkg_path)
+
+        for name, content in (("data.txt", "data"), ("notes.txt", "1.0")):
+            with open(os.path.join(pkg_path, name), 'w') as f:
+                f.write(content)
+
+        # copytree preserves mtimes, so data.txt is unchanged in 1.1
+        pkg_path2 = os.path.join(repo_path, "linked", "1.1")
+        shutil.copytree(pkg_path, pkg_path2)
+        with open(os.path.join(pkg_path2, "notes.txt"), 'w') as f:
+            f.write("1.1")
+
+        for path, version in ((pkg_path, "1.0"), (pkg_path2, "1.1")):
+            with open(os.path.join(path, "package.py"), 'w') as f:
+                f.write("name = 'linked'\nversion = '%s'\n" % version)
+
+        self.update_settings({
+            "packages_path": [repo_path],
+            "package_cache_copy_mode": "hardlink"
+        })
+
+        pkgcache = self._pkgcache()
+        rootpaths = []
+        for version in ("1.0", "1.1"):
+            variant = next(get_package("linked", version).iter_variants())
+            with patch.object(pkgcache, '_record_stats') as mock_stats:
+                rootpath, status = pkgcache.add_variant(variant, force=True)
+            self.assertEqual(status, PackageCache.VARIANT_CREATED)
+            rootpaths.append(rootpath)
+
+        # linked files are not counted as copied
+        bytes_copied = mock_stats.call_args[1]["bytes_copied"]
+        self.assertEqual(
+            bytes_copied,
+            pkgcache._get_cached_variant_size(rootpath) - len("data")
+        )
+
+        def _stat(i, name):
+            return os.stat(os.path.join(rootpaths[i], name))
+
+        self.assertEqual(_stat(0, "data.txt").st_ino, _stat(1, "data.txt").st_ino)
+        self.assertNotEqual(_stat(0, "notes.txt").st_ino, _stat(1, "notes.txt").st_ino)
+
+        with open(os.path.join(rootpaths[1], "notes.txt")) as f:
+            self.assertEqual(f.read(), "1.1")
+
+    def test_cache_variant_lazy(self):
+        """Test that lazily cached files are copied once accessed."""
+        repo_path = os.path.join(self.root, "lazy_packages")
+        pkg_path = os.path.join(repo_path, "lazy", "1.0")
+        os.makedirs(os.path.join(pkg_path, "bin"))
+
+        for name in ("data.txt", os.path.join("bin", "tool")):
+            with open(os.path.join(pkg_path, name), 'w') as f:
+                f.write(name)
+        with open(os.path.join(pkg_path, "package.py"), 'w') as f:
+            f.write("name = 'lazy'\nversion = '1.0'\n")
+
+        self.update_settings({
+            "packages_path": [repo_path],
+            "package_cache_copy_mode": "lazy"
+        })
+
+        pkgcache = self._pkgcache()
+        variant = next(get_package("lazy", "1.0").iter_variants())
+        rootpath, status = pkgcache.add_variant(variant, force=True)
+        self.assertEqual(status, PackageCache.VARIANT_CREATED)
+        self.assertEqual(pkgcache._get_cached_variant_size(rootpath), 0)
+
+        tool_filepath = os.path.join(rootpath, "bin", "tool")
+        data_filepath = os.path.join(rootpath, "data.txt")
+        self.assertTrue(os.path.islink(tool_filepath))
+        self.assertTrue(os.path.islink(data_filepath))
+
+        recorded = pkgcache.record_access(
+            [os.path.join(rootpath, "bin"), self.root],
+            package_cache_async=False
+        )
+        self.assertEqual(recorded, [os.path.join(rootpath, "bin")])
+
+        self.assertFalse(os.path.islink(tool_filepath))
+        self.assertTrue(os.path.islink(data_filepath))
+        with open(tool_filepath) as f:
+            self.assertEqual(f.read(), os.path.join("bin", "tool"))
+
+        self.assertEqual(
+            pkgcache._get_cached_variant_size(rootpath),
+            os.path.getsize(tool_filepath)
+        )
+        self.assertFalse(os.path.exists(pkgcache._access_log_filepath))
+
+    def test_cache_variant_resume_stalled(self):
+        """Test that a stalled copy is resumed, skipping copied files."""
+        repo_path = os.path.join(self.root, "resumed_packages")
+        pkg_path = os.path.join(repo_path, "resumed", "1.0")
+        os.makedirs(pkg_path)
+
+        for name, content in (("copied.txt", "data"), ("partial.txt", "data")):
+            with open(os.path.join(pkg_path, name), 'w') as f:
+                f.write(content)
+        with open(os.path.join(pkg_path, "package.py"), 'w') as f:
+            f.write("name = 'resumed'\nversion = '1.0'\n")
+
+        self.update_settings({"packages_path": [repo_path]})
+
+        pkgcache = self._pkgcache()
+        variant = next(get_package("resumed", "1.0").iter_variants())
+
+        # simulate a copy that stalled after copying one file
+        path = pkgcache._get_hash_path(variant)
+        rootpath = os.path.join(path, "a")
+        os.makedirs(rootpath)
+
+        with open(os.path.join(path, "a.json"), 'w') as f:
+            f.write(json.dumps({"handle": variant.handle.to_dict()}))
+
+        copying_filepath = os.path.join(path, ".copying-a")
+        with open(copying_filepath, 'w'):
+            pass
+        mtime = time.time() - PackageCache._COPYING_TIME_MAX - 10
+        os.utime(copying_filepath, (mtime, mtime))
+
+        # same size as the source, so only a recopy would change it
+        with open(os.path.join(rootpath, "copied.txt"), 'w') as f:
+            f.write("XXXX")
+        with open(os.path.join(rootpath, "partial.txt"), 'w') as f:
+            f.write("da")
+
+        st = os.stat(os.path.join(pkg_path, "copied.txt"))
+        with open(os.path.join(path, ".manifest-a"), 'w') as f:
+            f.write(json.dumps(["copied.txt", st.st_size, st.st_mtime_ns, None]))
+            f.write('\n["partial.txt", ')  # interrupted write
+
+        def _read(name):
+            with open(os.path.join(rootpath, name)) as f:
+                return f.read()
+
+        status, _ = pkgcache._get_cached_root(variant)
+        self.assertEqual(status, PackageCache.VARIANT_COPY_STALLED)
+
+        # not resumed by default
+        _, status = pkgcache.add_variant(variant, force=True)
+        self.assertEqual(status, PackageCache.VARIANT_COPY_STALLED)
+
+        self.update_settings({
+            "packages_path": [repo_path],
+            "package_cache_resume_copies": True
+        })
+
+        # nor if the copying process is still running on this host
+        with open(copying_filepath, 'w') as f:
+            f.write(json.dumps({"host": system.hostname, "pid": os.getpid()}))
+        os.utime(copying_filepath, (mtime, mtime))
+
+        _, status = pkgcache.add_variant(variant, force=True)
+        self.assertEqual(status, PackageCache.VARIANT_COPYING)
+        self.assertEqual(_read("partial.txt"), "da")
+
+        with open(copying_filepath, 'w'):
+            pass
+        os.utime(copying_filepath, (mtime, mtime))
+
+        rootpath2, status = pkgcache.add_variant(variant, force=True)
+        self.assertEqual(status, PackageCache.VARIANT_CREATED)
+        self.assertEqual(rootpath2, rootpath)
+
+        self.assertEqual(_read("copied.txt"), "XXXX")
+        self.assertEqual(_read("partial.txt"), "data")
+        self.assertFalse(os.path.exists(copying_filepath))
+        self.assertFalse(os.path.exists(os.path.join(path, ".manifest-a")))
+
+        status, _ = pkgcache._get_cached_root(variant)
+        self.assertEqual(status, PackageCache.VARIANT_FOUND)
+
+    @patch('rez.package_cache.shutil.disk_usage')
+    def test_evict_least_recently_used(self, mock_du):
+        """Test that LRU variants are evicted above the high watermark."""
+        repo_path = os.path.join(self.root, "evicted_packages")
+
+        for version in ("1.0", "2.0"):
+            pkg_path = os.path.join(repo_path, "evicted", version)
+            os.makedirs(pkg_path)
+            with open(os.path.join(pkg_path, "package.py"), 'w') as f:
+                f.write("name = 'evicted'\nversion = '%s'\n" % version)
+
+        self.update_settings({"packages_path": [repo_path]})
+        pkgcache = self._pkgcache()
+
+        total = 1_000_000_000_000
+        mock_du.return_value = (total, 0, total)
+
+        rootpaths = []
+        for version in ("1.0", "2.0"):
+            variant = next(get_package("evicted", version).iter_variants())
+            rootpath, _ = pkgcache.add_variant(variant, force=True)
+            rootpaths.append(rootpath)
+
+            # payload size is recorded at copy time
+            with open(rootpath + ".json") as f:
+                self.assertGreater(json.loads(f.read())["size"], 0)
+
+        # make 1.0 the least recently used, and big enough to reach the low
+        # watermark on its own
+        for rootpath in rootpaths:
+            pkgcache._set_cached_variant_size(rootpath, total * 0.15)
+        os.utime(rootpaths[0] + ".json", (1, 1))
+
+        self.update_settings({
+            "package_cache_high_watermark": 80,
+            "package_cache_low_watermark": 70
+        })
+
+        mock_du.return_value = (total, total * 0.75, total * 0.25)
+        self.assertEqual(pkgcache.evict(), [])
+
+        # recorded sizes are used as scanned, without being read again
+        mock_du.return_value = (total, total * 0.8, total * 0.2)
+        with patch.object(pkgcache, "_get_cached_variant_size",
+                          wraps=pkgcache._get_cached_variant_size) as mock_size:
+            evicted = pkgcache.evict()
+        self.assertEqual([str(x.version) for x in evicted], ["1.0"])
+        self.assertNotIn(rootpaths[0], [x.args[0] for x in mock_size.call_args_list])
+
+        self.assertFalse(os.path.exists(rootpaths[0]))
+        self.assertTrue(os.path.exists(rootpaths[1]))
+        self.assertEqual(os.listdir(pkgcache._remove_dir), [])
+
+    def test_clean_largest_stalest_first(self):
+        """Test that a time limited clean removes the largest, stalest variants first."""
+        repo_path = os.path.join(self.root, "cleaned_packages")
+        versions = ("1.0", "2.0", "3.0")
+
+        for version in versions:
+            pkg_path = os.path.join(repo_path, "cleaned", version)
+            os.makedirs(pkg_path)
+            with open(os.path.join(pkg_path, "package.py"), 'w') as f:
+                f.write("name = 'cleaned'\nversion = '%s'\n" % version)
+
+        self.update_settings({
+            "packages_path": [repo_path],
+            "package_cache_clean_workers": 2
+        })
+        pkgcache = self._pkgcache()
+
+        # (size, days since last used) for each version
+        usage = ((1000, 400), (100000, 100), (10, 40))
+        variants = []
+        rootpaths = []
+
+        for version, (size, days) in zip(versions, usage):
+            variant = next(get_package("cleaned", version).iter_variants())
+            rootpath, _ = pkgcache.add_variant(variant, force=True)
+            variants.append(variant)
+            rootpaths.append(rootpath)
+
+            pkgcache._set_cached_variant_size(rootpath, size)
+            last_used = time.time() - days * 3600 * 24
+            os.utime(rootpath + ".json", (last_used, last_used))
+
+        with patch.object(pkgcache, '_remove_variant',
+                          wraps=pkgcache._remove_variant) as mock_remove, \
+                patch.object(pkgcache, '_write_index_updates',
+                             wraps=pkgcache._write_index_updates) as mock_write:
+            pkgcache.clean(time_limit=60)
+
+        removed = [str(x[0][0].version) for x in mock_remove.call_args_list]
+        self.assertEqual(removed, ["2.0", "1.0", "3.0"])
+
+        # the index is updated once, for all removed variants
+        self.assertEqual(mock_write.call_count, 1)
+        index = pkgcache._read_index(reload=True)
+        for variant in variants:
+            self.assertNotIn(pkgcache._get_variant_key(variant), index)
+
+        for rootpath in rootpaths:
+            self.assertFalse(os.path.exists(rootpath))
+        self.assertEqual(os.listdir(pkgcache._remove_dir), [])
+
+    def test_clean_while_locked(self):
+        """Test that clean does not fail if the cache is locked."""
+        from rez.vendor.lockfile import LockError
+
+        pkgcache = PackageCache(tempfile.mkdtemp(dir=self.root))
+
+        with patch.object(pkgcache, '_lock', side_effect=LockError("locked")):
+            pkgcache.clean()
+
+    def test_variant_payload_size_recorded(self):
+        """Test that variant payload sizes are only measured once."""
+        repo_path = os.path.join(self.root, "sized_packages")
+        pkg_path = os.path.join(repo_path, "sized", "1.0")
+        os.makedirs(pkg_path)
+
+        with open(os.path.join(pkg_path, "data.bin"), 'wb') as f:
+            f.write(b'0' * 1000)
+        with open(os.path.join(pkg_path, "package.py"), 'w') as f:
+            f.write("name = 'sized'\nversion = '1.0'\n")
+
+        self.update_settings({"packages_path": [repo_path]})
+        pkgcache = self._pkgcache()
+        variant = next(get_package("sized", "1.0").iter_variants())
+
+        size = pkgcache.get_variant_payload_size(variant)
+        self.assertGreater(size, 1000)
+
+        with patch('rez.package_cache.get_tree_size') as mock_size:
+            self.assertEqual(pkgcache.get_variant_payload_size(variant), size)
+            mock_size.assert_not_called()
+
+        # records not written recently are cleaned up
+        record_filepath = os.path.join(
+            pkgcache._sizes_dir, pkgcache._get_variant_key(variant))
+        old_filepath = os.path.join(pkgcache._sizes_dir, "0" * 40)
+        with open(old_filepath, 'w') as f:
+            f.write("1000")
+        os.utime(old_filepath, (1, 1))
+
+        pkgcache.clean()
+        self.assertFalse(os.path.exists(old_filepath))
+        self.assertTrue(os.path.exists(record_filepath))
+
+        # and a cached variant's record is removed with it
+        pkgcache.add_variant(variant, force=True)
+        pkgcache.remove_variant(variant)
+        self.assertFalse(os.path.exists(record_filepath))
+
+        # installing a variant records its payload size in the repository
+        install_path = os.path.join(self.root, "sized_install")
+        installed = variant.install(install_path)
+        package_filepath = os.path.join(installed.root, "package.py")
+
+        with patch('rez.package_cache.get_tree_size') as mock_size:
+            self.assertEqual(
+                pkgcache.get_variant_payload_size(installed),
+                os.path.getsize(package_filepath)
+            )
+            mock_size.assert_not_called()
+
+    def test_cached_root_index(self):
+        """Test that cached roots are found via the cache index."""
+        pkgcache = self._pkgcache()
+        variant = next(get_package("versioned", "3.0").iter_variants())
+
+        rootpath, _ = pkgcache.add_variant(variant)
+
+        pkgcache = self._pkgcache()
+        with patch.object(pkgcache, '_get_cached_root') as mock_get:
+            self.assertEqual(pkgcache.get_cached_root(variant), rootpath)
+            mock_get.assert_not_called()
+
+        # variants missing from the index are still found, and indexed
+        os.remove(pkgcache._index_filepath)
+        pkgcache = self._pkgcache()
+        self.assertEqual(pkgcache.get_cached_root(variant), rootpath)
+        self.assertEqual(pkgcache._get_indexed_root(variant), rootpath)
+
+        # an unchanged entry does not rewrite the index
+        mtime = os.stat(pkgcache._index_filepath).st_mtime_ns
+        with pkgcache._lock():
+            pkgcache._update_index(variant, rootpath)
+        self.assertEqual(os.stat(pkgcache._index_filepath).st_mtime_ns, mtime)
+
+        pkgcache.remove_variant(variant)
+        self.assertIsNone(pkgcache._get_indexed_root(variant))
+        self.assertIsNone(pkgcache.get_cached_root(variant))
+
+    def test_prefetch_variants(self):
+        """Test that the most used variants are prefetched."""
+        self.update_settings({"package_cache_clean_limit": -1.0})
+
+        pkgcache = self._pkgcache()
+        variant1 = next(get_package("timestamped", "1.1.0").iter_variants())
+        variant2 = next(get_package("timestamped", "1.2.0").iter_variants())
+
+        # may have been cached by another test
+        for variant in (variant1, variant2):
+            pkgcache.remove_variant(variant)
+
+        # only variants within the limit have their payload size measured
+        with patch.object(pkgcache, 'get_variant_payload_size',
+                          wraps=pkgcache.get_variant_payload_size) as mock_size:
+            queued = pkgcache.prefetch_variants(
+                [variant1, variant2, variant2],
+                limit=1,
+                package_cache_async=False
+            )
+
+        self.assertEqual(queued, [variant2])
+        measured = set(x[0][0] for x in mock_size.call_args_list)
+        self.assertNotIn(variant1, measured)
+        self.assertEqual(pkgcache.get_cached_root(variant1), None)
+        self.assertNotEqual(pkgcache.get_cached_root(variant2), None)
+
+        # cached variants are not queued again
+        queued = pkgcache.prefetch_variants(
+            [variant2], package_cache_async=False)
+        self.assertEqual(queued, [])
+
+    def test_cache_stats(self):
+        """Test package cache statistics."""
+        pkgcache = self._pkgcache()
+        stats = pkgcache.get_stats()
+
+        variant = next(get_package("versioned", "3.0").iter_variants())
+        pkgcache.remove_variant(variant)
+
+        self.assertIsNone(pkgcache.get_cached_root(variant))
+        _, status = pkgcache.add_variant(variant)
+        self.assertEqual(status, PackageCache.VARIANT_CREATED)
+        self.assertIsNotNone(pkgcache.get_cached_root(variant))
+        pkgcache.flush_stats()
+
+        def _delta(name):
+            return stats2[name] - stats[name]
+
+        stats2 = self._pkgcache().get_stats()
+        self.assertEqual(_delta("hits"), 1)
+        self.assertEqual(_delta("misses"), 1)
+        self.assertEqual(_delta("copies"), 1)
+        self.assertGreater(_delta("bytes_copied"), 0)
+
+        # compacting the stats log does not change the stats
+        with pkgcache._lock():
+            pkgcache._compact_stats()
+        self.assertEqual(self._pkgcache().get_stats(), stats2)
+        self.assertFalse(os.path.exists(pkgcache._stats_log_filepath))
+
+        # contexts record their cache hit ratio
+        context = ResolvedContext(["versioned-3.0"])
+        context.get_environ()
+        self.assertEqual(context.package_cache_hit_ratio, 1.0)
+
+        pkgcache.remove_variant(variant)
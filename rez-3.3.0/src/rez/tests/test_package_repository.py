@@ -5,12 +5,18 @@
 """
 Test package repository plugin.
 """
+import glob
+import os
+import shutil
+import threading
+import time
 import unittest
 
 from rezplugins.package_repository import filesystem
 from rez.packages import create_package
 from rez.tests.util import TestBase, TempdirMixin
 from rez.utils.platform_ import platform_
+from rez.version import Version
 
 
 class TestFilesystemPackageRepository(TestBase, TempdirMixin):
@@ -39,3 +45,116 @@ class TestFilesystemPackageRepository(TestBase, TempdirMixin):
         pkg_repository._create_variant(variant, overrides={})
         with self.assertRaises(filesystem.PackageRepositoryError):
             pkg_repository._create_variant(case_mismatch_variant, overrides={})
+
+    def test_package_index(self):
+        """Test that the package index is written, read and invalidated."""
+        self.update_settings({
+            "plugins": {
+                "package_repository": {
+                    "filesystem": {"package_index": True}
+                }
+            }
+        })
+
+        repo_path = os.path.join(self.root, "index_packages")
+        shutil.copytree(self.data_path("solver", "packages"), repo_path)
+
+        # backdate dirs, so that index entries are not considered 'racy'
+        then = time.time() - 3600
+        for path in [repo_path] + glob.glob(os.path.join(repo_path, '*')):
+            os.utime(path, (then, then))
+
+        def _versions(repo, name):
+            family = repo.get_package_family(name)
+            return sorted(str(x.version) for x in repo.iter_packages(family))
+
+        pool = filesystem.ResourcePool(cache_size=None)
+        repo = filesystem.FileSystemPackageRepository(
+            repo_path, pool, disable_memcache=True)
+
+        self.assertEqual(_versions(repo, "pydad"), ["1", "2", "3"])
+        self.assertTrue(os.path.isfile(
+            os.path.join(repo_path, ".index", "pydad.json")))
+
+        # a new repo instance should not need to scan the family
+        pool = filesystem.ResourcePool(cache_size=None)
+        repo = filesystem.FileSystemPackageRepository(
+            repo_path, pool, disable_memcache=True)
+
+        def _scan_version_dirs(root):
+            raise AssertionError("Unexpected scan of %s" % root)
+
+        repo._scan_version_dirs = _scan_version_dirs
+        self.assertEqual(_versions(repo, "pydad"), ["1", "2", "3"])
+
+        pkg = repo.get_package("pydad", Version("2"))
+        self.assertEqual(pkg.state_handle, os.path.getmtime(pkg.filepath))
+
+        # an in-place edit does not change the family dir, but is still seen
+        # by state handles
+        family_mtime = os.path.getmtime(os.path.join(repo_path, "pydad"))
+        os.utime(pkg.filepath, (then + 10, then + 10))
+        self.assertEqual(os.path.getmtime(os.path.join(repo_path, "pydad")), family_mtime)
+
+        pool = filesystem.ResourcePool(cache_size=None)
+        repo = filesystem.FileSystemPackageRepository(
+            repo_path, pool, disable_memcache=True)
+        repo._scan_version_dirs = _scan_version_dirs
+
+        pkg = repo.get_package("pydad", Version("2"))
+        self.assertEqual(pkg.state_handle, then + 10)
+
+        # ignoring a package rebuilds its family entry
+        del repo._scan_version_dirs
+        self.assertEqual(repo.ignore_package("pydad", Version("2")), 1)
+        self.assertEqual(_versions(repo, "pydad"), ["1", "3"])
+
+    def test_parallel_scan(self):
+        """Test that parallel scanning matches serial scanning."""
+        repo_path = os.path.join(self.root, "scan_packages")
+        shutil.copytree(self.data_path("solver", "packages"), repo_path)
+
+        # a hidden package, and a package that is still being built
+        open(os.path.join(repo_path, "pydad", ".ignore2"), 'w').close()
+        open(os.path.join(repo_path, "pymum", ".building4"), 'w').close()
+        os.mkdir(os.path.join(repo_path, "pymum", "4"))
+
+        def _packages():
+            pool = filesystem.ResourcePool(cache_size=None)
+            repo = filesystem.FileSystemPackageRepository(
+                repo_path, pool, disable_memcache=True)
+
+            return set(
+                "%s-%s" % (pkg.name, pkg.version)
+                for family in repo.iter_package_families()
+                for pkg in repo.iter_packages(family)
+            )
+
+        expected = _packages()
+        self.assertIn("pydad-1", expected)
+        self.assertNotIn("pydad-2", expected)
+        self.assertNotIn("pymum-4", expected)
+
+        for check_files in (False, True):
+            self.update_settings({
+                "plugins": {
+                    "package_repository": {
+                        "filesystem": {
+                            "scan_workers": 4,
+                            "check_package_definition_files": check_files
+                        }
+                    }
+                }
+            })
+            self.assertEqual(_packages(), expected)
+
+        # repositories share one thread pool, so recreating them does not
+        # leave threads behind
+        executor = filesystem._get_scan_executor()
+        num_threads = threading.active_count()
+
+        for _ in range(3):
+            self.assertEqual(_packages(), expected)
+
+        self.assertIs(filesystem._get_scan_executor(), executor)
+        self.assertLessEqual(threading.active_count(), num_threads + 4)
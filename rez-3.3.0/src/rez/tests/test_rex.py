@@ -17,10 +17,14 @@ from rez.version import Version
 from rez.version import Requirement
 from rez.tests.util import TestBase
 from rez.utils.backcompat import convert_old_commands
+from rez.utils.sourcecode import SourceCode, compiled_code_cache
 from rez.package_repository import package_repository_manager
 from rez.packages import iter_package_families
+from unittest.mock import patch
 import inspect
 import textwrap
+import tempfile
+import shutil
 import os
 
 
@@ -390,6 +394,96 @@ class TestRex(TestBase):
         _test(_rex_2, env={"A": "foo"}, expected={"A": True, "B": False})
         _test(_rex_3, env={}, expected="not b")
 
+    def test_path_list_building(self):
+        """Test many prepends/appends, interleaved with reads and sets."""
+        ex = self._create_executor({"PATH": "/usr/bin"}, parent_variables=["PATH"])
+        manager = ex.manager
+
+        for i in range(100):
+            manager.prependenv("PATH", "/pre%d" % i)
+            manager.appendenv("PATH", "/post%d" % i)
+
+        expected = ["/pre%d" % i for i in reversed(range(100))] \
+            + ["/usr/bin"] + ["/post%d" % i for i in range(100)]
+        self.assertEqual(manager.getenv("PATH"), os.pathsep.join(expected))
+
+        # vars referenced in values are rejoined before expansion
+        manager.appendenv("PATH", "/a")
+        manager.setenv("PATH_COPY", "$PATH")
+        self.assertEqual(manager.getenv("PATH_COPY"),
+                         os.pathsep.join(expected + ["/a"]))
+
+        # a set replaces the parts built so far
+        manager.setenv("PATH", "/b")
+        manager.prependenv("PATH", "/c")
+        self.assertEqual(ex.get_output()["PATH"], os.pathsep.join(["/c", "/b"]))
+
+    def test_path_list_building_shell(self):
+        """Test many prepends/appends through a shell interpreter."""
+        from rez.shells import create_shell
+        from rez.rex import EscapedString
+
+        sh = create_shell("sh")
+        ex = RexExecutor(interpreter=sh, parent_environ={}, shebang=False)
+
+        # sh implements neither prependenv nor appendenv, and does not expand
+        # env vars, so the whole value of PATH should never be rebuilt
+        with patch.object(EscapedString, "join", wraps=EscapedString.join) as mock_join:
+            for i in range(100):
+                ex.prependenv("PATH", "/pre%d" % i)
+                ex.appendenv("PATH", "/post%d" % i)
+
+        self.assertLessEqual(
+            max(len(call.args[1]) for call in mock_join.call_args_list), 2)
+
+        lines = ex.get_output().strip().split('\n')
+        self.assertEqual(len(lines), 200)
+        self.assertEqual(lines[0], 'export PATH="/pre0"')
+        self.assertEqual(lines[-2], 'export PATH="/pre99:${PATH}"')
+        self.assertEqual(lines[-1], 'export PATH="${PATH}:/post99"')
+
+    def test_compiled_code_cache(self):
+        """Test that compiled package functions are cached on disk."""
+        tmpdir = tempfile.mkdtemp(prefix="rez_test_")
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.update_settings({"tmpdir": tmpdir, "cache_compiled_code": True})
+
+        def _compile(source):
+            # a new cache has no compiled code in memory
+            code = SourceCode(source, filepath="package.py")
+            with patch.object(compiled_code_cache, "codes", {}):
+                return code.compiled
+
+        with patch("rez.utils.sourcecode.compile", wraps=compile) as mock_compile:
+            pyc = _compile('env.PATH.append("{root}/bin")')
+            self.assertEqual(mock_compile.call_count, 1)
+
+            self.assertEqual(_compile('env.PATH.append("{root}/bin")'), pyc)
+            self.assertEqual(mock_compile.call_count, 1)
+
+            _compile('env.PATH.append("{root}/lib")')
+            self.assertEqual(mock_compile.call_count, 2)
+
+        cache_path = compiled_code_cache._get_path()
+        self.assertEqual(len(os.listdir(cache_path)), 2)
+
+        # unused entries are pruned from disk
+        old_filepath = os.path.join(cache_path, os.listdir(cache_path)[0])
+        os.utime(old_filepath, (1, 1))
+        compiled_code_cache._prune(cache_path)
+        self.assertEqual(len(os.listdir(cache_path)), 1)
+
+        # and the least recently used are dropped from memory
+        with patch.object(compiled_code_cache, "codes", {}), \
+                patch.object(compiled_code_cache, "max_codes", 2):
+            for i in range(3):
+                SourceCode("x = %d" % i, filepath="package.py").compiled
+            self.assertEqual(len(compiled_code_cache.codes), 2)
+
+        # a dir that others can write to is not used
+        os.chmod(cache_path, 0o777)
+        self.assertEqual(compiled_code_cache._get_path(), None)
+
     def test_version_binding(self):
         """Test the Rex binding of the Version class."""
         v = VersionBinding(Version("1.2.3alpha"))
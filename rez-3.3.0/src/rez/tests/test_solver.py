@@ -9,9 +9,14 @@ import rez.exceptions
 from rez.version import Requirement
 from rez.solver import Solver, Cycle, SolverStatus
 from rez.config import config
+from rez.package_repository import package_repository_manager
 import unittest
 from rez.tests.util import TestBase
+from unittest.mock import patch
 import itertools
+import multiprocessing
+import time
+import os
 
 
 solver_verbosity = 1
@@ -273,6 +278,170 @@ class TestSolver(TestBase):
                      'python-2.6.8[]',
                      'pyfoo-3.1.0[]'])
 
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_15_parallel_solve(self):
+        """Test that parallel solves give the same result as serial solves."""
+        requests = [
+            ["bahish", "pybah<5"],
+            ["pybah-4", "pyfoo-3.0"],
+            ["python", "pyodd"],
+            ["pymum-3"],
+            ["pyvariants", "python", "nada"],
+            ["test_variant_split_start"],
+            ["test_weakly_reference_variant-2.0", "test_variant_split_mid2-2", "pyfoo"]
+        ]
+
+        def _slow_load(package):
+            # slows the parent solver only, so speculative solves get ahead
+            time.sleep(0.005)
+
+        def _check_solves():
+            for request in requests:
+                reqs = [Requirement(x) for x in request]
+                s1 = Solver(reqs, self.packages_path)
+                s1.solve()
+                s2 = Solver(reqs, self.packages_path, parallel=4,
+                            package_load_callback=_slow_load)
+                s2.solve()
+
+                self.assertEqual(s2.status, s1.status)
+                self.assertEqual(s2.num_fails, s1.num_fails)
+                if s1.status == SolverStatus.solved:
+                    self.assertEqual([str(x) for x in s2.resolved_packages],
+                                     [str(x) for x in s1.resolved_packages])
+                else:
+                    self.assertEqual(str(s2.failure_reason()),
+                                     str(s1.failure_reason()))
+
+        _check_solves()
+
+        # with parallel repository scans, the parent has a scan thread pool
+        # that speculative solves inherit when forked
+        self.update_settings({
+            "plugins": {
+                "package_repository": {
+                    "filesystem": {
+                        "scan_workers": 4,
+                        "check_package_definition_files": True
+                    }
+                }
+            }
+        })
+        package_repository_manager.clear_caches()
+        _check_solves()
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return
+
+        # a forked child can still load a family the parent has not loaded
+        package_repository_manager.clear_caches()
+        repo = package_repository_manager.get_repository(self.packages_path[0])
+        list(repo.iter_packages(repo.get_package_family("pyfoo")))
+
+        mp = multiprocessing.get_context("fork")
+        recv_conn, send_conn = mp.Pipe(duplex=False)
+
+        def _child():
+            family = repo.get_package_family("pybah")
+            send_conn.send(sorted(str(x.version) for x in repo.iter_packages(family)))
+
+        proc = mp.Process(target=_child)
+        proc.daemon = True
+        proc.start()
+
+        try:
+            self.assertTrue(recv_conn.poll(10), "Forked child did not load packages")
+            self.assertEqual(recv_conn.recv(), ["4", "5"])
+        finally:
+            proc.kill()
+            proc.join()
+
+    def test_16_seeded_solve(self):
+        """Test solves seeded with variants from a previous solve."""
+        def _solve(packages, seed_packages):
+            s = Solver([Requirement(x) for x in seed_packages], self.packages_path)
+            s.solve()
+            self.assertEqual(s.status, SolverStatus.solved)
+
+            s2 = Solver([Requirement(x) for x in packages], self.packages_path,
+                        seed_variants=s.resolved_packages)
+            s2.solve()
+            self.assertEqual(s2.status, SolverStatus.solved)
+            return [str(x) for x in s2.resolved_packages]
+
+        # seeded packages are kept
+        self.assertEqual(_solve(["python", "nada"], ["python-2.6"]),
+                         ["python-2.6.8[]", "nada[]"])
+
+        # seeds that don't fit the request are ignored
+        self.assertEqual(_solve(["python-2.7", "nada"], ["python-2.6"]),
+                         ["python-2.7.0[]", "nada[]"])
+
+        # seeds that cause a failure are dropped
+        self.assertEqual(_solve(["pyfoo-3.1"], ["python-2.5"]),
+                         ["python-2.6.8[]", "pyfoo-3.1.0[]"])
+
+        # genuine failures still fail
+        s = Solver([Requirement("python-2.5")], self.packages_path)
+        s.solve()
+        s2 = Solver([Requirement("pyfoo-3.1"), Requirement("python-2.5")],
+                    self.packages_path, seed_variants=s.resolved_packages)
+        s2.solve()
+        self.assertEqual(s2.status, SolverStatus.failed)
+
+    def test_17_sort_key_cache(self):
+        """Test that variant sort keys are cached during a solve."""
+        s = self._solve(["test_weakly_reference_variant-2.0", "test_variant_split_mid2-2", "pyfoo"],
+                        ['test_variant_split_end-1.0[1]',
+                         'test_variant_split_mid1-1.0[1]',
+                         'test_weakly_reference_variant-2.0[0]',
+                         'test_variant_split_mid2-2.0[0]',
+                         'python-2.6.8[]',
+                         'pyfoo-3.1.0[]'])
+
+        stats = s.solve_stats["sorts"]
+        self.assertGreater(stats["num_sorts"], 0)
+        self.assertGreater(stats["num_variant_sort_key_hits"], 0)
+
+    def test_18_prefetch(self):
+        """Test that prefetching does not change the resolve or load packages."""
+        from rez import solver
+        from rez.packages import Variant
+
+        requests = [
+            ["bahish", "pybah<5"],
+            ["pybah-4", "pyfoo-3.0"],
+            ["pyvariants", "python", "nada"],
+            ["test_variant_split_start"],
+            ["test_weakly_reference_variant-2.0", "test_variant_split_mid2-2", "pyfoo"]
+        ]
+
+        def _solve(request):
+            package_repository_manager.clear_caches()
+            s = Solver([Requirement(x) for x in request], self.packages_path)
+
+            with patch.object(Variant, "get_requires", autospec=True,
+                              side_effect=get_requires) as mock_requires:
+                s.solve()
+
+            loaded = sorted(str(x.args[0]) for x in mock_requires.call_args_list)
+            return s.status, str(s.resolved_packages), loaded
+
+        get_requires = Variant.get_requires
+        results = [_solve(x) for x in requests]
+
+        # the prefetches themselves are not under test, just when they happen
+        prefetched = []
+        self.update_settings({"memcached_uri": ["127.0.0.1:11211"]})
+
+        with patch.object(solver, "prefetch_package_families",
+                          side_effect=lambda names, paths: prefetched.extend(names)), \
+                patch.object(solver, "prefetch_packages"):
+            for request, result in zip(requests, results):
+                self.assertEqual(_solve(request), result)
+
+        self.assertIn("python", prefetched)
+
 
 if __name__ == '__main__':
     unittest.main()
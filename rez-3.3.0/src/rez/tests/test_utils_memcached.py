@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright Contributors to the Rez Project
+
+
+"""
+unit tests for 'rez.utils.memcached' module
+"""
+from rez.tests.util import TestBase
+from rez.utils import memcached
+from rez.utils.memcached import Client, memcached_client
+from unittest.mock import patch
+import unittest
+
+
+servers = ["127.0.0.1:11211"]
+
+
+class FakeMemcacheClient(object):
+    """Stands in for the vendored `memcache.Client`.
+
+    Values and requests are shared by all instances, as if they were talking
+    to the same server.
+    """
+    store = {}
+    requests = []
+
+    def __init__(self, servers):
+        pass
+
+    def get(self, key):
+        self.requests.append(("get", key))
+        return self.store.get(key)
+
+    def get_multi(self, keys):
+        self.requests.append(("get_multi", sorted(keys)))
+        return dict((x, self.store[x]) for x in keys if x in self.store)
+
+    def set(self, key, val, time=0, min_compress_len=0):
+        self.requests.append(("set", key))
+        self.store[key] = val
+
+    def set_multi(self, mapping, time=0, min_compress_len=0):
+        self.requests.append(("set_multi", sorted(mapping.keys())))
+        self.store.update(mapping)
+
+    def delete(self, key):
+        self.requests.append(("delete", key))
+        self.store.pop(key, None)
+
+    def disconnect_all(self):
+        pass
+
+    @classmethod
+    def count(cls, request_type):
+        return len([x for x in cls.requests if x[0] == request_type])
+
+
+class TestMemcached(TestBase):
+    def setUp(self):
+        super().setUp()
+
+        FakeMemcacheClient.store = {}
+        FakeMemcacheClient.requests = []
+        patcher = patch.object(memcached, "Client_", FakeMemcacheClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.calls = []
+
+    def _decorate(self, **kwargs):
+        @memcached.memcached(servers, **kwargs)
+        def _square(x):
+            self.calls.append(x)
+            return x * x
+
+        return _square
+
+    def test_deferred_set_read_back(self):
+        """Test that a deferred set is seen by get before it is sent."""
+        client = Client(servers)
+        client.set("a", 1, defer=True)
+        client.set("b", None, defer=True)
+
+        self.assertEqual(client.get("a"), 1)
+        self.assertIsNone(client.get("b"))
+        self.assertIs(client.get("c"), client.miss)
+
+        fake = FakeMemcacheClient
+        self.assertEqual(fake.count("set"), 0)
+        self.assertEqual(fake.count("set_multi"), 0)
+
+        # sent in one request on disconnect
+        client.disconnect()
+        self.assertEqual(fake.count("set_multi"), 1)
+
+        client = Client(servers)
+        self.assertEqual(client.get("a"), 1)
+        self.assertIsNone(client.get("b"))
+
+    def test_deferred_set_max(self):
+        """Test that deferred sets are sent once max_deferred_sets are buffered."""
+        client = Client(servers)
+        client.max_deferred_sets = 3
+
+        client.set("a", 1, defer=True)
+        client.set("b", 2, defer=True, time=10)
+        fake = FakeMemcacheClient
+        self.assertEqual(fake.count("set_multi"), 0)
+
+        # sent as one request per distinct (time, min_compress_len)
+        client.set("c", 3, defer=True)
+        self.assertEqual(fake.count("set_multi"), 2)
+        self.assertEqual(len(fake.store), 3)
+        self.assertEqual(client._deferred, {})
+
+    def test_deferred_set_pool_release(self):
+        """Test that deferred sets are sent on the outermost pool release."""
+        square = self._decorate()
+
+        with memcached_client(servers):
+            self.assertEqual(square(2), 4)
+            self.assertEqual(square(3), 9)
+
+            with memcached_client(servers):
+                self.assertEqual(square(2), 4)
+
+            fake = FakeMemcacheClient
+            self.assertEqual(fake.count("set_multi"), 0)
+            self.assertEqual(fake.store, {})
+
+        self.assertEqual(fake.count("set_multi"), 1)
+        self.assertEqual(len(fake.store), 2)
+        self.assertEqual(self.calls, [2, 3])
+
+        # read back from the server in a new pool
+        with memcached_client(servers):
+            self.assertEqual(square(3), 9)
+        self.assertEqual(self.calls, [2, 3])
+
+    def test_flush_discards_pending(self):
+        """Test that flush() and forget discard deferred and prefetched entries."""
+        client = Client(servers)
+        client.set("a", 1)
+        client.set("b", 2, defer=True)
+        client.prefetch(["a", "c"])
+        self.assertEqual(client.get("a"), 1)
+
+        client.flush()
+        self.assertEqual(client._deferred, {})
+        self.assertEqual(client._prefetched, {})
+        self.assertIs(client.get("a"), client.miss)
+        self.assertIs(client.get("b"), client.miss)
+
+        client.disconnect()
+        self.assertEqual(FakeMemcacheClient.count("set_multi"), 0)
+
+        # forget, within a pool
+        square = self._decorate()
+
+        with memcached_client(servers):
+            square(2)
+            square.prefetch([(2,), (3,)])
+            square.forget()
+
+            square(2)
+            square(3)
+            self.assertEqual(self.calls, [2, 2, 3])
+
+    def test_prefetch(self):
+        """Test that prefetch fetches in one request, skipping IOError keys."""
+        def _key(x):
+            if x < 0:
+                raise IOError("no such file")
+            return str(x)
+
+        square = self._decorate(key=_key)
+
+        with memcached_client(servers):
+            square(2)
+        fake = FakeMemcacheClient
+
+        with memcached_client(servers) as client:
+            square.prefetch([(2,), (-1,), (3,)])
+            self.assertEqual(fake.count("get_multi"), 1)
+            self.assertEqual(len(fake.requests[-1][1]), 2)
+            self.assertEqual(set(client._prefetched.keys()), set(["2", "3"]))
+
+            # answered without contacting the server, including the miss
+            num_requests = len(fake.requests)
+            self.assertEqual(square(2), 4)
+            self.assertEqual(square(3), 9)
+            self.assertEqual(len(fake.requests), num_requests)
+            self.assertEqual(self.calls, [2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@
 """
 unit tests for 'rez.version' module
 """
+import pickle
 import random
 import textwrap
 import unittest
@@ -92,6 +93,22 @@ class TestVersionSchema(unittest.TestCase):
     def test_misc(self):
         self.assertEqual(Version("1.2.12").as_tuple(), ("1", "2", "12"))
 
+    def test_version_tokens(self):
+        """Test that versions behave the same before and after tokenizing."""
+        for ver_str in ("1.2.12", "1-2a.beta", "3_b", "alpha"):
+            ver = Version(ver_str)
+            ver_ = Version(ver_str)
+            self.assertEqual(len(ver_.tokens), len(ver))
+
+            self.assertEqual(ver, ver_)
+            self.assertEqual(hash(ver), hash(ver_))
+            self.assertEqual(str(ver), str(ver_))
+            self.assertEqual(ver.next(), ver_.next())
+            self.assertEqual(str(ver.next()), str(ver_.next()))
+            self.assertEqual(str(ver.trim(1)), str(ver_.trim(1)))
+            self.assertEqual(pickle.loads(pickle.dumps(ver)), ver)
+            self.assertTrue(ver < Version.inf)
+
     def test_token_strict_weak_ordering(self):
         # test equal tokens
         tok = self._create_random_token()
@@ -433,6 +450,12 @@ class TestVersionSchema(unittest.TestCase):
             _test_it(range_.iter_intersect_test(versions))
             _test_it(range_.iter_intersect_test(rev_versions, descending=True))
 
+            # bisect-based containment
+            matches_ = set()
+            for slice_ in range_.intersecting_slices(versions):
+                matches_.update(versions[slice_])
+            self.assertEqual(matches_, matches)
+
             # throw in an intersection test
             self.assertEqual(composite_range.intersects(range_), (count != 0))
             int_range = composite_range & range_
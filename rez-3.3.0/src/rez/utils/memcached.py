@@ -24,7 +24,8 @@ class Client(object):
     Adds the features:
     - unlimited key length;
     - hard/soft flushing;
-    - ability to cache None.
+    - ability to cache None;
+    - batching, via `prefetch` and deferred sets.
     """
     class _Miss(object):
         def __bool__(self):
@@ -34,6 +35,9 @@ class Client(object):
 
     logger = config.debug_printer("memcache")
 
+    # deferred sets are sent once there are this many of them
+    max_deferred_sets = 100
+
     def __init__(self, servers, debug=False):
         """Create a memcached client.
 
@@ -49,6 +53,10 @@ class Client(object):
         self.debug = debug
         self.current = ''
 
+        # results of `prefetch`, and sets not yet sent to the server(s)
+        self._prefetched = {}
+        self._deferred = {}
+
     def __bool__(self):
         return bool(self.servers)
 
@@ -78,11 +86,28 @@ class Client(object):
                 responders.add(server)
         return responders
 
-    def set(self, key, val, time=0, min_compress_len=0):
-        """See memcache.Client."""
+    def set(self, key, val, time=0, min_compress_len=0, defer=False):
+        """See memcache.Client.
+
+        Args:
+            defer (bool): If True, the value is buffered and sent along with
+                other deferred sets in a single request, either once
+                `max_deferred_sets` are buffered, or on `send_deferred` or
+                `disconnect`. Until then it is visible to `get` on this client
+                only.
+        """
         if not self.servers:
             return
 
+        self._prefetched.pop(key, None)
+
+        if defer:
+            self._deferred.setdefault((time, min_compress_len), {})[key] = val
+            if sum(len(x) for x in self._deferred.values()) \
+                    >= self.max_deferred_sets:
+                self.send_deferred()
+            return
+
         key = self._qualified_key(key)
         hashed_key = self.key_hasher(key)
         val = (key, val)
@@ -104,6 +129,13 @@ class Client(object):
         if not self.servers:
             return self.miss
 
+        for entries in self._deferred.values():
+            if key in entries:
+                return entries[key]
+
+        if key in self._prefetched:
+            return self._prefetched[key]
+
         key = self._qualified_key(key)
         hashed_key = self.key_hasher(key)
         entry = self.client.get(hashed_key)
@@ -117,8 +149,88 @@ class Client(object):
         self.logger("MISS: %s", key)
         return self.miss
 
+    def get_multi(self, keys):
+        """Get several values in a single request.
+
+        Returns:
+            dict: Values of the keys that were cached. Missed keys are not
+            present.
+        """
+        if not self.servers or not keys:
+            return {}
+
+        hashed_keys = {}
+        for key in keys:
+            key_ = self._qualified_key(key)
+            hashed_keys[self.key_hasher(key_)] = (key, key_)
+
+        entries = self.client.get_multi(list(hashed_keys.keys()))
+        results = {}
+
+        for hashed_key, (key, key_) in hashed_keys.items():
+            entry = entries.get(hashed_key)
+            if isinstance(entry, tuple) and len(entry) == 2 \
+                    and entry[0] == key_:
+                results[key] = entry[1]
+
+        self.logger("GET_MULTI: %d keys, %d hits", len(keys), len(results))
+        return results
+
+    def set_multi(self, mapping, time=0, min_compress_len=0):
+        """Set several values in a single request.
+
+        Args:
+            mapping (dict): Values to set, keyed by cache key.
+        """
+        if not self.servers or not mapping:
+            return
+
+        data = {}
+        for key, val in mapping.items():
+            key_ = self._qualified_key(key)
+            data[self.key_hasher(key_)] = (key_, val)
+
+        self.client.set_multi(data, time=time,
+                              min_compress_len=min_compress_len)
+        self.logger("SET_MULTI: %d keys", len(mapping))
+
+    def prefetch(self, keys):
+        """Fetch several values in a single request, ahead of their use.
+
+        Subsequent `get` calls for these keys, including misses, are then
+        answered without contacting the server(s). Prefetched values are kept
+        until this client is flushed or disconnected.
+        """
+        if not self.servers:
+            return
+
+        keys = [
+            x for x in set(keys)
+            if x not in self._prefetched
+            and not any(x in entries for entries in self._deferred.values())
+        ]
+        if not keys:
+            return
+
+        results = self.get_multi(keys)
+        for key in keys:
+            self._prefetched[key] = results.get(key, self.miss)
+
+    def send_deferred(self):
+        """Send any deferred sets to the server(s)."""
+        deferred = self._deferred
+        self._deferred = {}
+
+        for (time, min_compress_len), mapping in deferred.items():
+            self.set_multi(mapping, time=time,
+                           min_compress_len=min_compress_len)
+
     def delete(self, key):
         """See memcache.Client."""
+        self._prefetched.pop(key, None)
+        for entries in self._deferred.values():
+            entries.pop(key, None)
+
         if self.servers:
             key = self._qualified_key(key)
             hashed_key = self.key_hasher(key)
@@ -134,6 +246,10 @@ class Client(object):
         """
         if not self.servers:
             return
+
+        self._prefetched.clear()
+        self._deferred.clear()
+
         if hard:
             self.client.flush_all()
             self.reset_stats()
@@ -157,7 +273,14 @@ class Client(object):
         self._get_stats("reset")
 
     def disconnect(self):
-        """Disconnect from server(s). Behaviour is undefined after this call."""
+        """Disconnect from server(s). Behaviour is undefined after this call.
+
+        Deferred sets are sent first.
+        """
+        if self.servers:
+            self.send_deferred()
+            self._prefetched.clear()
+
         if self.servers and self._client:
             self._client.disconnect_all()
         # print("Disconnected memcached client %s" % str(self))
@@ -350,13 +473,16 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
     to_cache = to_cache or identity
 
     def decorator(func):
+        def cache_key_(*nargs, **kwargs):
+            if key:
+                return key(*nargs, **kwargs)
+            else:
+                return default_key(func, *nargs, **kwargs)
+
         if servers:
             def wrapper(*nargs, **kwargs):
                 with memcached_client(servers, debug=debug) as client:
-                    if key:
-                        cache_key = key(*nargs, **kwargs)
-                    else:
-                        cache_key = default_key(func, *nargs, **kwargs)
+                    cache_key = cache_key_(*nargs, **kwargs)
 
                     # get
                     result = client.get(cache_key)
@@ -368,12 +494,14 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
                     if isinstance(result, DoNotCache):
                         return result.result
 
-                    # store
+                    # store. This is deferred so that, within a pooled
+                    # connection, stores are batched into fewer requests
                     cache_result = to_cache(result, *nargs, **kwargs)
                     client.set(key=cache_key,
                                val=cache_result,
                                time=time,
-                               min_compress_len=min_compress_len)
+                               min_compress_len=min_compress_len,
+                               defer=True)
                     return result
         else:
             def wrapper(*nargs, **kwargs):
@@ -393,7 +521,33 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
             with memcached_client(servers, debug=debug) as client:
                 client.flush()
 
+        def prefetch(args_list):
+            """Fetch the cached results of several calls in one request.
+
+            This only has an effect within a pooled connection (see
+            `pool_memcached_connections`) - the results are held by the pooled
+            client, and used by subsequent calls to the wrapped function.
+
+            Args:
+                args_list (list of tuple): Positional arguments of each call
+                    to prefetch. Calls whose cache key cannot be determined
+                    (for example, due to a missing file) are skipped.
+            """
+            if not servers:
+                return
+
+            keys = []
+            for nargs in args_list:
+                try:
+                    keys.append(cache_key_(*nargs))
+                except (IOError, OSError):
+                    pass
+
+            with memcached_client(servers, debug=debug) as client:
+                client.prefetch(keys)
+
         wrapper.forget = forget
+        wrapper.prefetch = prefetch
         wrapper.__wrapped__ = func
         return update_wrapper(wrapper, func)
     return decorator
@@ -11,6 +11,8 @@ from textwrap import dedent
 from glob import glob
 import traceback
 import os.path
+import stat
+import time
 
 
 def early():
@@ -194,7 +196,7 @@ class SourceCode(object):
     @cached_property
     def compiled(self):
         try:
-            pyc = compile(self.evaluated_code, self.sourcename, 'exec')
+            pyc = compiled_code_cache.compile(self.evaluated_code, self.sourcename)
         except Exception as e:
             stack = traceback.format_exc()
             raise SourceCodeCompileError(
@@ -358,3 +360,130 @@ class IncludeModuleManager(object):
 
 # singleton
 include_module_manager = IncludeModuleManager()
+
+
+class CompiledCodeCache(object):
+    """Manages a cache of compiled package functions (such as 'commands').
+
+    Compiled code is stored on local disk (see :data:`cache_compiled_code`), so
+    that each process creating a shell for a large context does not recompile
+    the functions of every package in it. Entries are keyed on the code's
+    source and filename, and on the python and rez versions, so they never go
+    out of date. Entries not used for `max_age_days` are removed from disk, and
+    at most `max_codes` are kept in memory.
+    """
+    max_codes = 1000
+    max_age_days = 30
+
+    # An entry's mtime is updated when it's used, but at most this often
+    mtime_resolution = 3600 * 24
+
+    def __init__(self):
+        self.codes = {}
+        self._pruned = False
+
+    def compile(self, source, filename):
+        """Compile python source code, in 'exec' mode.
+
+        Raises:
+            Whatever `compile` raises.
+        """
+        import marshal
+        from hashlib import sha1
+        from importlib.util import MAGIC_NUMBER
+        from rez.config import config  # avoiding circular import
+        from rez import __version__
+
+        key = sha1('\0'.join(
+            (MAGIC_NUMBER.hex(), __version__, filename, source)
+        ).encode("utf-8")).hexdigest()
+
+        code = self.codes.pop(key, None)
+        if code is not None:
+            self.codes[key] = code  # now the most recently used
+            return code
+
+        path = self._get_path() if config.cache_compiled_code else None
+        filepath = os.path.join(path, key) if path else None
+
+        if filepath:
+            try:
+                with open(filepath, "rb") as f:
+                    code = marshal.loads(f.read())
+                    mtime = os.fstat(f.fileno()).st_mtime
+
+                # so that entries in use are not pruned
+                if time.time() - mtime > self.mtime_resolution:
+                    os.utime(filepath, None)
+            except (IOError, OSError, EOFError, ValueError, TypeError):
+                pass  # not cached, or partially written
+
+        if code is None:
+            code = compile(source, filename, 'exec')
+
+            if filepath:
+                tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+                try:
+                    with open(tmp_filepath, "wb") as f:
+                        f.write(marshal.dumps(code))
+                    os.replace(tmp_filepath, filepath)
+                except (IOError, OSError):
+                    pass  # the cache is not critical
+
+        self.codes[key] = code
+        if len(self.codes) > self.max_codes:
+            del self.codes[next(iter(self.codes))]  # least recently used
+
+        return code
+
+    def _get_path(self):
+        """Get the cache dir, creating it if necessary.
+
+        Returns:
+            str: Cache dir, or None if it cannot be used. Since cached code is
+            executed, the dir must only be writable by the current user.
+        """
+        from rez.config import config
+        from rez.system import system
+
+        path = os.path.join(config.tmpdir, "rez-code-cache-%s" % system.user)
+
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            st = os.lstat(path)
+        except OSError:
+            return None
+
+        if not stat.S_ISDIR(st.st_mode) \
+                or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH) \
+                or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+            if config.debug("file_loads"):
+                print_debug("Not using compiled code cache at %s" % path)
+            return None
+
+        if not self._pruned:
+            self._pruned = True
+            self._prune(path)
+
+        return path
+
+    def _prune(self, path):
+        """Remove entries that have not been used for `max_age_days`."""
+        now = time.time()
+        max_secs = self.max_age_days * 3600 * 24
+
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime > max_secs:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # may have just been removed
+
+
+# singleton
+compiled_code_cache = CompiledCodeCache()
@@ -14,6 +14,8 @@ class ParseException(Exception):
 
 
 class _Common(object):
+    __slots__ = ()
+
     def __str__(self):
         raise NotImplementedError
 
@@ -23,6 +25,20 @@ class _Common(object):
     def __repr__(self):
         return "%s(%r)" % (self.__class__.__name__, str(self))
 
+    # pickling support for subclasses that use __slots__, which is otherwise
+    # unavailable with pickle protocols < 2
+    def __getstate__(self):
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if name != "__weakref__" and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
 
 def dedup(iterable):
     """Removes duplicates from a sorted sequence."""
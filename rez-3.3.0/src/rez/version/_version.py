@@ -4,7 +4,8 @@
 
 from rez.version._util import VersionError, ParseException, _Common, \
     dedup
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 import copy
 import string
 import re
@@ -12,8 +13,13 @@ import re
 
 re_token = re.compile(r"[a-zA-Z0-9_]+")
 
+# max number of distinct version strings whose parse results are cached
+version_cache_size = 16384
+
 
 class _Comparable(_Common):
+    __slots__ = ()
+
     def __gt__(self, other):
         return not (self < other or self == other)
 
@@ -25,6 +31,8 @@ class _Comparable(_Common):
 
 
 class _ReversedComparable(_Common):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -60,6 +68,8 @@ class VersionToken(_Comparable):
     Version tokens are only allowed to contain alphanumerics (any case) and
     underscores.
     """
+    __slots__ = ()
+
     def __init__(self, token):
         """
         Args:
@@ -105,6 +115,8 @@ class NumericToken(VersionToken):
 
     Version token supporting numbers only. Padding is ignored.
     """
+    __slots__ = ("n",)
+
     def __init__(self, token):
         if not token.isdigit():
             raise VersionError("Invalid version token: '%s'" % token)
@@ -138,10 +150,17 @@ class NumericToken(VersionToken):
 
 class _SubToken(_Comparable):
     """Used internally by AlphanumericVersionToken."""
+    __slots__ = ("s", "n")
+
     def __init__(self, s):
         self.s = s
         self.n = int(s) if s.isdigit() else None
 
+    @property
+    def key(self):
+        """Comparison key. Alphas sort before numbers."""
+        return (0, self.s) if self.n is None else (1, self.n, self.s)
+
     def __lt__(self, other):
         if self.n is None:
             return (self.s < other.s) if other.n is None else True
@@ -181,16 +200,20 @@ class AlphanumericVersionToken(VersionToken):
     - ``alpha`` < ``alpha3``
     - ``gamma33`` < ``33gamma``
     """
+    __slots__ = ("subtokens", "key")
+
     numeric_regex = re.compile("[0-9]+")
     regex = re.compile(r"[a-zA-Z0-9_]+\Z")
 
     def __init__(self, token):
         if token is None:
             self.subtokens = None
+            self.key = None
         elif not self.regex.match(token):
             raise VersionError("Invalid version token: '%s'" % token)
         else:
             self.subtokens = self._parse(token)
+            self.key = _get_token_key(token)
 
     @classmethod
     def create_random_token_string(cls):
@@ -203,10 +226,10 @@ class AlphanumericVersionToken(VersionToken):
         return ''.join(map(str, self.subtokens))
 
     def __eq__(self, other):
-        return (self.subtokens == other.subtokens)
+        return (self.key == other.key)
 
     def less_than(self, other):
-        return (self.subtokens < other.subtokens)
+        return (self.key < other.key)
 
     def __next__(self):
         other = AlphanumericVersionToken(None)
@@ -216,6 +239,7 @@ class AlphanumericVersionToken(VersionToken):
             other.subtokens[-1] = _SubToken(subtok.s + '_')
         else:
             other.subtokens.append(_SubToken('_'))
+        other.key = tuple(x.key for x in other.subtokens)
         return other
 
     def next(self):
@@ -272,6 +296,8 @@ class Version(_Comparable):
     The empty version ``''`` is the smallest possible version, and can be used to
     represent an unversioned resource.
     """
+    __slots__ = ("_tokens", "_seps", "_str", "_hash", "_key")
+
     inf = None
 
     def __init__(self, ver_str='', make_token=AlphanumericVersionToken):
@@ -281,28 +307,88 @@ class Version(_Comparable):
             make_token (typing.Callable[[str], None]): Callable that creates a VersionToken subclass from a
                 string.
         """
-        self.tokens = []
-        self.seps = []
+        self._hash = None
+
+        if not ver_str:
+            self._tokens = []
+            self._seps = []
+            self._str = None
+            self._key = ()
+        elif make_token is AlphanumericVersionToken:
+            # Versions are compared via a precomputed key, so only the string
+            # and key are stored. Tokens are created from the string on demand.
+            self._key = _get_version_key(ver_str)
+            self._str = ver_str
+            self._tokens = None
+            self._seps = None
+        else:
+            self._tokens, self._seps = self._parse(ver_str, make_token)
+            self._key = self._get_key(self._tokens)
+            self._str = None
+
+    @property
+    def tokens(self):
+        """
+        Returns:
+            list[VersionToken]: Version tokens, or None if this is the infinite
+            version (internal use only).
+        """
+        if self._tokens is None and self._key is not None:
+            self._tokens, self._seps = self._parse(self._str, AlphanumericVersionToken)
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, tokens):
+        self._tokens = tokens
+        self._key = None if tokens is None else self._get_key(tokens)
         self._str = None
         self._hash = None
 
-        if ver_str:
-            toks = re_token.findall(ver_str)
-            if not toks:
-                raise VersionError(ver_str)
+    @property
+    def seps(self):
+        """
+        Returns:
+            list[str]: Token separators.
+        """
+        if self._seps is None and self._key is not None:
+            self._tokens, self._seps = self._parse(self._str, AlphanumericVersionToken)
+        return self._seps
+
+    @seps.setter
+    def seps(self, seps):
+        if self._tokens is None and self._key is not None:
+            # create tokens before the string they're created from is discarded
+            self._tokens, _ = self._parse(self._str, AlphanumericVersionToken)
+        self._seps = seps
+        self._str = None
+
+    @classmethod
+    def _parse(cls, ver_str, make_token):
+        toks = re_token.findall(ver_str)
+        if not toks:
+            raise VersionError(ver_str)
 
-            seps = re_token.split(ver_str)
-            if seps[0] or seps[-1] or max(len(x) for x in seps) > 1:
-                raise VersionError("Invalid version syntax: '%s'" % ver_str)
+        seps = re_token.split(ver_str)
+        if seps[0] or seps[-1] or max(len(x) for x in seps) > 1:
+            raise VersionError("Invalid version syntax: '%s'" % ver_str)
 
-            for tok in toks:
-                try:
-                    self.tokens.append(make_token(tok))
-                except VersionError as e:
-                    raise VersionError("Invalid version '%s': %s"
-                                       % (ver_str, str(e)))
+        tokens = []
+        for tok in toks:
+            try:
+                tokens.append(make_token(tok))
+            except VersionError as e:
+                raise VersionError("Invalid version '%s': %s"
+                                   % (ver_str, str(e)))
 
-            self.seps = seps[1:-1]
+        return tokens, seps[1:-1]
+
+    @classmethod
+    def _get_key(cls, tokens):
+        # only available for token types that provide a comparison key
+        try:
+            return tuple(x.key for x in tokens)
+        except AttributeError:
+            return None
 
     def copy(self):
         """
@@ -333,10 +419,14 @@ class Version(_Comparable):
 
     def __next__(self):
         """Return :meth:`next` version. Eg, ``next(1.2)`` is ``1.2_``"""
-        if self.tokens:
+        if self._tokens is None and self._key:
+            # equivalent to appending to the last token, avoids creating tokens
+            return Version(self._str + '_')
+        elif self.tokens:
             other = self.copy()
-            tok = other.tokens.pop()
-            other.tokens.append(tok.next())
+            tokens = other.tokens
+            tokens.append(tokens.pop().next())
+            other.tokens = tokens
             return other
         else:
             return Version.inf
@@ -385,6 +475,8 @@ class Version(_Comparable):
         return tuple(map(str, self.tokens))
 
     def __len__(self):
+        if self._key is not None:
+            return len(self._key)
         return len(self.tokens or [])
 
     def __getitem__(self, index):
@@ -395,29 +487,67 @@ class Version(_Comparable):
 
     def __bool__(self):
         """The empty version equates to False."""
+        if self._key is not None:
+            return bool(self._key)
         return bool(self.tokens)
 
     def __eq__(self, other):
-        return isinstance(other, Version) and self.tokens == other.tokens
+        if not isinstance(other, Version):
+            return False
+
+        key, other_key = self._key, other._key
+        if key is not None and other_key is not None:
+            return (key == other_key)
+        elif self._is_inf() or other._is_inf():
+            return (self._is_inf() and other._is_inf())
+        else:
+            return (self.tokens == other.tokens)
 
     def __lt__(self, other):
-        if self.tokens is None:
+        key, other_key = self._key, other._key
+        if key is not None and other_key is not None:
+            return (key < other_key)
+        elif self._is_inf():
             return False
-        elif other.tokens is None:
+        elif other._is_inf():
             return True
         else:
             return (self.tokens < other.tokens)
 
+    def __gt__(self, other):
+        key, other_key = self._key, other._key
+        if key is not None and other_key is not None:
+            return (key > other_key)
+        return other.__lt__(self)
+
+    def __le__(self, other):
+        key, other_key = self._key, other._key
+        if key is not None and other_key is not None:
+            return (key <= other_key)
+        return not other.__lt__(self)
+
+    def __ge__(self, other):
+        key, other_key = self._key, other._key
+        if key is not None and other_key is not None:
+            return (key >= other_key)
+        return not self.__lt__(other)
+
+    def _is_inf(self):
+        return (self._tokens is None and self._key is None)
+
     def __hash__(self):
         if self._hash is None:
-            self._hash = hash(None) if self.tokens is None \
-                else hash(tuple(map(str, self.tokens)))
+            if self._tokens is None and self._key is not None:
+                self._hash = hash(tuple(re_token.findall(self._str)))
+            else:
+                self._hash = hash(None) if self._tokens is None \
+                    else hash(tuple(map(str, self._tokens)))
         return self._hash
 
     def __str__(self):
         if self._str is None:
-            self._str = "[INF]" if self.tokens is None \
-                else ''.join(str(x) + y for x, y in zip(self.tokens, self.seps + ['']))
+            self._str = "[INF]" if self._tokens is None \
+                else ''.join(str(x) + y for x, y in zip(self._tokens, self._seps + ['']))
         return self._str
 
 
@@ -426,7 +556,33 @@ Version.inf = Version()
 Version.inf.tokens = None
 
 
+@lru_cache(maxsize=version_cache_size)
+def _get_token_key(token):
+    return tuple(x.key for x in AlphanumericVersionToken._parse(token))
+
+
+@lru_cache(maxsize=version_cache_size)
+def _get_version_key(ver_str):
+    """Get the comparison key of an alphanumeric version string.
+
+    Equivalent to parsing into a `Version` and getting its token keys, but much
+    cheaper, and the results (and keys of tokens, which are largely shared
+    between versions) are cached.
+    """
+    toks = re_token.findall(ver_str)
+    if not toks:
+        raise VersionError(ver_str)
+
+    seps = re_token.split(ver_str)
+    if seps[0] or seps[-1] or max(len(x) for x in seps) > 1:
+        raise VersionError("Invalid version syntax: '%s'" % ver_str)
+
+    return tuple(_get_token_key(x) for x in toks)
+
+
 class _LowerBound(_Comparable):
+    __slots__ = ("version", "inclusive")
+
     min = None
 
     def __init__(self, version, inclusive):
@@ -453,14 +609,17 @@ class _LowerBound(_Comparable):
         return hash((self.version, self.inclusive))
 
     def contains_version(self, version):
-        return (version > self.version) \
-            or (self.inclusive and (version == self.version))
+        if self.inclusive:
+            return (version >= self.version)
+        return (version > self.version)
 
 
 _LowerBound.min = _LowerBound(Version(), True)
 
 
 class _UpperBound(_Comparable):
+    __slots__ = ("version", "inclusive")
+
     inf = None
 
     def __init__(self, version, inclusive):
@@ -486,14 +645,17 @@ class _UpperBound(_Comparable):
         return hash((self.version, self.inclusive))
 
     def contains_version(self, version):
-        return (version < self.version) \
-            or (self.inclusive and (version == self.version))
+        if self.inclusive:
+            return (version <= self.version)
+        return (version < self.version)
 
 
 _UpperBound.inf = _UpperBound(Version.inf, True)
 
 
 class _Bound(_Comparable):
+    __slots__ = ("lower", "upper")
+
     any = None
 
     def __init__(self, lower=None, upper=None, invalid_bound_error=True):
@@ -867,6 +1029,8 @@ class VersionRange(_Comparable):
     valid version range syntax. For example, ``>`` is a valid range - read like
     ``>''``, it means ``any version greater than the empty version``.
     """
+    __slots__ = ("_str", "bounds")
+
     def __init__(self, range_str='', make_token=AlphanumericVersionToken,
                  invalid_bound_error=True):
         """
@@ -1180,6 +1344,39 @@ class VersionRange(_Comparable):
             self, iterable, key, descending, mode=_ContainsVersionIterator.MODE_INTERSECTING
         )
 
+    def intersecting_slices(self, versions):
+        """Find the versions in a sorted list that are contained in this range.
+
+        This performs a binary search per bound of the range, so is much faster
+        than separate containment tests on long lists of versions.
+
+        Args:
+            versions (list[Version]): Versions, in ascending order.
+
+        Returns:
+            list[slice]: Non-empty, non-overlapping slices of ``versions`` (in
+            ascending order) that contain the versions in this range.
+        """
+        slices = []
+        lo = 0
+
+        for bound in self.bounds:
+            if bound.lower.inclusive:
+                start = bisect_left(versions, bound.lower.version, lo)
+            else:
+                start = bisect_right(versions, bound.lower.version, lo)
+
+            if bound.upper.inclusive:
+                end = bisect_right(versions, bound.upper.version, start)
+            else:
+                end = bisect_left(versions, bound.upper.version, start)
+
+            if end > start:
+                slices.append(slice(start, end))
+            lo = end
+
+        return slices
+
     def iter_non_intersecting(self, iterable, key=None, descending=False):
         """Like :meth:`iter_intersect_test`, but returns non-intersections only.
 
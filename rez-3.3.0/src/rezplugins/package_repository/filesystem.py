@@ -9,7 +9,9 @@ from contextlib import contextmanager
 from functools import lru_cache
 import os.path
 import os
+import json
 import stat
+import threading
 import time
 import shutil
 
@@ -18,7 +20,7 @@ from rez.package_resources import PackageFamilyResource, VariantResourceHelper,
     PackageResourceHelper, package_pod_schema, \
     package_release_keys, package_build_only_keys
 from rez.serialise import clear_file_caches, open_file_for_write, load_from_file, \
-    FileFormat
+    prefetch_files, FileFormat
 from rez.package_serialise import dump_package_data
 from rez.exceptions import PackageMetadataError, ResourceError, RezSystemError, \
     ConfigurationError, PackageRepositoryError
@@ -28,7 +30,7 @@ from rez.utils.resources import cached_property
 from rez.utils.logging_ import print_warning, print_info
 from rez.utils.memcached import memcached, pool_memcached_connections
 from rez.utils.filesystem import make_path_writable, \
-    canonical_path, is_subdirectory
+    canonical_path, is_subdirectory, get_tree_size, safe_remove
 from rez.utils.platform_ import platform_
 from rez.utils.yaml import load_yaml
 from rez.config import config
@@ -74,11 +76,294 @@ def check_format_version(filename, data):
 # loop is caused to to config loading this plugin, loading config ad infinitum
 _settings = None
 
+# thread pool for parallel scans, shared by all repositories (see
+# _get_scan_executor)
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
+# incremented in forked children, whose inherited scans never complete
+_scan_generation = 0
+
+
+def _reset_scan_executor():
+    # A forked child (such as a speculative solve, see rez.solver) inherits
+    # the pool, but not its threads, so work submitted to it would never run
+    global _scan_executor, _scan_executor_lock, _scan_generation
+
+    _scan_executor = None
+    _scan_executor_lock = threading.Lock()
+    _scan_generation += 1
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_scan_executor)
+
+
+def _get_scan_executor():
+    """Get the thread pool used to scan repositories in parallel.
+
+    There is one pool per process, rather than per repository, since
+    repositories are recreated whenever caches are cleared.
+
+    Returns:
+        `ThreadPoolExecutor`, or None if 'scan_workers' is less than 2.
+    """
+    global _scan_executor
+
+    num_workers = _settings.scan_workers
+    if num_workers < 2:
+        return None
+
+    with _scan_executor_lock:
+        if _scan_executor is not None and _scan_executor[0] != num_workers:
+            _scan_executor[1].shutdown(wait=False)
+            _scan_executor = None
+
+        if _scan_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _scan_executor = (
+                num_workers, ThreadPoolExecutor(max_workers=num_workers))
+
+        return _scan_executor[1]
+
 
 class PackageDefinitionFileMissing(PackageMetadataError):
     pass
 
 
+# ------------------------------------------------------------------------------
+# package index
+# ------------------------------------------------------------------------------
+
+class FileSystemPackageIndex(object):
+    """A persistent, on-disk index of a filesystem package repository.
+
+    The index stores the results of the directory scans that the repository
+    would otherwise perform in every new process - the list of families, each
+    family's version directories, and each package's definition file. This
+    means a cold resolve reads one small file per family, rather
+    than listing and stat'ing every version directory.
+
+    Entries are stored one file per family, in the directory given by the
+    'package_index_dir' setting:
+
+        /LOCATION/.index/.families.json
+                        /pkgA.json
+                        /pkgB.json
+
+    Each entry is keyed on the inode and mtime of the directory it describes.
+    The repository updates the family directory mtime whenever a package is
+    installed, removed or ignored (see `FileSystemPackageRepository._on_changed`),
+    so a stale entry is detected with a single stat, and only the changed
+    family's entry is rebuilt.
+
+    Package state handles (definition file mtimes) are not stored, since a
+    package edited in place does not change its family directory's mtime.
+    They are read from the definition file as needed, so resolve cache
+    staleness checks still see such edits.
+    """
+    index_format_version = 2
+
+    families_entry_name = ".families"
+
+    # Entries built within this many seconds of their directory's mtime are
+    # 'racy' - a change made within the same mtime tick would not be detected.
+    # These entries are neither written nor trusted, and are rebuilt on next
+    # access.
+    racy_seconds = 5
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.path = os.path.join(repository.location, _settings.package_index_dir)
+        self._entries = {}
+
+    def get_family_dirs(self):
+        """Get the (name, ext) family list of the repository.
+
+        Returns:
+            List of 2-tuple, or None if the repository does not exist.
+        """
+        entry = self._get_entry(self.families_entry_name, self.repository.location)
+        if entry is None:
+            return None
+        return [tuple(x) for x in entry["families"]]
+
+    def get_version_dirs(self, family_name):
+        """Get the version directories of a family.
+
+        Returns:
+            List of str, or None if the family is not a directory.
+        """
+        entry = self._get_family_entry(family_name)
+        if entry is None:
+            return None
+        return list(entry["versions"])
+
+    def get_package_file(self, family_name, version_str=None):
+        """Get the definition file of a package.
+
+        Returns:
+            2-tuple: Filepath and `FileFormat` (both None if the file is
+            missing); or None if the package isn't indexed.
+        """
+        # the family has typically just been listed, so skip re-validation
+        entry = self._entries.get(family_name)
+        if entry is None:
+            entry = self._get_family_entry(family_name)
+            if entry is None:
+                return None
+
+        packages = entry["packages"]
+        key = version_str or ""
+
+        if key not in packages:
+            return None
+
+        value = packages[key]
+        if value is None:
+            return (None, None)
+
+        filename, ext = value
+        family_path = os.path.join(self.repository.location, family_name)
+        filepath = os.path.join(family_path, version_str or "", filename)
+        return (filepath, FileFormat[ext])
+
+    def update_family(self, family_name):
+        """Update the index after a change to a family.
+
+        The family's entry, and the family list, are discarded. They are rebuilt
+        on next access, once they can no longer be racy.
+        """
+        for name in (family_name, self.families_entry_name):
+            self._entries.pop(name, None)
+            self._remove_entry(name)
+
+    def clear(self):
+        """Clear in-memory entries."""
+        self._entries.clear()
+
+    # -- internal
+
+    @property
+    def _settings_key(self):
+        # settings that affect scan results. An entry written under different
+        # settings is not valid
+        return [
+            bool(_settings.check_package_definition_files),
+            list(_settings.package_filenames),
+            _settings.file_lock_dir
+        ]
+
+    def _get_family_entry(self, family_name):
+        family_path = os.path.join(self.repository.location, family_name)
+        return self._get_entry(family_name, family_path)
+
+    def _get_entry(self, name, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            self._entries.pop(name, None)
+            return None
+
+        key = [int(st.st_ino), st.st_mtime]
+
+        entry = self._entries.get(name)
+        if entry is None or not self._is_valid_entry(entry, key):
+            entry = self._read_entry(name)
+
+            if entry is None or not self._is_valid_entry(entry, key):
+                entry = self._build_entry(name, path, key)
+                if not self._is_racy_entry(entry):
+                    self._write_entry(name, entry)
+
+            self._entries[name] = entry
+
+        return entry
+
+    def _is_racy_entry(self, entry):
+        return (entry["time"] - entry["key"][1]) <= self.racy_seconds
+
+    def _is_valid_entry(self, entry, key):
+        return (
+            entry.get("format_version") == self.index_format_version
+            and entry.get("key") == key
+            and entry.get("settings") == self._settings_key
+            and not self._is_racy_entry(entry)
+        )
+
+    def _build_entry(self, name, path, key):
+        entry = {
+            "format_version": self.index_format_version,
+            "key": key,
+            "settings": self._settings_key,
+            "time": time.time()
+        }
+
+        if name == self.families_entry_name:
+            entry["families"] = [
+                list(x) for x in self.repository._scan_family_dirs()
+            ]
+            return entry
+
+        versions = self.repository._scan_version_dirs(path)
+        packages = {}
+
+        # the "" entry is the unversioned package, if any
+        for ver_str in [""] + versions:
+            pkg_path = os.path.join(path, ver_str)
+            filepath, format_ = self.repository._get_file(pkg_path)
+
+            if filepath:
+                packages[ver_str] = [
+                    os.path.basename(filepath),
+                    format_.extension
+                ]
+            else:
+                packages[ver_str] = None
+
+        entry["versions"] = versions
+        entry["packages"] = packages
+        return entry
+
+    def _entry_filepath(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def _read_entry(self, name):
+        filepath = self._entry_filepath(name)
+
+        try:
+            with open(filepath) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write_entry(self, name, entry):
+        from rez.vendor.atomicwrites import atomic_write
+
+        filepath = self._entry_filepath(name)
+        content = json.dumps(entry, separators=(',', ':'))
+
+        # the index is an optimisation only; users without write permission to
+        # the repository simply don't update it
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with atomic_write(filepath, overwrite=True) as f:
+                f.write(content)
+        except (IOError, OSError) as e:
+            debug_print("Could not write package index entry %s: %s", filepath, e)
+
+    def _remove_entry(self, name):
+        filepath = self._entry_filepath(name)
+
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+
 # ------------------------------------------------------------------------------
 # resources
 # ------------------------------------------------------------------------------
@@ -105,7 +390,7 @@ class FileSystemPackageFamilyResource(PackageFamilyResource):
     def iter_packages(self):
         # check for unversioned package
         if config.allow_unversioned_packages:
-            filepath, _ = self._repository._get_file(self.path)
+            filepath = self._repository._get_package_file(self.name)[0]
             if filepath:
                 package = self._repository.get_resource(
                     FileSystemPackageResource.key,
@@ -117,8 +402,9 @@ class FileSystemPackageFamilyResource(PackageFamilyResource):
         # versioned packages
         for version_str in self._repository._get_version_dirs(self.path):
             if _settings.check_package_definition_files:
-                path = os.path.join(self.path, version_str)
-                if not self._repository._get_file(path)[0]:
+                filepath = self._repository._get_package_file(
+                    self.name, version_str)[0]
+                if not filepath:
                     continue
 
             package = self._repository.get_resource(
@@ -173,15 +459,15 @@ class FileSystemPackageResource(PackageResourceHelper):
 
     @cached_property
     def filepath(self):
-        return self._filepath_and_format[0]
+        return self._package_file[0]
 
     @cached_property
     def file_format(self):
-        return self._filepath_and_format[1]
+        return self._package_file[1]
 
     @cached_property
-    def _filepath_and_format(self):
-        return self._repository._get_file(self.path)
+    def _package_file(self):
+        return self._repository._get_package_file(self.name, self.get("version"))
 
     def _load(self):
         if self.filepath is None:
@@ -471,6 +757,7 @@ class FileSystemPackageRepository(PackageRepository):
 
     building_prefix = ".building"
     ignore_prefix = ".ignore"
+    payload_size_prefix = ".payload-size"
 
     package_file_mode = (
         None if os.name == "nt" else
@@ -531,6 +818,10 @@ class FileSystemPackageRepository(PackageRepository):
         self.get_variants = lru_cache(maxsize=None)(self._get_variants)
         self.get_file = lru_cache(maxsize=None)(self._get_file)
 
+        # in-flight background scans of version dirs, keyed by family path.
+        # Each is a (scan generation, future) tuple
+        self._version_dir_scans = {}
+
         # decorate with memcachemed memoizers unless told otherwise
         if not self.disable_memcache:
             decorator1 = memcached(
@@ -561,7 +852,15 @@ class FileSystemPackageRepository(PackageRepository):
 
     @pool_memcached_connections
     def iter_package_families(self):
-        for family in self.get_families():
+        families = self.get_families()
+
+        # keep scans of upcoming families in flight, so that families are
+        # yielded as their version listings arrive
+        window = 2 * _settings.scan_workers
+
+        for i, family in enumerate(families):
+            for family_ in families[i:i + window]:
+                self._prefetch_version_dirs(family_)
             yield family
 
     @pool_memcached_connections
@@ -573,6 +872,33 @@ class FileSystemPackageRepository(PackageRepository):
         for variant in self.get_variants(package_resource):
             yield variant
 
+    def prefetch_packages(self, package_family_resources):
+        if not self._use_memcache:
+            return
+
+        roots = [
+            x.path for x in package_family_resources
+            if isinstance(x, FileSystemPackageFamilyResource)
+        ]
+        self._get_version_dirs.prefetch([(x,) for x in roots])
+
+    def prefetch_package_data(self, package_resources):
+        if self.disable_memcache or not config.cache_package_files \
+                or not config.memcached_uri:
+            return
+
+        files = []
+        for resource in package_resources:
+            # skip packages that are already loaded
+            if not isinstance(resource, FileSystemPackageResource) \
+                    or "_data" in resource.__dict__:
+                continue
+
+            if resource.filepath:
+                files.append((resource.filepath, resource.file_format))
+
+        prefetch_files(files)
+
     def get_parent_package_family(self, package_resource):
         return package_resource.parent
 
@@ -848,6 +1174,20 @@ class FileSystemPackageRepository(PackageRepository):
 
         return dirname
 
+    @cached_property
+    def index(self):
+        """Get the persistent package index of this repository.
+
+        Returns:
+            `FileSystemPackageIndex`, or None if the index is disabled.
+        """
+        # the index lists visible packages only, so is not used by repository
+        # copies that see ignored packages
+        if not _settings.package_index or self.disable_pkg_ignore:
+            return None
+
+        return FileSystemPackageIndex(self)
+
     def pre_variant_install(self, variant_resource):
         if not variant_resource.version:
             return
@@ -947,8 +1287,22 @@ class FileSystemPackageRepository(PackageRepository):
             with self._lock_package(variant_name, variant_version):
                 variant = _create_variant()
 
+            # the payload is installed before the variant, so measure it now
+            self._write_variant_payload_size(variant)
+
         return variant
 
+    def get_variant_payload_size(self, variant_resource):
+        filepath = self._get_variant_payload_size_filepath(variant_resource)
+        if filepath is None:
+            return None
+
+        try:
+            with open(filepath) as f:
+                return int(f.read())
+        except (IOError, ValueError):
+            return None
+
     def _copy(self, **kwargs):
         """
         Make a copy of the repo that does not share resources with this one.
@@ -1004,6 +1358,10 @@ class FileSystemPackageRepository(PackageRepository):
         self.get_packages.cache_clear()
         self.get_variants.cache_clear()
         self.get_file.cache_clear()
+        self._version_dir_scans.clear()
+
+        if self.index:
+            self.index.clear()
 
         if not self.disable_memcache:
             self._get_family_dirs.forget()
@@ -1030,17 +1388,27 @@ class FileSystemPackageRepository(PackageRepository):
             return str(("listdir", self.location))
 
     def _get_family_dirs(self):
+        if self.index:
+            dirs = self.index.get_family_dirs()
+            if dirs is not None:
+                return dirs
+
+        return self._scan_family_dirs()
+
+    def _scan_family_dirs(self):
         dirs = []
         if not os.path.isdir(self.location):
             return dirs
 
-        for name in os.listdir(self.location):
-            path = os.path.join(self.location, name)
+        for entry in os.scandir(self.location):
+            name = entry.name
 
-            if name in ("settings.yaml", self.file_lock_dir):
+            if name in ("settings.yaml", self.file_lock_dir,
+                        _settings.package_index_dir):
                 continue  # skip reserved file/dirnames
 
-            if os.path.isdir(path):
+            # Note: DirEntry.is_dir() doesn't require a stat on most platforms
+            if entry.is_dir():
                 if is_valid_package_name(name):
                     dirs.append((name, None))
             else:
@@ -1055,63 +1423,109 @@ class FileSystemPackageRepository(PackageRepository):
         return str(("listdir", root, int(st.st_ino), st.st_mtime))
 
     def _get_version_dirs(self, root):
-        # Ignore a version if there is a .ignore<version> file next to it
-        def ignore_dir(name):
-            if self.disable_pkg_ignore:
-                return False
-            else:
-                path = os.path.join(root, self.ignore_prefix + name)
-                return os.path.isfile(path)
+        if self.index:
+            dirs = self.index.get_version_dirs(os.path.basename(root))
+            if dirs is not None:
+                return dirs
+
+        return self._scan_version_dirs(root)
+
+    def _scan_version_dirs(self, root):
+        # use the result of a prefetched scan, if there is one
+        scan = self._version_dir_scans.pop(root, None)
+        if scan is not None:
+            generation, future = scan
+            if generation == _scan_generation or future.done():
+                return future.result()
+
+        return self._list_version_dirs(root)
+
+    def _list_version_dirs(self, root, parallel=True):
+        # Note: `parallel` must be False when called from a scan thread, since
+        # waiting on the same executor from one of its threads can deadlock.
+        #
+        map_ = self._map_scan if parallel else map
+        dirs = set()
+        ignored = set()
+        building_dirs = set()
 
-        # simpler case if this test is on
+        # A single scandir gives us dirs, .ignore<version> and
+        # .building<version> files, without a stat per entry
         #
-        if _settings.check_package_definition_files:
-            dirs = []
+        for entry in os.scandir(root):
+            name = entry.name
 
-            for name in os.listdir(root):
-                if name.startswith('.'):
-                    continue
+            if name.startswith('.'):
+                # Ignore a version if there is a .ignore<version> file next to it
+                if name.startswith(self.ignore_prefix):
+                    if not self.disable_pkg_ignore and entry.is_file():
+                        ignored.add(name[len(self.ignore_prefix):])
 
-                path = os.path.join(root, name)
+                elif name.startswith(self.building_prefix):
+                    building_dirs.add(name[len(self.building_prefix):])
 
-                if os.path.isdir(path) and not ignore_dir(name) \
-                        and self._is_valid_package_directory(path):
-                    dirs.append(name)
+            elif entry.is_dir():
+                dirs.add(name)
 
-            return dirs
+        dirs -= ignored
+
+        # simpler case if this test is on
+        #
+        if _settings.check_package_definition_files:
+            names = sorted(dirs)
+            paths = [os.path.join(root, x) for x in names]
+            valid = map_(self._is_valid_package_directory, paths)
+            return [name for name, valid_ in zip(names, valid) if valid_]
 
         # with test off, we have to check for 'building' dirs, these have to be
         # tested regardless. Failed releases may cause 'building files' to be
         # left behind, so we need to clear these out also
         #
-        dirs = set()
-        building_dirs = set()
+        names = [x for x in building_dirs if x in dirs]
+        paths = [os.path.join(root, x) for x in names]
+        valid = map_(self._is_valid_package_directory, paths)
 
-        # find dirs and dirs marked as 'building'
-        for name in os.listdir(root):
-            if name.startswith('.'):
-                if not name.startswith(self.building_prefix):
-                    continue
+        for name, valid_ in zip(names, valid):
+            if not valid_:
+                # package probably still being built
+                dirs.remove(name)
 
-                ver_str = name[len(self.building_prefix):]
-                building_dirs.add(ver_str)
+        return list(dirs)
 
-            path = os.path.join(root, name)
+    def _map_scan(self, func, paths):
+        """Map a filesystem query across paths, in parallel if enabled.
 
-            if os.path.isdir(path) and not ignore_dir(name):
-                dirs.add(name)
+        Results are returned in the same order as `paths`.
+        """
+        executor = _get_scan_executor()
+        if executor is None or len(paths) < 2:
+            return [func(x) for x in paths]
 
-        # check 'building' dirs for validity
-        for name in building_dirs:
-            if name not in dirs:
-                continue
+        return list(executor.map(func, paths))
 
-            path = os.path.join(root, name)
-            if not self._is_valid_package_directory(path):
-                # package probably still being built
-                dirs.remove(name)
+    def _prefetch_version_dirs(self, family):
+        """Start scanning a family's version dirs in the background.
 
-        return list(dirs)
+        The result is picked up by the next `_scan_version_dirs` call for the
+        family. Nothing is done if scans would be served from a cache anyway.
+        """
+        executor = _get_scan_executor()
+        if executor is None or self.index or self._use_memcache \
+                or not isinstance(family, FileSystemPackageFamilyResource):
+            return
+
+        root = family.path
+        if root not in self._version_dir_scans:
+            future = executor.submit(self._list_version_dirs, root, parallel=False)
+            self._version_dir_scans[root] = (_scan_generation, future)
+
+    @property
+    def _use_memcache(self):
+        return (
+            not self.disable_memcache
+            and config.cache_listdir
+            and bool(config.memcached_uri)
+        )
 
     # True if `path` contains package.py or similar
     def _is_valid_package_directory(self, path):
@@ -1186,6 +1600,24 @@ class FileSystemPackageRepository(PackageRepository):
                     return filepath, format_
         return None, None
 
+    def _get_package_file(self, pkg_name, version_str=None):
+        """Get the definition file of a package.
+
+        Returns:
+            2-tuple: Filepath and `FileFormat` (both None if the file is
+            missing).
+        """
+        if self.index:
+            result = self.index.get_package_file(pkg_name, version_str)
+            if result is not None:
+                return result
+
+        path = os.path.join(self.location, pkg_name)
+        if version_str:
+            path = os.path.join(path, version_str)
+
+        return self._get_file(path)
+
     def _create_family(self, name):
         path = os.path.join(self.location, name)
         os.makedirs(path, exist_ok=True)
@@ -1486,6 +1918,43 @@ class FileSystemPackageRepository(PackageRepository):
 
         return new_variant
 
+    def _get_variant_payload_size_filepath(self, variant_resource):
+        # sizes are stored in the package dir, one file per variant
+        if not isinstance(variant_resource, FileSystemVariantResource):
+            return None
+
+        base = variant_resource.base
+        if base is None:
+            return None
+
+        filename = self.payload_size_prefix
+        if variant_resource.index is not None:
+            filename += "-%d" % variant_resource.index
+
+        return os.path.join(base, filename)
+
+    def _write_variant_payload_size(self, variant_resource):
+        filepath = self._get_variant_payload_size_filepath(variant_resource)
+        root = variant_resource.root
+
+        if filepath is None or not root or not os.path.isdir(root):
+            return
+
+        size = get_tree_size(root)
+        path = os.path.dirname(filepath)
+        tmp_filepath = filepath + ".tmp"
+
+        try:
+            with make_path_writable(path):
+                with open(tmp_filepath, 'w') as f:
+                    f.write(str(size))
+                os.replace(tmp_filepath, filepath)
+        except (IOError, OSError) as e:
+            # not critical, the size is measured when needed instead
+            safe_remove(tmp_filepath)
+            debug_print("Could not record payload size of %s: %s",
+                        variant_resource.uri, e)
+
     def _on_changed(self, pkg_name):
         """Called when a package is added/removed/changed.
         """
@@ -1501,6 +1970,10 @@ class FileSystemPackageRepository(PackageRepository):
         # clear internal caches, otherwise change may not be visible
         self.clear_caches()
 
+        # rebuild the changed family's index entry
+        if self.index:
+            self.index.update_family(pkg_name)
+
     def _delete_stale_build_tagfiles(self, family_path):
         now = time.time()
 
@@ -32,6 +32,29 @@ filesystem = {
     # is False, because a lot of file stats are avoided.
     "check_package_definition_files": False,
 
+    # If True, a persistent package index is read from (and written to) each
+    # repository. The index stores family and version listings, and package
+    # definition file locations, so that new processes do not need to rescan the
+    # repository. Entries are invalidated per family, by family directory mtime.
+    # This can greatly speed up resolves on high-latency filesystems such as NFS.
+    # Note that a definition file added to or removed from an existing version
+    # directory by hand (rather than via rez) may not be seen until its family
+    # directory is touched. Edits to existing definition files are always seen.
+    "package_index": False,
+
+    # The relative directory, under the repository location, where the package
+    # index is stored (see 'package_index'). This should begin with a '.', so
+    # that it cannot be confused with a package family.
+    "package_index_dir": ".index",
+
+    # The number of threads used to scan the repository filesystem. If greater
+    # than 1, per-package checks (such as for package definition files) run in
+    # parallel, and iterating over package families prefetches the version
+    # listings of upcoming families in the background. This mostly helps on
+    # high-latency filesystems such as NFS. Note that prefetching is skipped if
+    # listings are cached via memcached or the package index.
+    "scan_workers": 1,
+
     # A list of filenames that are expected to contain Rez definitions.
     # The list will be checked in top to bottom order, and the first filename
     # that contains a valid package definition will be used. You might need to
@@ -0,0 +1,184 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright Contributors to the Rez Project
+
+
+"""
+Resolve cache stored in a local SQLite database.
+"""
+from rez.resolve_cache import ResolveCache
+from rez.utils.logging_ import print_warning
+from rez.config import config
+from rez.system import system
+from rez.vendor.schema.schema import Or
+import pickle
+import sqlite3
+import stat
+import time
+import os.path
+
+
+class LocalResolveCache(ResolveCache):
+    """Resolve cache that stores entries in a SQLite database on local disk.
+
+    This allows resolves to be shared between processes on a single host,
+    without a memcached server. The database is opened in WAL mode, so readers
+    do not block writers, and each operation runs in its own transaction, so
+    concurrent processes can safely read and write the same cache.
+
+    Entries are evicted in least recently used order, once there are more than
+    'max_entries' of them. Any database error is treated as a cache miss.
+    """
+    schema_dict = {"path": Or(None, str),
+                   "max_entries": int,
+                   "timeout": Or(int, float)}
+
+    # Least recently used times are only updated on read if they're older than
+    # this many seconds. This avoids a write on every cache hit.
+    atime_resolution = 60
+
+    def __init__(self):
+        settings = config.plugins.resolve_cache.local
+        self.path = settings.path or os.path.join(
+            config.tmpdir, "rez-resolve-cache-%s" % system.user, "resolves.db")
+        self.max_entries = settings.max_entries
+        self.timeout = settings.timeout
+
+        self._print = config.debug_printer("resolve_cache")
+        self._initialised = False
+
+    @classmethod
+    def name(cls):
+        return "local"
+
+    def get(self, key):
+        def _get(conn):
+            row = conn.execute(
+                "SELECT value, atime FROM resolves WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, atime = row
+            now = time.time()
+            if now - atime > self.atime_resolution:
+                try:
+                    with conn:
+                        conn.execute(
+                            "UPDATE resolves SET atime = ? WHERE key = ?",
+                            (now, key))
+                except sqlite3.OperationalError:
+                    pass  # locked by another writer, not worth waiting for
+            return value
+
+        value = self._execute(_get)
+        if value is None:
+            return None
+
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            self._print("Discarding unreadable resolve cache entry %r: %s",
+                        key, e)
+            self.delete(key)
+            return None
+
+    def set(self, key, value):
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def _set(conn):
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO resolves (key, value, atime) "
+                    "VALUES (?, ?, ?)", (key, value, time.time()))
+
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM resolves WHERE key IN ("
+                        "SELECT key FROM resolves ORDER BY atime DESC "
+                        "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+        self._execute(_set)
+
+    def delete(self, key):
+        def _delete(conn):
+            with conn:
+                conn.execute("DELETE FROM resolves WHERE key = ?", (key,))
+
+        self._execute(_delete)
+
+    def _execute(self, fn):
+        try:
+            conn = self._connect()
+        except (sqlite3.Error, OSError) as e:
+            print_warning("Resolve cache %r is not usable: %s", self.path, e)
+            return None
+
+        try:
+            return fn(conn)
+        except sqlite3.Error as e:
+            self._print("Resolve cache %r error: %s", self.path, e)
+            return None
+        finally:
+            conn.close()
+
+    def _connect(self):
+        if not self._initialised:
+            self._check_dir()
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+
+        try:
+            if not self._initialised:
+                self._init_db(conn)
+                self._initialised = True
+            conn.execute("PRAGMA synchronous = NORMAL")
+        except:
+            conn.close()
+            raise
+
+        return conn
+
+    def _check_dir(self):
+        """Check the directory containing the database, creating it if needed.
+
+        Entries are pickled, and SQLite creates '-wal' and '-shm' files next to
+        the database, so the whole directory must only be writable by the
+        current user. Otherwise another user could plant any of these files.
+        """
+        path = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+
+        if not stat.S_ISDIR(st.st_mode):
+            raise OSError("%s is not a directory" % path)
+
+        if hasattr(os, "getuid"):
+            if st.st_uid != os.getuid():
+                raise OSError("%s is not owned by the current user" % path)
+            if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                raise OSError("%s is writable by other users" % path)
+
+    def _init_db(self, conn):
+        if hasattr(os, "getuid"):
+            st = os.stat(self.path)
+            if st.st_uid != os.getuid():
+                raise OSError("Not owned by the current user")
+            if st.st_mode & 0o077:
+                os.chmod(self.path, 0o600)
+
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error:
+            pass  # journal mode is not critical, the default is still safe
+
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolves ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "atime REAL NOT NULL)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS resolves_atime ON resolves (atime)")
+
+
+def register_plugin():
+    return LocalResolveCache
@@ -0,0 +1,45 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright Contributors to the Rez Project
+
+
+"""
+Resolve cache stored in memcached (see :data:`memcached_uri`).
+"""
+from rez.resolve_cache import ResolveCache
+from rez.utils.memcached import memcached_client
+from rez.config import config
+
+
+class MemcachedResolveCache(ResolveCache):
+    """Resolve cache that stores entries in memcached.
+
+    Connections are taken from the current memcached connection pool, if any
+    (see `pool_memcached_connections`).
+    """
+    @classmethod
+    def name(cls):
+        return "memcached"
+
+    @classmethod
+    def is_available(cls):
+        return bool(config.memcached_uri)
+
+    def get(self, key):
+        with memcached_client(config.memcached_uri,
+                              debug=config.debug_memcache) as client:
+            value = client.get(key)
+        return value if value else None
+
+    def set(self, key, value):
+        with memcached_client(config.memcached_uri,
+                              debug=config.debug_memcache) as client:
+            client.set(key, value)
+
+    def delete(self, key):
+        with memcached_client(config.memcached_uri,
+                              debug=config.debug_memcache) as client:
+            client.delete(key)
+
+
+def register_plugin():
+    return MemcachedResolveCache
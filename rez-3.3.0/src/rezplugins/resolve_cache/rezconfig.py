@@ -0,0 +1,21 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright Contributors to the Rez Project
+
+
+local = {
+    # Path of the SQLite database file used to store resolves. If None, a file
+    # in a per-user directory in :data:`tmpdir` is used. Entries are pickled, so
+    # the cache is not used unless the directory containing this file is owned
+    # by, and only writable by, the current user. Avoid network filesystems, as
+    # SQLite file locking is unreliable on them.
+    "path": None,
+
+    # The maximum number of resolves kept in the cache. When exceeded, the least
+    # recently used entries are evicted. Zero means no limit.
+    "max_entries": 1000,
+
+    # Time in seconds to wait for another process holding a write lock on the
+    # cache before giving up. A cache operation that times out is treated as a
+    # cache miss, it does not cause the resolve to fail.
+    "timeout": 5.0
+}